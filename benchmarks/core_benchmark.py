@@ -0,0 +1,287 @@
+"""
+Times the core processing steps of the parser on synthetic walking trials.
+
+Each step of `parse_dynamic_trial` and of the normalised outputs is timed on its own, with its
+inputs prepared the way the pipeline prepares them, for every trial length and marker or force
+plate count given. The per-marker steps (reading, trimming, filtering and resampling the marker
+data) are run with additional cluster markers, the GRF steps with more force plates. Results are
+written as JSON with the parser and library versions, so that the timings of two releases can be
+compared with `--compare`.
+
+Usage: python benchmarks/core_benchmark.py [--frames N [N ...]] [--markers N [N ...]] [--plates N [N ...]]
+       [--rounds N] [--benchmarks NAME [NAME ...]] [--json FILE] [--compare FILE] [--threshold RATIO]
+"""
+
+import os
+import sys
+import copy
+import json
+import time
+import logging
+import argparse
+import platform
+import tempfile
+import statistics
+import numpy as np
+import pandas as pd
+import scipy
+
+from datetime import datetime
+from trc import TRCData
+
+from c3d_parser.core.c3d_parser import (
+    extract_marker_data, harmonise_markers, trim_frames, filter_data, resample_data, extract_data,
+    identify_event_plates, validate_foot_strikes, get_global_rotation, zero_grf_data, calculate_force_and_couple,
+    transform_grf_coordinates, transform_cop, concatenate_grf_data, scale_grf_data, rotate_grf_data,
+    rotate_grf_y_vertical, normalise_grf_data, normalise_kinematics, normalise_kinetics, write_normalised_data,
+    write_grf, read_data, de_identify_c3d, kinematic_columns)
+from c3d_parser.core.resampling import resample_analog_data
+from c3d_parser.core.segmentation import KINEMATIC_RULE, KINETIC_RULE
+from c3d_parser.core.spatiotemporal import calculate_spatiotemporal_data
+from c3d_parser.settings.general import VERSION, setup_marker_maps_dir
+
+from synthetic_session import SUBJECT, write_dynamic_trial
+
+
+LAB = 'Sydney'
+POINT_RATE = 120.0
+ANALOG_RATE = 1200.0
+MARKER_DATA_RATE = 100
+
+# Timings more than this many times slower than the compared results are reported as regressions.
+REGRESSION_THRESHOLD = 1.2
+
+
+class Trial:
+    """
+    The inputs of each benchmarked step for one synthetic walking trial, prepared as
+    `parse_dynamic_trial` prepares them.
+    """
+
+    def __init__(self, directory, frames, markers, plates):
+        self.directory = os.path.join(directory, f'trial_{frames}_{markers}_{plates}')
+        os.makedirs(self.directory)
+        self.c3d_file = os.path.join(self.directory, 'Walk01.c3d')
+        write_dynamic_trial(self.c3d_file, LAB, frames, POINT_RATE, ANALOG_RATE, plates, cluster_markers=markers)
+        self.name = os.path.basename(self.c3d_file)
+
+        self.trc_data = TRCData()
+        self.trc_data.import_from(self.c3d_file)
+        raw_frame_data = extract_marker_data(self.trc_data)
+        self.frame_data = raw_frame_data.copy()
+        harmonise_markers(self.frame_data, LAB, [])
+        # Cluster markers aren't in any marker set, so they are added back after harmonisation for
+        # the per-marker steps to scale with the marker count.
+        clusters = [column for column in raw_frame_data.columns if '_C' in column]
+        self.marker_data = self.frame_data.join(raw_frame_data[clusters])
+
+        self.start_frame, self.end_frame = trim_frames(self.frame_data)
+        filter_data(self.frame_data, POINT_RATE)
+        self.frame_data = resample_data(self.frame_data, POINT_RATE, MARKER_DATA_RATE)
+
+        self.analog_data, self.data_rate, self.events, self.plate_count, self.plates = extract_data(
+            self.c3d_file, self.start_frame, self.end_frame)
+        identify_event_plates(self.frame_data, self.events, self.plates)
+        validate_foot_strikes(self.events)
+        self.rotation_matrix = get_global_rotation(self.frame_data)
+
+        analog_data = self.analog_data.copy()
+        filter_data(analog_data, self.data_rate)
+        analog_data = resample_analog_data(analog_data, self.data_rate, frequency=1000)
+        zero_grf_data(analog_data, self.plate_count)
+        analog_data = calculate_force_and_couple(analog_data, self.plate_count)
+        transform_grf_coordinates(analog_data, self.plate_count, self.plates)
+        self.mean_centre = transform_cop(analog_data, self.plates)
+        self.plate_data = analog_data
+        self.grf_data = grf_chain(self.analog_data.copy(), self.data_rate, copy.deepcopy(self.events),
+                                  self.plate_count, self.plates, self.rotation_matrix)
+        self.grf_file = os.path.join(self.directory, 'Walk01_grf.mot')
+        write_grf(self.grf_data, self.grf_file)
+
+        self.kinematic_data = joint_data(self.frame_data['Time'].values, KINEMATIC_RULE)
+        self.kinetic_data = joint_data(self.frame_data['Time'].values, KINETIC_RULE)
+        self.normalised_kinematics = normalise_kinematics({self.name: self.kinematic_data}, {self.name: self.events})
+
+
+def grf_chain(analog_data, data_rate, events, plate_count, plates, rotation_matrix):
+    # The GRF steps of `parse_dynamic_trial`, from filtering to the final rotation.
+    filter_data(analog_data, data_rate)
+    analog_data = resample_analog_data(analog_data, data_rate, frequency=1000)
+    zero_grf_data(analog_data, plate_count)
+    analog_data = calculate_force_and_couple(analog_data, plate_count)
+    transform_grf_coordinates(analog_data, plate_count, plates)
+    mean_centre = transform_cop(analog_data, plates)
+    analog_data = concatenate_grf_data(analog_data, events, mean_centre)
+    scale_grf_data(analog_data)
+    rotate_grf_data(analog_data, rotation_matrix)
+    rotate_grf_y_vertical(analog_data)
+
+    return analog_data
+
+
+def joint_data(time_values, rule):
+    """
+    Returns smooth joint angle or moment curves for the columns segmented by `rule`, in place of
+    IK or ID results.
+    """
+    columns = sorted({column for names in rule.columns.values() for column in names})
+    phase = 2 * np.pi * time_values[:, np.newaxis] / 1.1 + np.arange(len(columns))
+    data = pd.DataFrame(20.0 * np.sin(phase) + 5.0 * np.sin(2 * phase), columns=columns)
+    data.insert(0, 'time', time_values)
+
+    return data
+
+
+# The benchmarked steps: their name, the count they are run over besides the trial length, and a
+# function returning the step and a function that creates its arguments (untimed) for each round.
+BENCHMARKS = [
+    ('extract_marker_data', 'markers', lambda trial: (extract_marker_data, lambda: (trial.trc_data,))),
+    ('trim_frames', 'markers', lambda trial: (trim_frames, lambda: (trial.marker_data.copy(),))),
+    ('filter_data', 'markers', lambda trial: (filter_data, lambda: (trial.marker_data.copy(), POINT_RATE))),
+    ('resample_data', 'markers',
+     lambda trial: (resample_data, lambda: (trial.marker_data, POINT_RATE, MARKER_DATA_RATE))),
+    ('extract_data', 'plates', lambda trial: (extract_data, lambda: (trial.c3d_file, trial.start_frame,
+                                                                     trial.end_frame))),
+    ('grf_chain', 'plates', lambda trial: (grf_chain, lambda: (
+        trial.analog_data.copy(), trial.data_rate, copy.deepcopy(trial.events), trial.plate_count, trial.plates,
+        trial.rotation_matrix))),
+    ('concatenate_grf_data', 'plates', lambda trial: (concatenate_grf_data, lambda: (
+        trial.plate_data.copy(), copy.deepcopy(trial.events), trial.mean_centre))),
+    ('normalise_grf_data', 'plates', lambda trial: (normalise_grf_data, lambda: (
+        {trial.name: trial.grf_data}, {trial.name: trial.events}))),
+    ('normalise_kinematics', None, lambda trial: (normalise_kinematics, lambda: (
+        {trial.name: trial.kinematic_data}, {trial.name: trial.events}))),
+    ('normalise_kinetics', 'plates', lambda trial: (normalise_kinetics, lambda: (
+        {trial.name: trial.kinetic_data}, {trial.name: trial.events}))),
+    ('calculate_spatiotemporal_data', None, lambda trial: (calculate_spatiotemporal_data, lambda: (
+        trial.frame_data, copy.deepcopy(trial.events), SUBJECT))),
+    ('write_normalised_data', None, lambda trial: (write_normalised_data, lambda: (
+        trial.normalised_kinematics, kinematic_columns, {trial.name: 'Walk01'}, set(),
+        os.path.join(trial.directory, 'combined_kinematics.csv')))),
+    ('write_grf', 'plates', lambda trial: (write_grf, lambda: (
+        trial.grf_data, os.path.join(trial.directory, 'Walk01_grf_copy.mot')))),
+    ('read_data', 'plates', lambda trial: (read_data, lambda: (trial.grf_file,))),
+    ('de_identify_c3d', 'markers', lambda trial: (de_identify_c3d, lambda: (
+        trial.c3d_file, os.path.join(trial.directory, 'output'), 'dynamic_1'))),
+]
+
+
+def time_benchmark(function, create_arguments, rounds):
+    times = []
+    for _ in range(rounds):
+        arguments = create_arguments()
+        start = time.perf_counter()
+        function(*arguments)
+        times.append(time.perf_counter() - start)
+
+    return {'rounds': rounds, 'min': min(times), 'median': statistics.median(times),
+            'mean': statistics.mean(times), 'stddev': statistics.stdev(times) if rounds > 1 else 0.0}
+
+
+def run(frame_counts, marker_counts, plate_counts, rounds, names=None):
+    benchmarks = [benchmark for benchmark in BENCHMARKS if not names or benchmark[0] in names]
+    trials = {}
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for name, count, prepare in benchmarks:
+            for frames in frame_counts:
+                counts = {'markers': marker_counts, 'plates': plate_counts}.get(count, [None])
+                for value in counts:
+                    markers = value if count == 'markers' else marker_counts[0]
+                    plates = value if count == 'plates' else plate_counts[0]
+                    key = (frames, markers, plates)
+                    if key not in trials:
+                        trials[key] = Trial(directory, frames, markers, plates)
+
+                    parameters = {'frames': frames}
+                    if count:
+                        parameters[count] = value
+                    function, create_arguments = prepare(trials[key])
+                    result = {'name': name, 'parameters': parameters}
+                    result.update(time_benchmark(function, create_arguments, rounds))
+                    results.append(result)
+                    print_result(result)
+
+    return results
+
+
+def environment():
+    return {'c3d_parser_version': VERSION, 'python': platform.python_version(), 'numpy': np.__version__,
+            'pandas': pd.__version__, 'scipy': scipy.__version__, 'machine': platform.machine(),
+            'processor': platform.processor(), 'system': platform.platform(),
+            'date': datetime.now().isoformat(timespec='seconds')}
+
+
+def case_label(result):
+    return result['name'] + "".join(f" {key}={value}" for key, value in result['parameters'].items())
+
+
+def print_result(result):
+    print(f"{case_label(result):<50} {result['median'] * 1000:>10.2f} ms (min {result['min'] * 1000:.2f} ms, "
+          f"{result['rounds']} rounds)")
+
+
+def compare(results, previous, threshold):
+    """
+    Prints the median time of each benchmark relative to `previous` (earlier results), returning
+    the benchmarks that are more than `threshold` times slower.
+    """
+    previous_results = {case_label(result): result for result in previous['results']}
+    print(f"\nCompared with {previous['environment']['c3d_parser_version']} "
+          f"({previous['environment']['date']}):")
+    regressions = []
+    for result in results:
+        label = case_label(result)
+        if label not in previous_results:
+            continue
+        ratio = result['median'] / previous_results[label]['median']
+        flag = ""
+        if ratio > threshold:
+            flag = "  SLOWER"
+            regressions.append(label)
+        elif ratio < 1 / threshold:
+            flag = "  faster"
+        print(f"{label:<50} {previous_results[label]['median'] * 1000:>10.2f} ms -> "
+              f"{result['median'] * 1000:>10.2f} ms  x{ratio:.2f}{flag}")
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the core processing steps.")
+    parser.add_argument('--frames', type=int, nargs='+', default=[600, 2400],
+                        help=f"Walking trial lengths in frames (at {POINT_RATE:.0f} Hz).")
+    parser.add_argument('--markers', type=int, nargs='+', default=[0, 40],
+                        help="Numbers of cluster markers added to the marker set.")
+    parser.add_argument('--plates', type=int, nargs='+', default=[2, 4], help="Numbers of force plates.")
+    parser.add_argument('--rounds', type=int, default=5, help="Number of times each benchmark is run.")
+    parser.add_argument('--benchmarks', nargs='+', choices=[benchmark[0] for benchmark in BENCHMARKS],
+                        help="Only run these benchmarks.")
+    parser.add_argument('--json', help="Optional path to write the results to.")
+    parser.add_argument('--compare', help="Results of an earlier run (written with --json) to compare against.")
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help="Slow-down ratio reported as a regression by --compare.")
+    args = parser.parse_args()
+
+    # The marker maps are read from the application directory.
+    setup_marker_maps_dir()
+    # The synthetic trials are trimmed on purpose, so the warnings are expected.
+    logging.disable(logging.WARNING)
+
+    results = run(args.frames, args.markers, args.plates, args.rounds, args.benchmarks)
+    report = {'environment': environment(), 'rounds': args.rounds, 'results': results}
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) slower by more than x{args.threshold:.2f}.")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
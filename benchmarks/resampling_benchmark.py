@@ -0,0 +1,92 @@
+"""
+Compares the polyphase and spline paths used to resample analog (GRF) data to 1000 Hz.
+
+For each source rate a synthetic band-limited signal is generated, resampled with both paths
+and compared against its analytic values. The per-channel spline resampling used for marker
+data (`resample_data`) is timed as well, as a baseline.
+
+Usage: python benchmarks/resampling_benchmark.py [--duration SECONDS] [--channels N] [--json FILE]
+"""
+
+import json
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+from c3d_parser.core.c3d_parser import resample_data
+from c3d_parser.core.resampling import resampling_report
+
+
+SOURCE_RATES = [1200, 2000, 3000, 960, 1111]
+TARGET_FREQUENCY = 1000
+
+
+def create_signal(duration, data_rate, channels, seed=0):
+    rng = np.random.default_rng(seed)
+    frequencies = rng.uniform(0.5, 40.0, size=(channels, 5))
+    amplitudes = rng.uniform(10.0, 400.0, size=(channels, 5))
+    phases = rng.uniform(0, 2 * np.pi, size=(channels, 5))
+
+    def reference(times):
+        times = np.asarray(times)[:, np.newaxis, np.newaxis]
+        return np.sum(amplitudes * np.sin(2 * np.pi * frequencies * times + phases), axis=2)
+
+    times = np.arange(0, duration, 1 / data_rate)
+    analog_data = pd.DataFrame(reference(times), columns=[f'channel_{i + 1}' for i in range(channels)])
+    analog_data.insert(0, 'time', times)
+
+    return analog_data, reference
+
+
+def run(duration, channels):
+    results = []
+    for data_rate in SOURCE_RATES:
+        analog_data, reference = create_signal(duration, data_rate, channels)
+        report = resampling_report(analog_data, data_rate, TARGET_FREQUENCY, reference=reference)
+
+        start = time.perf_counter()
+        resample_data(analog_data, data_rate, TARGET_FREQUENCY)
+        report['current_spline_seconds'] = time.perf_counter() - start
+
+        report['duration'] = duration
+        results.append(report)
+
+    return results
+
+
+def print_results(results):
+    print(f"{'Rate':>6} {'Method':>10} {'Polyphase (s)':>14} {'Spline (s)':>11} {'Current (s)':>12} "
+          f"{'Poly RMS err':>13} {'Spline RMS err':>15} {'Poly interior':>14} {'Spline interior':>16}")
+    for report in results:
+        def seconds(key):
+            value = report.get(key)
+            return f"{value:.4f}" if value is not None else "-"
+
+        def error(method, key='rms'):
+            summary = report.get(f'{method}_error')
+            return f"{max(summary[key]):.2e}" if summary else "-"
+
+        print(f"{report['data_rate']:>6.0f} {report['selected_method']:>10} {seconds('polyphase_seconds'):>14} "
+              f"{seconds('spline_seconds'):>11} {seconds('current_spline_seconds'):>12} "
+              f"{error('polyphase'):>13} {error('spline'):>15} {error('polyphase', 'interior_max_abs'):>14} "
+              f"{error('spline', 'interior_max_abs'):>16}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark analog resampling methods.")
+    parser.add_argument('--duration', type=float, default=30.0, help="Signal duration in seconds.")
+    parser.add_argument('--channels', type=int, default=24, help="Number of analog channels.")
+    parser.add_argument('--json', help="Optional path to write the full report to.")
+    args = parser.parse_args()
+
+    results = run(args.duration, args.channels)
+    print_results(results)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
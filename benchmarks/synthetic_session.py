@@ -0,0 +1,516 @@
+"""
+Generates synthetic C3D gait sessions for performance and scaling tests.
+
+A session is a static trial and a number of walking trials of a synthetic subject, labelled with
+one of the bundled marker sets. The walking trials have force plates (with analog data in N/Nmm,
+or in volts with a calibration matrix), gait events with their contexts, gaps in the marker data
+at the start and end of the trial and in the torso markers, and the subject's parameters in the
+PROCESSING group, so that they exercise every step of `parse_static_trial` and
+`parse_dynamic_trial`. The files are deterministic for a given seed and can be shared freely.
+
+Usage: python benchmarks/synthetic_session.py OUTPUT_DIRECTORY [--lab LAB] [--sessions N] [--trials N]
+       [--frames N] [--point-rate HZ] [--analog-rate HZ] [--plates N] [--calibrated] [--seed N]
+"""
+
+import os
+import json
+import argparse
+import numpy as np
+
+from scipy.spatial.transform import Rotation
+
+from c3d_parser.core.c3d_patch import c3d
+from c3d_parser.core.force_plates import calculate_plate_rotation
+from c3d_parser.settings.general import internal_maps_dir
+
+
+# Anthropometrics of the synthetic subject (mm and kg), as entered in the application.
+SUBJECT = {
+    'Sex': 'Female', 'Age': 12, 'Height': 1500.0, 'Weight': 42.0, 'ASIS Width': 230.0,
+    'Left Knee Width': 95.0, 'Right Knee Width': 95.0, 'Left Ankle Width': 65.0, 'Right Ankle Width': 65.0,
+    'Left Leg Length': 780.0, 'Right Leg Length': 785.0,
+}
+
+# PROCESSING parameters written for each of the subject's measurements.
+PROCESSING_PARAMETERS = {
+    'Height': 'Height', 'Bodymass': 'Weight', 'InterAsisDistance': 'ASIS Width',
+    'LKneeWidth': 'Left Knee Width', 'RKneeWidth': 'Right Knee Width',
+    'LAnkleWidth': 'Left Ankle Width', 'RAnkleWidth': 'Right Ankle Width',
+    'LLegLength': 'Left Leg Length', 'RLegLength': 'Right Leg Length',
+}
+
+MARKER_DIAMETER = 14.0
+WALKING_SPEED = 1200.0
+STRIDE_DURATION = 1.1
+STANCE_FRACTION = 0.6
+STEP_WIDTH = 160.0
+
+# Force plate size (mm) along and across the walkway.
+PLATE_LENGTH = 464.0
+PLATE_WIDTH = 508.0
+
+# Markers that aren't in any marker set, and model outputs, which the parser should ignore.
+EXTRA_MARKERS = ['LFHD', 'RFHD']
+MODEL_OUTPUTS = ['LHipAngles', 'RHipAngles']
+
+_sides = [('Left', 1), ('Right', -1)]
+_first_strike = {'Left': 0.03, 'Right': 0.03 + STRIDE_DURATION / 2}
+_walking_rotations = {'+X': 0.0, '+Y': 90.0, '-X': 180.0, '-Y': 270.0}
+_plate_channels = ['Fx', 'Fy', 'Fz', 'Mx', 'My', 'Mz']
+
+
+def get_marker_set(lab):
+    """
+    Returns the marker labels of `lab`, by harmonised marker name, from the bundled marker sets.
+    """
+    with open(os.path.join(internal_maps_dir, f"{lab}.json"), 'r') as file:
+        marker_map = json.load(file)
+
+    return {marker: label for marker, label in marker_map.items() if label is not None}
+
+
+def write_static_trial(file_path, lab='Sydney', frames=300, point_rate=100.0, analog_rate=1000.0, plate_count=2,
+                       subject=None, seed=0):
+    """
+    Writes a static trial of the subject standing still.
+    """
+    subject = SUBJECT if subject is None else subject
+    rng = np.random.default_rng(seed)
+
+    pelvis = np.tile([0.0, 0.0, _hip_height(subject)], (frames, 1))
+    heels = {side: np.tile([-60.0, sign * STEP_WIDTH / 2, 0.0], (frames, 1)) for side, sign in _sides}
+    markers = _body_markers(pelvis, heels, subject)
+    markers = {name: position + rng.normal(0.0, 0.3, position.shape) for name, position in markers.items()}
+
+    corners = _plate_corners([(PLATE_LENGTH * (i - (plate_count - 1) / 2), 0.0) for i in range(plate_count)])
+    samples = int(round(frames * analog_rate / point_rate))
+    loads = rng.normal(0.0, 0.2, (samples, 6 * plate_count))
+
+    _write_trial(file_path, lab, point_rate, analog_rate, markers, [], corners, loads, [], subject, 'Static',
+                 calibrated=False)
+
+
+def write_dynamic_trial(file_path, lab='Sydney', frames=600, point_rate=100.0, analog_rate=1000.0, plate_count=3,
+                        calibrated=False, gap_frames=5, walking_direction='+X', straddle_plate=False, cluster_markers=0,
+                        subject=None, seed=0):
+    """
+    Writes a walking trial of `frames` frames.
+
+    One force plate is placed under each of `plate_count` consecutive foot strikes in the middle
+    of the trial. With `straddle_plate` set, the last plate is moved forward so its stance begins
+    off the plate. With `calibrated` set the plate outputs are written in volts, with the
+    calibration matrices needed to convert them. The first and last `gap_frames` frames are
+    missing some markers, and the torso markers have a gap in the middle of the trial.
+    `cluster_markers` additional markers, which aren't in any marker set, are placed in clusters
+    on the thighs and shanks.
+    """
+    if analog_rate % point_rate:
+        raise ValueError("The analog rate must be a multiple of the point rate.")
+    subject = SUBJECT if subject is None else subject
+    rng = np.random.default_rng(seed)
+
+    duration = frames / point_rate
+    times = np.arange(frames) / point_rate
+    pelvis, heels, events = _walk(times, subject)
+    markers = _body_markers(pelvis, heels, subject)
+    clusters = _cluster_markers(markers, cluster_markers)
+    markers.update(clusters)
+    markers = {name: position + rng.normal(0.0, 0.3, position.shape) for name, position in markers.items()}
+
+    # Place the plates under the foot strikes closest to the middle of the trial.
+    strikes = sorted((time, side, stride) for (side, stride), (time, _) in events.items()
+                     if 0.5 < time and time + STANCE_FRACTION * STRIDE_DURATION < duration - 0.5)
+    strikes.sort(key=lambda strike: abs(strike[0] - duration / 2))
+    strikes = sorted(strikes[:plate_count])
+    if len(strikes) < plate_count:
+        raise ValueError(f"The trial is too short for {plate_count} force plates.")
+    centres = [(_heel_position(side, stride * STRIDE_DURATION + _first_strike[side]) + 70.0, 0.0)
+               for _, side, stride in strikes]
+    if straddle_plate:
+        centres[-1] = (centres[-1][0] + 150.0, 0.0)
+    corners = _plate_corners(centres)
+
+    stances = [(plate, events[(side, stride)], side) for plate, (_, side, stride) in enumerate(strikes)]
+    loads = _plate_loads(stances, corners, frames, point_rate, analog_rate, subject, rng)
+
+    # Rotate the trial for the walking direction.
+    rotation = Rotation.from_euler('z', _walking_rotations[walking_direction], degrees=True).as_matrix()
+    markers = {name: position @ rotation.T for name, position in markers.items()}
+    # The loads are in the plates' coordinate systems, so rotate with them.
+    corners = corners @ rotation.T
+
+    # Remove markers at the start and end of the trial, and the torso markers mid-trial.
+    if gap_frames:
+        for name in ['LTOE', 'RHEE']:
+            markers[name][:gap_frames] = np.nan
+        for name in ['RASI', 'LHEE']:
+            markers[name][-gap_frames:] = np.nan
+        for name in ['C7', 'T2', 'T10', 'MAN']:
+            markers[name][frames // 2:frames // 2 + 3 * gap_frames] = np.nan
+
+    event_records = []
+    for (side, _), (strike_time, off_time) in sorted(events.items(), key=lambda item: item[1]):
+        event_records.append((side, "Foot Strike", strike_time))
+        if off_time < duration:
+            event_records.append((side, "Foot Off", off_time))
+    # Events without a side are ignored by the parser.
+    event_records.append(('General', "Event", duration / 2))
+    event_records = [(context, label, round(time * point_rate) / point_rate)
+                     for context, label, time in event_records if time < (frames - 1) / point_rate]
+
+    _write_trial(file_path, lab, point_rate, analog_rate, markers, event_records, corners, loads,
+                 ['EMG1', 'EMG2'], subject, 'Dynamic', calibrated=calibrated,
+                 extra_markers=EXTRA_MARKERS + list(clusters))
+
+
+def create_session(directory, lab='Sydney', trials=3, frames=600, point_rate=100.0, analog_rate=1000.0,
+                   plate_count=3, calibrated=False, subject=None, seed=0):
+    """
+    Writes a session of a static trial and `trials` walking trials (in alternating directions,
+    with the last plate straddled in every third trial) to `directory`.
+
+    Returns the static trial, the dynamic trials and the subject's static data, as passed to
+    `parse_session`.
+    """
+    subject = SUBJECT if subject is None else subject
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+
+    static_trial = 'Static01.c3d'
+    write_static_trial(os.path.join(directory, static_trial), lab, point_rate=point_rate, analog_rate=analog_rate,
+                       plate_count=plate_count, subject=subject, seed=seed)
+
+    dynamic_trials = []
+    for i in range(trials):
+        dynamic_trial = f'Walk{i + 1:02d}.c3d'
+        write_dynamic_trial(os.path.join(directory, dynamic_trial), lab, frames, point_rate, analog_rate,
+                            plate_count, calibrated, walking_direction='+X' if i % 2 == 0 else '-X',
+                            straddle_plate=i % 3 == 2, subject=subject, seed=seed + i + 1)
+        dynamic_trials.append(dynamic_trial)
+
+    return static_trial, dynamic_trials, dict(subject)
+
+
+def _hip_height(subject):
+    # Leg lengths are measured from the ASIS (60 mm above the hip joints) to the malleoli (75 mm
+    # above the ground).
+    leg_length = (subject['Left Leg Length'] + subject['Right Leg Length']) / 2
+    return leg_length + 75.0 - 60.0
+
+
+def _heel_position(side, time):
+    """
+    Position of the heel along the walkway. The heel is still during stance and moves one stride
+    forward during swing.
+    """
+    stride_length = WALKING_SPEED * STRIDE_DURATION
+    cycle = (np.asarray(time) - _first_strike[side]) / STRIDE_DURATION
+    stride = np.floor(cycle)
+    phase = cycle - stride
+    swing = np.clip((phase - STANCE_FRACTION) / (1 - STANCE_FRACTION), 0.0, 1.0)
+    strike_position = WALKING_SPEED * (_first_strike[side] + stride * STRIDE_DURATION) + 0.25 * stride_length
+
+    return strike_position + stride_length * (1 - np.cos(np.pi * swing)) / 2
+
+
+def _walk(times, subject):
+    """
+    Returns the pelvis and heel trajectories of the walk, and the (strike, off) times of every
+    stride by side and stride number.
+    """
+    pelvis = np.column_stack([
+        WALKING_SPEED * times,
+        15.0 * np.sin(2 * np.pi * times / STRIDE_DURATION),
+        _hip_height(subject) - 20.0 + 10.0 * np.cos(4 * np.pi * times / STRIDE_DURATION),
+    ])
+
+    heels, events = {}, {}
+    for side, sign in _sides:
+        cycle = (times - _first_strike[side]) / STRIDE_DURATION
+        swing = np.clip((cycle - np.floor(cycle) - STANCE_FRACTION) / (1 - STANCE_FRACTION), 0.0, 1.0)
+        heels[side] = np.column_stack([
+            _heel_position(side, times),
+            np.full(len(times), sign * STEP_WIDTH / 2),
+            60.0 * np.sin(np.pi * swing),
+        ])
+
+        stride = 0
+        while (strike_time := _first_strike[side] + stride * STRIDE_DURATION) < times[-1]:
+            events[(side, stride)] = (strike_time, strike_time + STANCE_FRACTION * STRIDE_DURATION)
+            stride += 1
+
+    return pelvis, heels, events
+
+
+def _body_markers(pelvis, heels, subject):
+    """
+    Returns the marker trajectories, by harmonised marker name, for the pelvis and heel
+    trajectories. The subject faces +X with +Z vertical.
+    """
+    height = subject['Height']
+    marker_radius = MARKER_DIAMETER / 2
+    asis_width = subject['ASIS Width']
+    lateral = np.array([0.0, 1.0, 0.0])
+
+    markers = {
+        'SACR': pelvis + [-150.0, 0.0, 100.0],
+        'C7': pelvis + [-90.0, 0.0, 0.3 * height],
+        'T2': pelvis + [-95.0, 0.0, 0.28 * height],
+        'T10': pelvis + [-120.0, 0.0, 0.16 * height],
+        'MAN': pelvis + [90.0, 0.0, 0.24 * height],
+    }
+    for side, sign in _sides:
+        prefix = side[0]
+        knee_width = subject[f'{side} Knee Width']
+        ankle_width = subject[f'{side} Ankle Width']
+
+        hip = pelvis + [0.0, sign * 0.36 * asis_width, 0.0]
+        ankle = heels[side] + [60.0, 0.0, 75.0]
+        knee = _knee_position(hip, ankle, subject[f'{side} Leg Length'])
+
+        markers.update({
+            f'{prefix}ASI': pelvis + [50.0, sign * asis_width / 2, 60.0],
+            f'{prefix}PSI': pelvis + [-150.0, sign * 45.0, 100.0],
+            f'{prefix}THI': hip + 0.6 * (knee - hip) + [20.0, sign * 80.0, 0.0],
+            f'{prefix}PAT': knee + [50.0, 0.0, 0.0],
+            f'{prefix}KNE': knee + sign * (knee_width / 2 + marker_radius) * lateral,
+            f'{prefix}KNEM': knee - sign * (knee_width / 2 + marker_radius) * lateral,
+            f'{prefix}KAX': knee + sign * (knee_width / 2 + marker_radius + 70.0) * lateral,
+            f'{prefix}TIB': knee + 0.6 * (ankle - knee) + [10.0, sign * 60.0, 0.0],
+            f'{prefix}ANK': ankle + sign * (ankle_width / 2 + marker_radius) * lateral,
+            f'{prefix}MED': ankle - sign * (ankle_width / 2 + marker_radius) * lateral,
+            f'{prefix}HEE': heels[side] + [-25.0, 0.0, 35.0],
+            f'{prefix}TOE': heels[side] + [0.12 * height, 0.0, 25.0],
+        })
+
+    markers['LFHD'] = markers['C7'] + [150.0, 60.0, 200.0]
+    markers['RFHD'] = markers['C7'] + [150.0, -60.0, 200.0]
+
+    return markers
+
+
+def _cluster_markers(markers, count):
+    # Clusters are built up on the thighs and shanks in turn, in rings of four markers around
+    # the wand markers.
+    segments = ['LTHI', 'RTHI', 'LTIB', 'RTIB']
+    clusters = {}
+    for i in range(count):
+        segment = segments[i % len(segments)]
+        position = i // len(segments)
+        angle = np.pi / 2 * (position % 4)
+        offset = [40.0 * np.cos(angle), 0.0, 40.0 * np.sin(angle) + 60.0 * (position // 4 + 1)]
+        clusters[f'{segment}_C{position + 1}'] = markers[segment] + offset
+
+    return clusters
+
+
+def _knee_position(hip, ankle, leg_length):
+    # Knees bend forward, and are straight when the hip and ankle are too far apart.
+    segment_length = 0.52 * leg_length
+    offset = ankle - hip
+    distance = np.linalg.norm(offset, axis=1, keepdims=True)
+    axis = offset / distance
+    forward = np.array([1.0, 0.0, 0.0]) - axis * axis[:, [0]]
+    forward /= np.linalg.norm(forward, axis=1, keepdims=True)
+    bend = np.sqrt(np.clip(segment_length ** 2 - (distance / 2) ** 2, 0.0, None))
+
+    return hip + axis * np.minimum(distance / 2, segment_length) + forward * bend
+
+
+def _plate_corners(centres):
+    # Corners are ordered so that the plate X axis points backwards and Z points down.
+    half_length, half_width = PLATE_LENGTH / 2, PLATE_WIDTH / 2
+    corners = [[[x - half_length, y + half_width, 0.0], [x + half_length, y + half_width, 0.0],
+                [x + half_length, y - half_width, 0.0], [x - half_length, y - half_width, 0.0]] for x, y in centres]
+
+    return np.array(corners, dtype=float).reshape(-1, 4, 3)
+
+
+def _plate_loads(stances, corners, frames, point_rate, analog_rate, subject, rng):
+    """
+    Returns the force and moment outputs (Fx, Fy, Fz, Mx, My, Mz of every plate, in the plate's
+    coordinate system) for the stance on each plate.
+    """
+    samples = int(round(frames * analog_rate / point_rate))
+    times = np.arange(samples) / analog_rate
+    loads = rng.normal(0.0, 0.2, (samples, 6 * len(corners)))
+
+    body_weight = 9.81 * subject['Weight']
+    for plate, (strike_time, off_time), side in stances:
+        in_stance = (strike_time <= times) & (times <= off_time)
+        progress = (times[in_stance] - strike_time) / (off_time - strike_time)
+
+        # Double-peaked vertical force, braking then propulsive shear, and a heel-to-toe CoP.
+        force = np.column_stack([
+            -0.2 * body_weight * np.sin(2 * np.pi * progress),
+            0.05 * body_weight * np.sin(np.pi * progress) * (1 if side == 'Left' else -1),
+            body_weight * (np.sin(np.pi * progress) + 0.3 * np.sin(3 * np.pi * progress)),
+        ])
+        heel = _heel_position(side, strike_time)
+        centre_of_pressure = np.column_stack([
+            heel + 10.0 + 180.0 * progress,
+            np.full(len(progress), (1 if side == 'Left' else -1) * STEP_WIDTH / 2),
+            np.zeros(len(progress)),
+        ])
+        free_moment = 2000.0 * np.sin(2 * np.pi * progress)
+
+        # Express the loads in the plate's coordinate system.
+        rotation = calculate_plate_rotation(corners[plate])
+        Fx, Fy, Fz = (force @ rotation).T
+        px, py, _ = ((centre_of_pressure - corners[plate].mean(axis=0)) @ rotation).T
+        Mx = py * Fz + Fy
+        My = -px * Fz - Fx
+        Mz = free_moment + px * Fy - py * Fx
+
+        loads[in_stance, 6 * plate:6 * plate + 6] = np.column_stack([Fx, Fy, Fz, Mx, My, Mz])
+
+    return loads
+
+
+def _write_trial(file_path, lab, point_rate, analog_rate, markers, events, corners, loads, other_channels,
+                 subject, measurement_type, calibrated, extra_markers=EXTRA_MARKERS):
+    marker_set = get_marker_set(lab)
+    labels = list(marker_set.values()) + extra_markers + MODEL_OUTPUTS
+    positions = [markers[name] for name in marker_set] + [markers[name] for name in extra_markers]
+    frames = len(positions[0])
+    # Model outputs are written as (non-marker) points too.
+    positions += [np.zeros((frames, 3))] * len(MODEL_OUTPUTS)
+    positions = np.stack(positions, axis=1)
+
+    plate_count = len(corners)
+    samples_per_frame = int(round(analog_rate / point_rate))
+    other_data = np.zeros((len(loads), len(other_channels)))
+    if calibrated:
+        calibration_matrices = np.array([_calibration_matrix(plate) for plate in range(plate_count)])
+        plate_data = np.hstack([loads[:, 6 * i:6 * i + 6] @ np.linalg.inv(calibration_matrices[i])
+                                for i in range(plate_count)])
+        plate_labels = [f'{channel}{i + 1}' for i in range(plate_count) for channel in _plate_channels]
+        units = ['V'] * (len(other_channels) + 6 * plate_count)
+    else:
+        plate_data = loads
+        plate_labels = [f'{"Force" if channel[0] == "F" else "Moment"}.{channel}{i + 1}'
+                        for i in range(plate_count) for channel in _plate_channels]
+        units = ['V'] * len(other_channels) + ['N', 'N', 'N', 'Nmm', 'Nmm', 'Nmm'] * plate_count
+    # The plate channels follow the other analog channels.
+    analog = np.hstack([other_data, plate_data])
+    analog_labels = other_channels + plate_labels
+    channels = len(other_channels) + 1 + np.arange(6 * plate_count).reshape(plate_count, 6)
+
+    writer = c3d.Writer(point_rate=point_rate, analog_rate=analog_rate, point_scale=-0.01)
+    writer.set_point_labels(labels)
+    _add_strings(writer.point_group, 'ANGLES', MODEL_OUTPUTS)
+    writer.set_analog_labels(analog_labels)
+    _add_strings(writer.analog_group, 'UNITS', units)
+    writer.set_analog_scales(np.ones(len(analog_labels)))
+    writer.set_analog_offsets(np.zeros(len(analog_labels)))
+
+    group = writer.get_create('FORCE_PLATFORM')
+    group.add('USED', 'Number of force platforms', 2, '<H', plate_count)
+    _add_array(group, 'TYPE', np.full(plate_count, 4 if calibrated else 2, dtype=np.int16))
+    _add_array(group, 'ZERO', np.array([1, 10], dtype=np.int16))
+    _add_array(group, 'CORNERS', corners.astype(np.float32))
+    _add_array(group, 'ORIGIN', np.tile(np.array([0.0, 0.0, -40.0], dtype=np.float32), (plate_count, 1)))
+    _add_array(group, 'CHANNEL', channels.astype(np.int16))
+    if calibrated:
+        _add_array(group, 'CAL_MATRIX', calibration_matrices.astype(np.float32))
+
+    if events:
+        contexts, event_labels, times = zip(*events)
+        group = writer.get_create('EVENT')
+        group.add('USED', 'Number of events', 2, '<H', len(events))
+        _add_strings(group, 'CONTEXTS', contexts)
+        _add_strings(group, 'LABELS', event_labels)
+        _add_strings(group, 'DESCRIPTIONS', [''] * len(events))
+        _add_strings(group, 'SUBJECTS', ['Synthetic'] * len(events))
+        _add_array(group, 'TIMES', np.array([[0.0, time] for time in times], dtype=np.float32))
+        _add_array(group, 'ICON_IDS', np.zeros(len(events), dtype=np.int16))
+        _add_array(group, 'GENERIC_FLAGS', np.zeros(len(events), dtype=np.int16))
+
+    group = writer.get_create('SUBJECTS')
+    group.add('USED', 'Number of subjects', 2, '<H', 1)
+    _add_strings(group, 'NAMES', ['Synthetic'])
+    _add_strings(group, 'MARKER_SETS', [lab])
+    group.add('IS_STATIC', 'Static subject', 2, '<H', 0)
+    group.add('USES_PREFIXES', 'Marker labels are prefixed', 2, '<H', 0)
+
+    group = writer.get_create('ANALYSIS')
+    group.add('USED', 'Number of analysis values', 2, '<H', 1)
+    _add_strings(group, 'SUBJECTS', ['Synthetic'])
+    _add_strings(group, 'NAMES', ['Walking Speed'])
+    _add_strings(group, 'CONTEXTS', ['General'])
+    _add_strings(group, 'UNITS', ['m/s'])
+    _add_strings(group, 'DESCRIPTIONS', [''])
+    _add_array(group, 'VALUES', np.array([WALKING_SPEED / 1000], dtype=np.float32))
+
+    group = writer.get_create('PROCESSING')
+    for name, measurement in PROCESSING_PARAMETERS.items():
+        group.add(name, measurement, 4, '<f', float(subject[measurement]))
+    _add_strings(group, 'Measurement type', [measurement_type])
+
+    group = writer.get_create('SUBJECT_INFO')
+    _add_strings(group, 'SEX', [subject['Sex'].upper()])
+    group.add('AGE', 'Age', 4, '<f', float(subject['Age']))
+
+    valid = ~np.isnan(positions).any(axis=2)
+    point_data = np.zeros(positions.shape[:2] + (5,))
+    point_data[..., :3] = np.nan_to_num(positions)
+    point_data[..., 3] = np.where(valid, 0.5, -1.0)
+    analog = analog.reshape(frames, samples_per_frame, -1).transpose(0, 2, 1)
+
+    writer.add_frames(list(zip(point_data, analog)))
+
+    with open(file_path, 'wb') as handle:
+        writer.write(handle)
+
+
+def _calibration_matrix(plate):
+    # Sensitivities (N/V and Nmm/V) with a little cross-talk between channels.
+    gains = np.array([500.0, 500.0, 1000.0, 400000.0, 300000.0, 150000.0]) * (1 + 0.05 * plate)
+    cross_talk = 0.01 * (np.ones((6, 6)) - np.eye(6))
+    return np.diag(gains) + cross_talk * gains[np.newaxis, :]
+
+
+def _add_strings(group, name, strings):
+    label_length = max(1, *(len(string) for string in strings))
+    group.add_str(name, name, ''.join(string.ljust(label_length) for string in strings), label_length, len(strings))
+
+
+def _add_array(group, name, data):
+    # C3D parameter dimensions are in Fortran order.
+    group.add_param(name, desc=name, bytes_per_element=data.dtype.itemsize, bytes=data.tobytes(),
+                    dimensions=list(data.shape[::-1]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic C3D gait sessions.")
+    parser.add_argument('output_directory', help="Directory to write the sessions to.")
+    parser.add_argument('--lab', default='Sydney', help="Marker set used to label the markers.")
+    parser.add_argument('--sessions', type=int, default=1, help="Number of sessions.")
+    parser.add_argument('--trials', type=int, default=3, help="Number of walking trials per session.")
+    parser.add_argument('--frames', type=int, default=600, help="Number of frames per walking trial.")
+    parser.add_argument('--point-rate', type=float, default=100.0, help="Marker sample rate (Hz).")
+    parser.add_argument('--analog-rate', type=float, default=1000.0, help="Analog sample rate (Hz).")
+    parser.add_argument('--plates', type=int, default=3, help="Number of force plates.")
+    parser.add_argument('--calibrated', action='store_true',
+                        help="Write the plate outputs in volts, with calibration matrices.")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed.")
+    args = parser.parse_args()
+
+    # A batch manifest for the generated sessions.
+    manifest = {'output_directory': 'outputs', 'defaults': {'lab': args.lab, 'marker_diameter': MARKER_DIAMETER},
+                'sessions': []}
+    for i in range(args.sessions):
+        name = f'session_{i + 1:02d}'
+        static_trial, dynamic_trials, static_data = create_session(
+            os.path.join(args.output_directory, name), args.lab, args.trials, args.frames, args.point_rate,
+            args.analog_rate, args.plates, args.calibrated, seed=args.seed + 100 * i)
+        manifest['sessions'].append({'name': name, 'input_directory': name, 'static_trial': static_trial,
+                                     'dynamic_trials': dynamic_trials, 'static_data': static_data})
+
+    with open(os.path.join(args.output_directory, 'manifest.json'), 'w') as file:
+        json.dump(manifest, file, indent=4)
+    print(f"Wrote {args.sessions} session(s) to {args.output_directory}.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+"""
+Measures the throughput of complete sessions processed by the batch runner.
+
+Synthetic sessions (a static trial and a number of walking trials each) are generated for every
+combination of trial count and trial length, then processed with each number of workers by
+`run_batch`, which runs `parse_session` and writes the normalised and spatio-temporal outputs, as
+"Finalise Outputs" does. For every run the report records the sessions and trials processed per
+hour, the speedup and parallel efficiency relative to the fewest workers, and the wall time, CPU
+time and queueing time of each stage, summed over the sessions. Speedup and efficiency aren't
+reported for runs in which sessions failed, and the benchmark then exits with a non-zero status.
+
+The stand-in backend is used by default, so that OpenSim isn't needed. Give it the latency of
+OpenSim on the target machine (e.g. `--latency model_fit=20 ik=0.005 id=0.002`) for representative
+numbers, or use `--backend opensim`.
+
+Usage: python benchmarks/throughput_benchmark.py [--trials N [N ...]] [--frames N [N ...]] [--workers N [N ...]]
+       [--sessions N] [--lab LAB] [--backend NAME] [--latency STEP=SECONDS [...]] [--directory DIRECTORY]
+       [--json FILE]
+"""
+
+import os
+import sys
+import json
+import argparse
+import tempfile
+
+from c3d_parser.batch import load_manifest, run_batch
+from c3d_parser.core.backends import BACKENDS
+from c3d_parser.core.timing import TIMINGS_FILE, stage_totals
+
+from core_benchmark import environment
+from synthetic_session import MARKER_DIAMETER, create_session
+
+
+def create_sessions(directory, count, trials, frames, lab, seed=0):
+    """
+    Writes `count` synthetic sessions to `directory`, returning their manifest entries.
+    """
+    sessions = []
+    for i in range(count):
+        name = f'session_{i + 1:02d}'
+        static_trial, dynamic_trials, static_data = create_session(os.path.join(directory, name), lab, trials, frames,
+                                                                   seed=seed + 100 * i)
+        sessions.append({'name': name, 'input_directory': name, 'static_trial': static_trial,
+                         'dynamic_trials': dynamic_trials, 'static_data': static_data})
+
+    return sessions
+
+
+def session_stages(sessions):
+    """
+    Returns the totals of the pipeline stages, and of the steps within them, over the
+    'stage_timings.json' files of the sessions.
+    """
+    records = []
+    for session in sessions:
+        timings_file = os.path.join(session['output_directory'], TIMINGS_FILE)
+        if os.path.exists(timings_file):
+            with open(timings_file, 'r') as file:
+                records += json.load(file)['records']
+
+    return (stage_totals([record for record in records if 'parent' not in record]),
+            stage_totals([record for record in records if 'parent' in record]))
+
+
+def run(trial_counts, frame_counts, worker_counts, session_count, lab, backend, backend_options, directory):
+    results = []
+    for trials in trial_counts:
+        for frames in frame_counts:
+            input_directory = os.path.join(directory, f'trials_{trials}_frames_{frames}')
+            definitions = create_sessions(input_directory, session_count, trials, frames, lab)
+
+            base = None
+            for workers in sorted(worker_counts):
+                manifest = {'output_directory': f'outputs_{workers}_workers',
+                            'defaults': {'lab': lab, 'marker_diameter': MARKER_DIAMETER, 'backend': backend,
+                                         'backend_options': backend_options},
+                            'sessions': definitions}
+                manifest_file = os.path.join(input_directory, f'manifest_{workers}_workers.json')
+                with open(manifest_file, 'w') as file:
+                    json.dump(manifest, file, indent=4)
+
+                sessions, _ = load_manifest(manifest_file)
+                print(f"Processing {session_count} session(s) of {trials} trial(s) of {frames} frames "
+                      f"with {workers} worker(s).", flush=True)
+                _, report = run_batch(sessions, workers)
+
+                stages, steps = session_stages(sessions)
+                for name, stage in stages.items():
+                    if name in report['stages']:
+                        stage['queue_wait'] = report['stages'][name]['queue_wait']
+                result = {'trials': trials, 'frames': frames, 'workers': workers, 'sessions': session_count,
+                          'succeeded': report['succeeded'], 'failed': report['failed'],
+                          'duration': report['duration'], 'sessions_per_hour': report['sessions_per_hour'],
+                          'trials_per_hour': report['trials_per_hour'], 'stages': stages, 'steps': steps}
+
+                # Speedup and efficiency are relative to the run with the fewest workers, and only
+                # comparable when every session of both runs succeeded.
+                if base is None:
+                    base = result
+                result['speedup'] = None
+                result['parallel_efficiency'] = None
+                if not result['failed'] and not base['failed'] and result['duration']:
+                    result['speedup'] = base['duration'] / result['duration']
+                    result['parallel_efficiency'] = result['speedup'] * base['workers'] / workers
+                results.append(result)
+                print_result(result)
+
+    return results
+
+
+def print_result(result):
+    scaling = "speedup n/a, efficiency n/a"
+    if result['speedup'] is not None:
+        scaling = f"speedup x{result['speedup']:.2f}, efficiency {result['parallel_efficiency']:.0%}"
+    print(f"{result['trials']:>3} trial(s) x {result['frames']:>5} frames, {result['workers']:>2} worker(s): "
+          f"{result['duration']:8.1f} s, {result['sessions_per_hour']:8.1f} sessions/h, "
+          f"{result['trials_per_hour']:8.1f} trials/h, {scaling}", flush=True)
+    if result['failed']:
+        print(f"    {result['failed']} session(s) failed, see the session logs.")
+    total = sum(stage['wall_time'] for stage in result['stages'].values()) or 1.0
+    for name, stage in result['stages'].items():
+        print(f"    {name:<14} {stage['wall_time']:8.2f} s wall ({stage['wall_time'] / total:4.0%}), "
+              f"{stage['cpu_time']:8.2f} s CPU, {stage.get('queue_wait', 0.0):8.2f} s queued")
+
+
+def parse_latency(values):
+    latency = {}
+    for value in values or []:
+        step, _, seconds = value.partition('=')
+        latency[step] = float(seconds)
+
+    return latency
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the throughput of complete sessions.")
+    parser.add_argument('--trials', type=int, nargs='+', default=[1, 4], help="Walking trials per session.")
+    parser.add_argument('--frames', type=int, nargs='+', default=[600, 2400],
+                        help="Walking trial lengths in frames (at 100 Hz).")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4],
+                        help="Numbers of sessions processed concurrently.")
+    parser.add_argument('--sessions', type=int, default=4, help="Number of sessions processed in each run.")
+    parser.add_argument('--lab', default='Sydney', help="Marker set of the synthetic sessions.")
+    parser.add_argument('--backend', choices=list(BACKENDS), default='stand-in',
+                        help="Backend used for model fitting, IK and ID.")
+    parser.add_argument('--latency', nargs='+', metavar='STEP=SECONDS',
+                        help="Stand-in backend latency: seconds for model_fit, seconds per frame for ik, "
+                             "foot_progression and id.")
+    parser.add_argument('--directory', help="Keep the sessions and outputs in this directory "
+                                            "(default: a temporary directory).")
+    parser.add_argument('--json', help="Optional path to write the report to.")
+    args = parser.parse_args()
+
+    backend_options = {}
+    if args.backend == 'stand-in':
+        backend_options['latency'] = parse_latency(args.latency)
+
+    if args.directory:
+        results = run(args.trials, args.frames, args.workers, args.sessions, args.lab, args.backend,
+                      backend_options, os.path.abspath(args.directory))
+    else:
+        with tempfile.TemporaryDirectory() as directory:
+            results = run(args.trials, args.frames, args.workers, args.sessions, args.lab, args.backend,
+                          backend_options, directory)
+
+    if args.json:
+        report = {'environment': {**environment(), 'cpu_count': os.cpu_count()}, 'backend': args.backend,
+                  'backend_options': backend_options, 'results': results}
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    failed = sum(result['failed'] for result in results)
+    if failed:
+        print(f"{failed} session(s) failed, so the speedup and efficiency of their runs are not reported.")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
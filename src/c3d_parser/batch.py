@@ -0,0 +1,339 @@
+
+import os
+import sys
+import json
+import time
+import signal
+import argparse
+import traceback
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, CancelledError, as_completed
+
+from c3d_parser.core.backends import BACKENDS, get_backend
+from c3d_parser.core.scheduler import ResourceBudget, null_stage, estimate_session_size, build_run_report
+
+
+output_directory_name = 'c3d_parser_output'
+
+# Session options and their defaults, matching the defaults of the main window.
+DEFAULT_OPTIONS = {
+    'lab': None,
+    'marker_diameter': 14.0,
+    'left_foot_flat': True,
+    'right_foot_flat': True,
+    'toe_marker_proximal': False,
+    'optimise_knee_axis': False,
+    'filter_trc': True,
+    'filter_grf': True,
+    'ik_task_set': None,
+    'running_gait': False,
+    'output_columnar': False,
+    'profile_stages': False,
+    'trace_memory': False,
+    'backend': 'opensim',
+    'backend_options': {},
+}
+
+
+# Resource budget shared by the stages of every session, and the event that cancels the run, set
+# when a worker process starts.
+_budget = None
+_cancel_event = None
+
+
+def _initialise_worker(budget, cancel_event):
+    global _budget, _cancel_event
+    _budget = budget
+    _cancel_event = cancel_event
+
+    # Use the application's settings directory, so the marker sets (including custom ones) are
+    # shared with the GUI, and seed it with the bundled marker sets on a fresh install.
+    from PySide6.QtCore import QCoreApplication
+    from c3d_parser.settings.general import set_applications_settings, setup_marker_maps_dir
+    set_applications_settings(QCoreApplication)
+    setup_marker_maps_dir()
+
+
+class _ProgressSignal:
+
+    def __init__(self, callback):
+        self._callback = callback
+
+    def emit(self, *args):
+        self._callback(*args)
+
+
+class ProgressTracker:
+    """
+    Stand-in for the GUI progress tracker, so the parser can run without Qt. Progress messages are
+    written to the session log.
+    """
+
+    def __init__(self, session_name):
+        from c3d_parser.settings.logging import logger
+        self.progress = _ProgressSignal(lambda message, colour: logger.info(f"[{session_name}] {message}."))
+
+
+def load_manifest(manifest_file):
+    """
+    Reads a batch manifest, returning the list of session definitions with the defaults applied
+    and paths resolved relative to the manifest, and the scheduler settings.
+
+    The manifest is a JSON object with a list of "sessions" and optional "defaults" (any of the
+    session options), "output_directory" and "scheduler" settings ("cpu_budget",
+    "memory_budget" in MB and per-stage "stages" profiles of "cpu" and "memory"). A
+    "cache_directory" enables the stage cache shared by all sessions (see `StageCache`). Each
+    session defines "input_directory", "static_trial", "static_data" (the subject measurements)
+    and optionally "name", "dynamic_trials" (all dynamic C3D files in the input directory if
+    omitted), "output_directory" and any session options.
+    """
+    with open(manifest_file, encoding='utf-8') as file:
+        manifest = json.load(file)
+
+    manifest_directory = os.path.dirname(os.path.abspath(manifest_file))
+    defaults = {**DEFAULT_OPTIONS, **manifest.get('defaults', {})}
+    output_root = manifest.get('output_directory')
+    cache_directory = manifest.get('cache_directory')
+    if cache_directory:
+        cache_directory = os.path.join(manifest_directory, cache_directory)
+
+    sessions = []
+    for index, definition in enumerate(manifest['sessions'], start=1):
+        session = {**defaults, **definition}
+        session['input_directory'] = os.path.join(manifest_directory, session['input_directory'])
+        session.setdefault('name', os.path.basename(os.path.normpath(session['input_directory'])) or f"session_{index}")
+        if 'output_directory' in definition:
+            session['output_directory'] = os.path.join(manifest_directory, definition['output_directory'])
+        elif output_root:
+            session['output_directory'] = os.path.join(manifest_directory, output_root, session['name'])
+        else:
+            session['output_directory'] = os.path.join(session['input_directory'], output_directory_name)
+        session['cache_directory'] = cache_directory
+        if session['ik_task_set']:
+            session['ik_task_set'] = os.path.join(manifest_directory, session['ik_task_set'])
+
+        missing = [key for key in ['static_trial', 'static_data', 'lab'] if not session.get(key)]
+        if missing:
+            raise ValueError(f"Session {session['name']} is missing: {', '.join(missing)}")
+        sessions.append(session)
+
+    return sessions, manifest.get('scheduler', {})
+
+
+def run_session(session):
+    """
+    Parses one session and writes its normalised and spatio-temporal outputs. Returns a summary
+    with the session name, status ("success" or "failed"), message and duration.
+    """
+    from c3d_parser.core.c3d_parser import (parse_session, is_dynamic, CancelException, CancellationToken,
+                                            write_normalised_grfs, write_normalised_kinematics,
+                                            write_normalised_kinetics, write_spatiotemporal_data)
+    from c3d_parser.core.export import write_columnar_outputs
+    from c3d_parser.core.stage_cache import StageCache
+    from c3d_parser.core.timing import StageTimer
+    from c3d_parser.settings.logging import logger, add_log_file, filter_c3d_warnings
+
+    start_time = time.time()
+    name = session['name']
+    output_directory = session['output_directory']
+    if not os.path.exists(output_directory):
+        os.makedirs(output_directory)
+    # The output directory is cleared by the parser, so the session log is kept beside it.
+    log_file = os.path.join(os.path.dirname(os.path.normpath(output_directory)), f"{name}_batch.log")
+    handler = add_log_file(log_file)
+    filter_c3d_warnings()
+
+    cancel_token = CancellationToken(_cancel_event)
+    stages = []
+    stage = null_stage if _budget is None else (lambda stage_name: _budget.stage(stage_name, stages))
+
+    summary = {'session': name, 'log_file': log_file, 'stages': stages, 'trials': 0}
+    try:
+        input_directory = session['input_directory']
+        dynamic_trials = session.get('dynamic_trials')
+        if dynamic_trials is None:
+            dynamic_trials = sorted(file for file in os.listdir(input_directory)
+                                    if file.lower().endswith('.c3d') and file != session['static_trial']
+                                    and is_dynamic(os.path.join(input_directory, file)))
+
+        # Cap age at 18, as in the main window.
+        static_data = dict(session['static_data'])
+        if 'Age' in static_data:
+            static_data['Age'] = min(static_data['Age'], 18)
+
+        result = parse_session(session['static_trial'], dynamic_trials, input_directory, output_directory,
+                               session['lab'], session['marker_diameter'], static_data, session['left_foot_flat'],
+                               session['right_foot_flat'], session['toe_marker_proximal'],
+                               session['optimise_knee_axis'], session['filter_trc'], session['filter_grf'],
+                               session['ik_task_set'], session['running_gait'], ProgressTracker(name), stage,
+                               StageCache(session.get('cache_directory'), session.get('force', False)),
+                               session.get('resume', False), cancel_token, session['profile_stages'],
+                               session['trace_memory'],
+                               get_backend(session['backend'], **session['backend_options']))
+        grf_data, kinematic_data, kinetic_data, s_t_data, deidentified_file_names = result
+
+        cancel_token.raise_if_cancelled()
+        timer = StageTimer()
+        with stage('write'), timer.time('write'):
+            write_normalised_grfs(grf_data, deidentified_file_names, set(), output_directory)
+            write_normalised_kinematics(kinematic_data, deidentified_file_names, set(), output_directory)
+            write_normalised_kinetics(kinetic_data, deidentified_file_names, set(), output_directory)
+            write_spatiotemporal_data(s_t_data, deidentified_file_names, output_directory)
+            if session['output_columnar']:
+                write_columnar_outputs(grf_data, kinematic_data, kinetic_data, s_t_data, deidentified_file_names,
+                                       {'grf': set(), 'kinematics': set(), 'kinetics': set()}, output_directory)
+        timer.write(output_directory, append=True)
+
+        logger.info(f"Final outputs written to {output_directory}.")
+        summary.update(status="success", message=f"{len(deidentified_file_names)} dynamic trial(s) processed",
+                       trials=len(deidentified_file_names))
+    except CancelException as e:
+        logger.info(e)
+        summary.update(status="cancelled" if cancel_token.cancelled else "failed", message=str(e))
+    except Exception as e:
+        logger.error(f"Session {name} failed: {e}\n{traceback.format_exc()}")
+        summary.update(status="failed", message=str(e))
+    finally:
+        handler.close()
+        logger.base_logger.removeHandler(handler)
+
+    summary['duration'] = time.time() - start_time
+    return summary
+
+
+def run_batch(sessions, workers=None, cpu_budget=None, memory_budget=None, stage_profiles=None):
+    """
+    Runs the sessions concurrently in `workers` processes (one per CPU by default), returning the
+    summary of each session in manifest order and the run report.
+
+    The stages of all sessions share a CPU and memory budget (see `ResourceBudget`), and the
+    largest sessions are started first.
+
+    On a keyboard interrupt the sessions that haven't started are dropped and the running
+    sessions stop before their next stage.
+    """
+    workers = workers or os.cpu_count() or 1
+    summaries = {}
+
+    # Spawn fresh processes so no Qt or OpenSim state is shared with the parent.
+    context = multiprocessing.get_context('spawn')
+    budget = ResourceBudget(context, cpu_budget, memory_budget, stage_profiles)
+    cancel_event = context.Event()
+    ordered_sessions = sorted(sessions, key=estimate_session_size, reverse=True)
+
+    def collect(futures):
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                summary = future.result()
+            except CancelledError:
+                summary = {'session': name, 'status': "cancelled", 'message': "Not started", 'duration': 0.0}
+            except Exception as e:
+                summary = {'session': name, 'status': "failed", 'message': f"Worker error: {e}", 'duration': 0.0}
+            summaries[name] = summary
+            print(f"{summary['status'].upper():9} {name} ({summary['duration']:.1f} s): {summary['message']}",
+                  flush=True)
+
+    start_time = time.time()
+    with ProcessPoolExecutor(max_workers=min(workers, len(sessions)) or 1, mp_context=context,
+                             initializer=_initialise_worker, initargs=(budget, cancel_event)) as executor:
+        # Interrupts are handled by the main process, which cancels the sessions through the
+        # event. The workers are started while interrupts are ignored, so they inherit that.
+        handler = signal.signal(signal.SIGINT, signal.SIG_IGN)
+        try:
+            futures = {executor.submit(run_session, session): session['name'] for session in ordered_sessions}
+        finally:
+            signal.signal(signal.SIGINT, handler)
+        try:
+            collect(futures)
+        except KeyboardInterrupt:
+            print("Cancelling: waiting for the running sessions to stop.", file=sys.stderr, flush=True)
+            cancel_event.set()
+            for future in futures:
+                future.cancel()
+            collect({future: name for future, name in futures.items() if name not in summaries})
+
+    summaries = [summaries[session['name']] for session in sessions]
+    return summaries, build_run_report(summaries, start_time, time.time(), budget)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='c3d_parser-batch',
+                                     description="Process the gait sessions listed in a manifest without the GUI.")
+    parser.add_argument('manifest', help="JSON manifest of the sessions to process.")
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help="Number of sessions to process concurrently (default: number of CPUs).")
+    parser.add_argument('--cpu-budget', type=float, default=None,
+                        help="CPU cores shared by the running stages (default: number of CPUs).")
+    parser.add_argument('--memory-budget', type=float, default=None,
+                        help="Memory (MB) shared by the running stages (default: unlimited).")
+    parser.add_argument('--cache-directory', default=None,
+                        help="Reuse stage outputs cached in this directory (default: the manifest's cache_directory).")
+    rerun = parser.add_mutually_exclusive_group()
+    rerun.add_argument('--force', action='store_true', help="Recompute every stage, replacing any cached outputs.")
+    rerun.add_argument('--resume', action='store_true',
+                       help="Resume interrupted sessions, skipping the stages they completed.")
+    parser.add_argument('--columnar', action='store_true',
+                        help="Also write the normalised cycles and spatio-temporal data as columnar files "
+                             "(Parquet, or NPZ without pyarrow).")
+    parser.add_argument('--profile', action='store_true',
+                        help="Profile every stage with cProfile, writing the results to each session's "
+                             "diagnostics folder.")
+    parser.add_argument('--trace-memory', action='store_true',
+                        help="With --profile, also trace the memory allocations of every stage with tracemalloc.")
+    parser.add_argument('--backend', choices=list(BACKENDS), default=None,
+                        help="Backend used for model fitting, IK and ID (default: opensim). The stand-in backend "
+                             "runs without OpenSim, producing placeholder results for benchmarking.")
+    parser.add_argument('--summary', default=None, help="Write the session summaries to this JSON file.")
+    parser.add_argument('--report', default=None,
+                        help="Write the run report to this JSON file (default: next to the manifest).")
+    args = parser.parse_args(argv)
+
+    try:
+        sessions, scheduler = load_manifest(args.manifest)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Invalid manifest: {e}", file=sys.stderr)
+        return 2
+
+    names = [session['name'] for session in sessions]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        print(f"Invalid manifest: duplicate session names: {', '.join(duplicates)}", file=sys.stderr)
+        return 2
+
+    for session in sessions:
+        if args.cache_directory:
+            session['cache_directory'] = os.path.abspath(args.cache_directory)
+        session['force'] = args.force
+        session['resume'] = args.resume
+        if args.columnar:
+            session['output_columnar'] = True
+        if args.profile:
+            session['profile_stages'] = True
+        if args.trace_memory:
+            session['trace_memory'] = True
+        if args.backend:
+            session['backend'] = args.backend
+
+    cpu_budget = args.cpu_budget or scheduler.get('cpu_budget')
+    memory_budget = args.memory_budget or scheduler.get('memory_budget')
+    summaries, report = run_batch(sessions, args.workers, cpu_budget, memory_budget, scheduler.get('stages'))
+
+    report_file = args.report or os.path.join(os.path.dirname(os.path.abspath(args.manifest)),
+                                              'c3d_parser_batch_report.json')
+    with open(report_file, 'w', encoding='utf-8') as file:
+        json.dump(report, file, indent=4)
+    if args.summary:
+        with open(args.summary, 'w', encoding='utf-8') as file:
+            json.dump(summaries, file, indent=4)
+
+    failed = [summary['session'] for summary in summaries if summary['status'] != "success"]
+    print(f"{len(summaries) - len(failed)} of {len(summaries)} session(s) processed successfully.")
+
+    if any(summary['status'] == "cancelled" for summary in summaries):
+        return 130
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
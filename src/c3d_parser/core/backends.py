@@ -0,0 +1,265 @@
+
+import os
+import abc
+import time
+import numpy as np
+import pandas as pd
+
+from trc import TRCData
+
+
+# Duration of the stand-in backend's gait cycle (s).
+STAND_IN_CYCLE_DURATION = 1.1
+
+_pelvis_coordinates = ['pelvis_tilt', 'pelvis_list', 'pelvis_rotation']
+_pelvis_translations = ['pelvis_tx', 'pelvis_ty', 'pelvis_tz']
+_joint_coordinates = ['hip_flexion', 'hip_adduction', 'hip_rotation', 'knee_flexion', 'knee_adduction',
+                      'knee_rotation', 'ankle_angle', 'subtalar_angle']
+
+# Mean, and amplitudes of the first and second harmonics (deg), of each joint angle over the
+# stand-in gait cycle, and the moment arm (m) of the vertical ground reaction force about it.
+_joint_curves = {
+    'hip_flexion': (10.0, (25.0, 0.0), (0.0, 0.0), 0.08),
+    'hip_adduction': (0.0, (0.0, 4.0), (2.0, 0.0), 0.06),
+    'hip_rotation': (2.0, (0.0, 5.0), (0.0, 0.0), 0.01),
+    'knee_flexion': (25.0, (-20.0, 0.0), (10.0, 5.0), 0.05),
+    'knee_adduction': (0.0, (0.0, 2.0), (0.0, 0.0), 0.03),
+    'knee_rotation': (0.0, (0.0, 5.0), (0.0, 0.0), 0.005),
+    'ankle_angle': (0.0, (-5.0, 0.0), (0.0, 5.0), 0.1),
+    'subtalar_angle': (0.0, (0.0, 5.0), (0.0, 0.0), 0.01),
+}
+_pelvis_curves = {
+    'pelvis_tilt': (10.0, (0.0, 0.0), (0.0, 2.0)),
+    'pelvis_list': (0.0, (0.0, 4.0), (0.0, 0.0)),
+    'pelvis_rotation': (0.0, (6.0, 0.0), (0.0, 0.0)),
+}
+
+# Landmarks predicted by the shape model, and the markers the stand-in backend places them at.
+_landmark_markers = {
+    'ASIS': ['{side}ASI'], 'PSIS': ['{side}PSI', 'SACR'], 'LEC': ['{side}KNE'], 'MEC': ['{side}KNEM'],
+    'malleolus_lat': ['{side}ANK'], 'malleolus_med': ['{side}MED'],
+}
+
+
+class KinematicsBackend(abc.ABC):
+    """
+    Fits the subject's model and runs IK, foot progression and ID for the pipeline.
+
+    `create_model` returns the path of the fitted model, `inverse_kinematics` writes the
+    coordinates of a TRC file to a '.mot' file, `foot_progression_angles` returns the foot
+    progression angles of an IK solution, and `inverse_dynamics` writes the generalised forces of
+    an IK solution and GRF file to a '.sto' file. `name` identifies the backend in cached stage
+    outputs, so results of different backends are never mixed.
+    """
+
+    name = None
+
+    @abc.abstractmethod
+    def create_model(self, static_trc, dynamic_trc, output_directory, static_marker_data, subject_info,
+                     marker_radius, left_foot_flat, right_foot_flat, toe_marker_proximal, optimise_knee_axis,
+                     progress_tracker):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def inverse_kinematics(self, model_file, trc_file, output_file, ik_task_set=None):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def foot_progression_angles(self, model_file, ik_file):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def inverse_dynamics(self, model_file, ik_file, grf_file, output_file):
+        raise NotImplementedError
+
+
+class OpenSimBackend(KinematicsBackend):
+    """
+    Fits the model with the articulated shape model and runs IK and ID with the OpenSim API.
+    OpenSim is only imported when the backend is first used.
+    """
+
+    name = 'opensim'
+
+    def create_model(self, static_trc, dynamic_trc, output_directory, static_marker_data, subject_info,
+                     marker_radius, left_foot_flat, right_foot_flat, toe_marker_proximal, optimise_knee_axis,
+                     progress_tracker):
+        from opensim_model_creator.Create_Model import create_model
+
+        return create_model(static_trc, dynamic_trc, output_directory, static_marker_data, subject_info,
+                            marker_radius, left_foot_flat, right_foot_flat, toe_marker_proximal=toe_marker_proximal,
+                            optimise_knee_axis=optimise_knee_axis, progress_tracker=progress_tracker)
+
+    def inverse_kinematics(self, model_file, trc_file, output_file, ik_task_set=None):
+        from c3d_parser.core.osim import perform_ik
+
+        perform_ik(model_file, trc_file, output_file, ik_task_set)
+
+    def foot_progression_angles(self, model_file, ik_file):
+        from c3d_parser.core.osim import calculate_foot_progression_angles
+
+        return calculate_foot_progression_angles(model_file, ik_file)
+
+    def inverse_dynamics(self, model_file, ik_file, grf_file, output_file):
+        from c3d_parser.core.osim import perform_id
+
+        perform_id(model_file, ik_file, grf_file, output_file)
+
+
+class StandInBackend(KinematicsBackend):
+    """
+    A deterministic stand-in for OpenSim, for running and profiling the pipeline without it.
+
+    The model is a placeholder file, with the predicted landmarks placed at the static trial's
+    markers. IK writes typical gait joint angles over a fixed gait cycle, with the pelvis
+    translation following the ASIS markers of the TRC file, and ID writes joint moments
+    proportional to the vertical ground reaction forces. The outputs have the same layout as
+    OpenSim's, but aren't meaningful.
+
+    `latency` sets how long each step takes: 'model_fit' in seconds, and 'ik',
+    'foot_progression' and 'id' in seconds per frame. With `cpu_bound` set the backend keeps the
+    CPU busy for that time, as OpenSim does, instead of sleeping.
+    """
+
+    name = 'stand-in'
+
+    def __init__(self, latency=None, cpu_bound=True):
+        self.latency = {'model_fit': 0.0, 'ik': 0.0, 'foot_progression': 0.0, 'id': 0.0}
+        if latency is not None:
+            unknown = set(latency) - set(self.latency)
+            if unknown:
+                raise ValueError(f"Unknown stand-in backend step(s): {', '.join(sorted(unknown))}")
+            self.latency.update(latency)
+        self.cpu_bound = cpu_bound
+
+    def create_model(self, static_trc, dynamic_trc, output_directory, static_marker_data, subject_info,
+                     marker_radius, left_foot_flat, right_foot_flat, toe_marker_proximal, optimise_knee_axis,
+                     progress_tracker):
+        self._wait(self.latency['model_fit'])
+
+        mesh_directory = os.path.join(output_directory, 'Models', 'Meshes')
+        if not os.path.exists(mesh_directory):
+            os.makedirs(mesh_directory)
+
+        for side in ['Left', 'Right']:
+            landmarks = {}
+            for landmark, markers in _landmark_markers.items():
+                names = [marker.format(side=side[0]) for marker in markers]
+                name = next((name for name in names if name in static_marker_data), None)
+                if name is not None:
+                    landmarks[landmark] = np.asarray(static_marker_data[name]) / 1000
+            with open(os.path.join(mesh_directory, f'predicted_lms_{side.lower()}.txt'), 'w') as file:
+                for landmark, position in landmarks.items():
+                    file.write(f"{landmark} {position[0]:.6f} {position[1]:.6f} {position[2]:.6f}\n")
+        with open(os.path.join(mesh_directory, 'asm_fit_metrics.txt'), 'w') as file:
+            file.write("Side, MAE, RMSE\nLeft, 0, 0\nRight, 0, 0\n")
+
+        model_file = os.path.join(output_directory, 'Models', 'stand_in_model.osim')
+        with open(model_file, 'w') as file:
+            file.write('<?xml version="1.0" encoding="UTF-8" ?>\n'
+                       '<OpenSimDocument Version="40000">\n\t<Model name="stand_in_model" />\n</OpenSimDocument>\n')
+
+        return model_file
+
+    def inverse_kinematics(self, model_file, trc_file, output_file, ik_task_set=None):
+        trc_data = TRCData()
+        trc_data.load(trc_file)
+        time_values = np.asarray(trc_data['Time'], dtype=float)
+        self._wait(self.latency['ik'] * len(time_values))
+
+        phase = 2 * np.pi * time_values / STAND_IN_CYCLE_DURATION
+        coordinates = {'time': time_values}
+        for name, curve in _pelvis_curves.items():
+            coordinates[name] = _harmonics(phase, *curve)
+        # The pelvis follows the ASIS markers (mm) in the model's coordinate system (m).
+        if 'LASI' in trc_data and 'RASI' in trc_data:
+            pelvis = (np.asarray(trc_data['LASI'], dtype=float) + np.asarray(trc_data['RASI'], dtype=float)) / 2000
+        else:
+            pelvis = np.zeros((len(time_values), 3))
+        for i, name in enumerate(_pelvis_translations):
+            coordinates[name] = pelvis[:, i]
+        for side, offset in [('r', np.pi), ('l', 0.0)]:
+            for name in _joint_coordinates:
+                mean, first, second, _ = _joint_curves[name]
+                coordinates[f'{name}_{side}'] = _harmonics(phase + offset, mean, first, second)
+
+        _write_storage(output_file, 'Coordinates', pd.DataFrame(coordinates), in_degrees=True)
+
+    def foot_progression_angles(self, model_file, ik_file):
+        ik_data = _read_storage(ik_file)
+        self._wait(self.latency['foot_progression'] * len(ik_data))
+
+        phase = 2 * np.pi * ik_data['time'].values / STAND_IN_CYCLE_DURATION
+        return pd.DataFrame({
+            "foot_progression_l": -10.0 + 3.0 * np.sin(phase),
+            "foot_progression_r": -10.0 + 3.0 * np.sin(phase + np.pi),
+        })
+
+    def inverse_dynamics(self, model_file, ik_file, grf_file, output_file):
+        ik_data = _read_storage(ik_file)
+        grf_data = _read_storage(grf_file)
+        self._wait(self.latency['id'] * len(ik_data))
+
+        time_values = ik_data['time'].values
+        phase = 2 * np.pi * time_values / STAND_IN_CYCLE_DURATION
+        vertical_forces = {side: np.interp(time_values, grf_data['time'].values, grf_data[column].values)
+                           for side, column in [('l', 'ground_force_vy'), ('r', '1_ground_force_vy')]}
+
+        forces = {'time': time_values}
+        for name in _pelvis_coordinates:
+            forces[f'{name}_moment'] = np.zeros(len(time_values))
+        forces['pelvis_tx_force'] = np.zeros(len(time_values))
+        forces['pelvis_ty_force'] = vertical_forces['l'] + vertical_forces['r']
+        forces['pelvis_tz_force'] = np.zeros(len(time_values))
+        for side, offset in [('r', np.pi), ('l', 0.0)]:
+            for index, name in enumerate(_joint_coordinates):
+                moment_arm = _joint_curves[name][3]
+                forces[f'{name}_{side}_moment'] = moment_arm * vertical_forces[side] * np.cos(phase + offset + index)
+
+        _write_storage(output_file, 'Inverse Dynamics Generalized Forces', pd.DataFrame(forces), in_degrees=False)
+
+    def _wait(self, seconds):
+        if seconds <= 0:
+            return
+        if not self.cpu_bound:
+            time.sleep(seconds)
+            return
+        end_time = time.perf_counter() + seconds
+        while time.perf_counter() < end_time:
+            pass
+
+
+BACKENDS = {backend.name: backend for backend in [OpenSimBackend, StandInBackend]}
+
+
+def get_backend(name='opensim', **options):
+    """
+    Returns the backend registered as `name` in `BACKENDS`, created with `options`.
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend: {name}. Expected one of: {', '.join(BACKENDS)}")
+
+    return BACKENDS[name](**options)
+
+
+def _harmonics(phase, mean, first, second):
+    # Cosine and sine amplitudes of the first and second harmonics of the phase.
+    return (mean + first[0] * np.cos(phase) + first[1] * np.sin(phase) + second[0] * np.cos(2 * phase)
+            + second[1] * np.sin(2 * phase))
+
+
+def _write_storage(file_path, title, data, in_degrees):
+    with open(file_path, 'w') as file:
+        file.write(f"{title}\nversion=1\nnRows={len(data)}\nnColumns={len(data.columns)}\n"
+                   f"inDegrees={'yes' if in_degrees else 'no'}\nendheader\n")
+        file.write('\t'.join(data.columns) + '\n')
+        np.savetxt(file, data.values, fmt='%0.8f', delimiter='\t')
+
+
+def _read_storage(file_path):
+    # OpenSim storage files (.mot and .sto) have a header that ends with 'endheader'.
+    with open(file_path, 'r') as file:
+        for line in file:
+            if line.strip() == "endheader":
+                break
+        return pd.read_csv(file, sep=r'\s+')
@@ -1,26 +1,35 @@
 
 import os
 import re
-import copy
 import math
 import json
 import logging
+import threading
 import numpy as np
 import pandas as pd
 
 from datetime import datetime
-from collections import defaultdict
 from scipy import signal, interpolate
 from scipy.spatial.transform import Rotation
-from decimal import Decimal, ROUND_CEILING, ROUND_FLOOR
 
 from trc import TRCData
-from opensim_model_creator.Create_Model import create_model
 from ll_visualiser.utils import get_fit_metrics, load_landmarks, define_measurements
 
 from c3d_parser.core.c3d_patch import c3d
 from c3d_parser.core.utils import clear_directory
-from c3d_parser.core.osim import perform_ik, perform_id, calculate_foot_progression_angles
+from c3d_parser.core.cycles import CycleStore
+from c3d_parser.core.events import EventTable
+from c3d_parser.core.spatiotemporal import calculate_spatiotemporal_data, combine_spatiotemporal_data
+from c3d_parser.core.scheduler import null_stage
+from c3d_parser.core.journal import SessionJournal
+from c3d_parser.core.diagnostics import StageProfiler
+from c3d_parser.core.stage_cache import StageCache
+from c3d_parser.core.timing import StageTimer
+from c3d_parser.core.segmentation import GRF_RULE, KINEMATIC_RULE, KINETIC_RULE, segment_trials, segment_session
+from c3d_parser.core.force_plates import get_plate_geometry
+from c3d_parser.core.grf_stream import GRF_STREAMING_DURATION, stream_grf_data, write_grf_header
+from c3d_parser.core.resampling import get_resampled_times, resample_analog_data
+from c3d_parser.core.backends import OpenSimBackend
 from c3d_parser.settings.general import get_marker_maps_dir
 from c3d_parser.settings.logging import logger
 from c3d_parser.settings.general import VERSION
@@ -34,22 +43,111 @@ class CancelException(Exception):
     pass
 
 
+class CancellationToken:
+    """
+    Lets another thread (or process) stop a running session. The pipeline checks the token
+    between stages, between the steps of each trial's parse and between the chunks of streamed
+    GRF data, and raises CancelException once it is cancelled.
+
+    `event` is the event backing the token: a `threading.Event` by default, or a
+    multiprocessing event to cancel sessions running in worker processes.
+    """
+
+    def __init__(self, event=None):
+        self._event = event if event is not None else threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise CancelException("Processing cancelled.")
+
+
 torso_markers = ["C7", "T2", "T10", "MAN"]
 required_markers = [{"LASI", "RASI"}, {"LKNE", "RKNE"}, {"LANK", "RANK"}, {"LMED", "RMED"}, {"LHEE", "RHEE"},
                     ({"LPSI", "RPSI"}, {"SACR"}), ({"LKNEM", "RKNEM"}, {"LKAX", "RKAX"})]
 
+# Column names of the normalised output files.
+grf_columns = ['anterior_posterior', 'medial_lateral', 'vertical']
+kinematic_columns = ['pelvic_tilt', 'pelvic_obliquity', 'pelvic_rotation',
+                     'hip_flexion', 'hip_adduction', 'hip_rotation',
+                     'knee_flexion', 'ankle_dorsiflexion', 'subtalar_inversion',
+                     'foot_progression']
+kinetic_columns = ['hip_extensor_moment', 'hip_abductor_moment', 'hip_rotator_moment',
+                   'knee_extensor_moment', 'knee_abductor_moment', 'knee_rotator_moment',
+                   'ankle_dorsiflexor_moment', 'subtalar_inverter_moment',
+                   'hip_power', 'knee_power', 'ankle_power']
+
 
 def parse_session(static_trial, dynamic_trials, input_directory, output_directory, lab, marker_diameter, static_data,
                   left_foot_flat, right_foot_flat, toe_marker_proximal, optimise_knee_axis, filter_trc, filter_grf,
-                  ik_task_set, running_gait, progress_tracker):
+                  ik_task_set, running_gait, progress_tracker, stage=null_stage, cache=None, resume=False,
+                  cancel_token=None, profile_stages=False, trace_memory=False, backend=None):
+    """
+    `stage(name)` returns a context manager that each pipeline stage (see `scheduler.STAGES`)
+    runs in, letting a scheduler limit how many heavy stages run at once.
+
+    `cache` is an optional `StageCache`. Stage outputs are then reused from earlier runs with
+    the same inputs, so only the stages whose inputs changed are recomputed.
+
+    Completed stages are recorded in a journal in the output directory. With `resume` set the
+    output directory is kept and stages completed with the same inputs are skipped, so an
+    interrupted session continues from its first incomplete stage.
 
-    clear_directory(output_directory)
+    `cancel_token` is an optional `CancellationToken`, checked before every stage and within
+    the parse of each trial.
+
+    The wall time, CPU time and peak memory of every stage are written to 'stage_timings.json' in
+    the output directory. With `profile_stages` set every stage is also profiled with cProfile (and
+    tracemalloc, with `trace_memory` set), see `StageProfiler`.
+
+    `backend` is the `KinematicsBackend` that fits the model and runs IK and ID (OpenSim by
+    default).
+    """
+    if backend is None:
+        backend = OpenSimBackend()
+    if cache is None:
+        cache = StageCache(None)
+    if cancel_token is None:
+        cancel_token = CancellationToken()
+
+    if not resume:
+        clear_directory(output_directory)
+    journal = SessionJournal(output_directory, resume)
+    timer = StageTimer()
+    profiler = StageProfiler(output_directory, profile_stages, trace_memory)
+
+    def run_stage(name, key, compute, description=None, counts=None):
+        cancel_token.raise_if_cancelled()
+        with timer.time(name, description) as record, profiler.profile(name, description):
+            result, files = journal.run(name, key,
+                                        lambda: cache.run(name, key, output_directory, compute, description),
+                                        description)
+            if counts is not None:
+                record.update(counts(result))
+        return result, files
 
     logger.info(f"Processing session {os.path.normpath(input_directory)}.")
 
     file_path = os.path.normpath(os.path.join(input_directory, static_trial))
-    frame, static_trc_path, height, weight = parse_static_trial(file_path, lab, marker_diameter, output_directory,
-                                                                static_data)
+    marker_map = get_marker_map(lab)
+    static_key = cache.key('parse_static', [file_path], marker_map=marker_map, marker_diameter=marker_diameter,
+                           knee_widths=[static_data['Left Knee Width'], static_data['Right Knee Width']])
+
+    def parse_static():
+        static_frame, trc_file_path, _, _ = parse_static_trial(file_path, lab, marker_diameter, output_directory,
+                                                               static_data)
+        return static_frame, [trc_file_path, os.path.join(output_directory, 'de_identified', 'static.c3d')]
+
+    with stage('parse'):
+        frame, (static_trc_path, _) = run_stage('parse_static', static_key, parse_static, static_trial)
+    height = static_data['Height']
+    weight = static_data['Weight']
 
     marker_data_rate = 100
 
@@ -62,15 +160,34 @@ def parse_session(static_trial, dynamic_trials, input_directory, output_director
     trc_file_paths = {}
     grf_file_paths = {}
     deidentified_file_names = {}
+    stage_keys = {}
 
     progress_tracker.progress.emit("Processing C3D data", "black")
 
     for trial_index, trial in enumerate(dynamic_trials, start=1):
         file_path = os.path.normpath(os.path.join(input_directory, trial))
+        parse_key = cache.key('parse', [file_path], marker_map=marker_map, trial_index=trial_index,
+                              marker_data_rate=marker_data_rate, filter_trc=filter_trc, filter_grf=filter_grf,
+                              running_gait=running_gait,
+                              leg_lengths=[static_data.get('Left Leg Length'), static_data.get('Right Leg Length')])
+
+        def parse_dynamic():
+            *data, trc_path, grf_path = parse_dynamic_trial(file_path, lab, output_directory, trial_index,
+                                                            marker_data_rate, static_data, filter_trc,
+                                                            filter_grf, running_gait, timer,
+                                                            cancel_token=cancel_token)
+            # Streamed trials only return the samples of their force plate cycles, so the number of
+            # samples processed is taken from the GRF step.
+            sample_count = next(record['samples'] for record in reversed(timer.records)
+                                if record['stage'] == 'grf')
+            file_name = os.path.basename(trc_path).rsplit(".", 1)[0]
+            return data + [sample_count], [trc_path, grf_path, os.path.join(output_directory, 'de_identified', f"{file_name}.c3d"),
+                          os.path.join(output_directory, 'events', f"{file_name}.json")]
+
         try:
-            analog_data, events, s_t_data, trc_file_path, grf_file_path = \
-                parse_dynamic_trial(file_path, lab, output_directory, trial_index, marker_data_rate, static_data,
-                                    filter_trc, filter_grf, running_gait)
+            with stage('parse'):
+                (analog_data, events, s_t_data, _), (trc_file_path, grf_file_path, *_) = \
+                    run_stage('parse', parse_key, parse_dynamic, trial, lambda data: {'samples': data[3]})
         except ParserError as e:
             logger.error(e)
             continue
@@ -82,12 +199,29 @@ def parse_session(static_trial, dynamic_trials, input_directory, output_director
         trc_file_paths[trial] = trc_file_path
         grf_file_paths[trial] = grf_file_path
         deidentified_file_names[trial] = os.path.basename(trc_file_path).rsplit(".", 1)[0]
+        stage_keys[trial] = [parse_key]
 
     logger.info("Fitting shape model.")
     dynamic_trc_path = list(trc_file_paths.values())[0] if trc_file_paths else ""
-    osim_model = create_osim_model(static_trc_path, dynamic_trc_path, frame, marker_diameter, static_data,
-                                   output_directory, left_foot_flat, right_foot_flat, toe_marker_proximal,
-                                   optimise_knee_axis, progress_tracker)
+    # The fitted model only depends on the static trial and subject measurements (and the first
+    # dynamic trial if the knee axis is optimised), so it is reused across most option changes.
+    model_key = cache.key('model_fit', [static_trc_path, dynamic_trc_path if optimise_knee_axis else None],
+                          subject_info=get_subject_info(static_data).to_dict('records'),
+                          marker_diameter=marker_diameter, left_foot_flat=left_foot_flat,
+                          right_foot_flat=right_foot_flat, toe_marker_proximal=toe_marker_proximal,
+                          optimise_knee_axis=optimise_knee_axis, backend=backend.name)
+
+    def fit_model():
+        model_path = create_osim_model(static_trc_path, dynamic_trc_path, frame, marker_diameter, static_data,
+                                       output_directory, left_foot_flat, right_foot_flat, toe_marker_proximal,
+                                       optimise_knee_axis, progress_tracker, backend)
+        model_files = [os.path.join(root, file) for root, _, files in
+                       os.walk(os.path.join(output_directory, 'Models')) for file in files]
+        return os.path.relpath(os.path.abspath(model_path), os.path.abspath(output_directory)), model_files
+
+    with stage('model_fit'):
+        model_path, _ = run_stage('model_fit', model_key, fit_model)
+    osim_model = os.path.join(output_directory, model_path)
 
     write_c3d_parser_history(input_directory, output_directory, static_trial, deidentified_file_names, static_data)
 
@@ -98,19 +232,55 @@ def parse_session(static_trial, dynamic_trials, input_directory, output_director
 
     for trial in trc_file_paths.keys():
         logger.info(f"Running IK and ID for {trial}.")
-        ik_data, ik_output = run_ik(osim_model, trc_file_paths[trial], output_directory, ik_task_set)
-        foot_progression = calculate_foot_progression_angles(osim_model, ik_output)
-        ik_data = pd.concat([ik_data, foot_progression], axis=1)
-        filter_data(ik_data, marker_data_rate)
-
-        id_data = run_id(osim_model, ik_data, ik_output, grf_file_paths[trial], output_directory, event_data[trial], weight)
+        # IK and ID are keyed on the files they read, so a change that leaves a trial's TRC (or GRF
+        # and event) data unchanged doesn't rerun them.
+        ik_key = cache.key('ik', [osim_model, trc_file_paths[trial], ik_task_set], marker_data_rate=marker_data_rate,
+                           backend=backend.name)
+
+        def inverse_kinematics():
+            ik_data, ik_output = run_ik(osim_model, trc_file_paths[trial], output_directory, ik_task_set, backend)
+            with timer.time('foot_progression', trial, frames=len(ik_data)):
+                foot_progression = backend.foot_progression_angles(osim_model, ik_output)
+            ik_data = pd.concat([ik_data, foot_progression], axis=1)
+            filter_data(ik_data, marker_data_rate)
+            return ik_data, [ik_output]
+
+        with stage('ik'):
+            ik_data, (ik_output,) = run_stage('ik', ik_key, inverse_kinematics, trial,
+                                              lambda data: {'frames': len(data)})
+
+        event_file_path = os.path.join(output_directory, 'events', f"{deidentified_file_names[trial]}.json")
+        id_key = cache.key('id', [grf_file_paths[trial], event_file_path], ik=ik_key, weight=weight)
+
+        def inverse_dynamics():
+            id_data = run_id(osim_model, ik_data, ik_output, grf_file_paths[trial], output_directory,
+                             event_data[trial], weight, backend)
+            file_name = os.path.basename(grf_file_paths[trial]).replace("_grf.mot", "")
+            return id_data, [os.path.join(output_directory, 'id', f"{file_name}_ID.sto")]
+
+        with stage('id'):
+            id_data, _ = run_stage('id', id_key, inverse_dynamics, trial, lambda data: {'frames': len(data)})
 
         kinematic_data[trial] = ik_data
         kinetic_data[trial] = id_data
+        stage_keys[trial] += [ik_key, id_key]
+
+    # Cut the cycles of all three data streams from the same strike table, then time-normalise
+    # every cycle once so finalising only has to filter and write them.
+    def normalise():
+        grf_cycles, kinematic_cycles, kinetic_cycles = segment_session(grf_data, kinematic_data, kinetic_data,
+                                                                       event_data)
+        return (CycleStore.from_cycles(grf_cycles, grf_columns),
+                CycleStore.from_cycles(kinematic_cycles, kinematic_columns),
+                CycleStore.from_cycles(kinetic_cycles, kinetic_columns)), []
 
-    normalised_grf_data = normalise_grf_data(grf_data, event_data)
-    normalised_kinematics = normalise_kinematics(kinematic_data, event_data)
-    normalised_kinetics = normalise_kinetics(kinetic_data, event_data)
+    normalise_key = cache.key('normalise', trials=[[trial, *keys] for trial, keys in stage_keys.items()])
+    with stage('normalise'):
+        (normalised_grf_data, normalised_kinematics, normalised_kinetics), _ = \
+            run_stage('normalise', normalise_key, normalise,
+                      counts=lambda data: {'cycles': sum(len(cycles.index) for cycles in data)})
+
+    timer.write(output_directory)
 
     return normalised_grf_data, normalised_kinematics, normalised_kinetics, spatiotemporal_data, deidentified_file_names
 
@@ -172,68 +342,114 @@ def parse_static_trial(c3d_file, lab, marker_diameter, output_directory, static_
 
 
 def parse_dynamic_trial(c3d_file, lab, output_directory, trial_index, marker_data_rate, static_data, filter_trc,
-                        filter_grf, running_gait):
+                        filter_grf, running_gait, timer=None, grf_streaming_duration=GRF_STREAMING_DURATION,
+                        cancel_token=None):
+    """
+    `timer` is an optional `StageTimer` that records each step of the parse. The GRF data of
+    trials longer than `grf_streaming_duration` seconds is processed in chunks, and only the
+    samples needed to segment its force plate cycles are returned.
+
+    `cancel_token` is an optional `CancellationToken`, checked before each step and each chunk
+    of streamed GRF data.
+    """
+    if timer is None:
+        timer = StageTimer()
+    if cancel_token is None:
+        cancel_token = CancellationToken()
 
     file_name = os.path.basename(c3d_file)
     logger.info(f"Parsing dynamic trial: {file_name}.")
 
     output_file_name = f'dynamic_{trial_index}'
-    de_identify_c3d(c3d_file, output_directory, output_file_name)
+    cancel_token.raise_if_cancelled()
+    with timer.time('de_identify', file_name):
+        de_identify_c3d(c3d_file, output_directory, output_file_name)
 
     # Harmonise TRC data.
-    trc_data = TRCData()
-    trc_data.import_from(c3d_file)
-    frame_data = extract_marker_data(trc_data)
-    harmonise_markers(frame_data, lab, [])
+    cancel_token.raise_if_cancelled()
+    with timer.time('read', file_name) as record:
+        trc_data = TRCData()
+        trc_data.import_from(c3d_file)
+        frame_data = extract_marker_data(trc_data)
+        harmonise_markers(frame_data, lab, [])
+        record['frames'] = len(frame_data)
 
     # Extract GRF data from C3D file.
-    start_frame, end_frame = trim_frames(frame_data)
+    cancel_token.raise_if_cancelled()
+    with timer.time('trim', file_name, frames=len(frame_data)):
+        start_frame, end_frame = trim_frames(frame_data)
     if filter_trc:
-        filter_data(frame_data, trc_data['DataRate'])
-    frame_data = resample_data(frame_data, trc_data['DataRate'], marker_data_rate)
-    analog_data, data_rate, events, plate_count, corners = extract_data(c3d_file, start_frame, end_frame)
-
-    # Match events to force plates.
-    identify_event_plates(frame_data, events, corners)
-    validate_foot_strikes(events)
-
-    # Harmonise GRF data.
-    if filter_grf:
-        filter_data(analog_data, data_rate)
-    analog_data = resample_data(analog_data, data_rate, frequency=1000)
-    zero_grf_data(analog_data, plate_count)
-    analog_data = calculate_force_and_couple(analog_data, plate_count)
-    transform_grf_coordinates(analog_data, plate_count, corners)
-    mean_centre = transform_cop(analog_data, corners)
-    analog_data = concatenate_grf_data(analog_data, events, mean_centre)
-    scale_grf_data(analog_data)
-
-    # Rotate trials for +X walking direction and +Y vertical.
-    rotation_matrix = get_global_rotation(frame_data)
-    rotate_trc_data(frame_data, rotation_matrix)
-    rotate_grf_data(analog_data, rotation_matrix)
-    rotate_trc_y_vertical(frame_data)
-    rotate_grf_y_vertical(analog_data)
-
-    # Write GRF data.
-    grf_directory = os.path.join(output_directory, 'grf')
-    if not os.path.exists(grf_directory):
-        os.makedirs(grf_directory)
-    grf_file_name = re.sub(r' +', '_', output_file_name)
-    grf_file_path = os.path.join(grf_directory, f"{grf_file_name}_grf.mot")
-    write_grf(analog_data, grf_file_path)
-
-    # Write harmonised TRC data.
-    set_marker_data(trc_data, frame_data, rate=marker_data_rate)
-    trc_file_path = write_trc_data(trc_data, output_file_name, output_directory)
-
-    # Write gait event data.
-    write_event_data(events, output_file_name, output_directory)
+        with timer.time('filter', file_name, frames=len(frame_data)):
+            filter_data(frame_data, trc_data['DataRate'])
+    with timer.time('resample', file_name, frames=len(frame_data)):
+        frame_data = resample_data(frame_data, trc_data['DataRate'], marker_data_rate)
+    trial_duration = (end_frame - start_frame + 1) / trc_data['DataRate']
+    stream_grf = trial_duration > grf_streaming_duration
+
+    cancel_token.raise_if_cancelled()
+    with timer.time('grf', file_name) as record:
+        if stream_grf:
+            data_rate, events, plate_count, plates = extract_metadata(c3d_file, start_frame, end_frame)
+        else:
+            analog_data, data_rate, events, plate_count, plates = extract_data(c3d_file, start_frame, end_frame)
+
+        # Match events to force plates.
+        identify_event_plates(frame_data, events, plates)
+        validate_foot_strikes(events)
+
+        rotation_matrix = get_global_rotation(frame_data)
+        grf_directory = os.path.join(output_directory, 'grf')
+        if not os.path.exists(grf_directory):
+            os.makedirs(grf_directory)
+        grf_file_name = re.sub(r' +', '_', output_file_name)
+        grf_file_path = os.path.join(grf_directory, f"{grf_file_name}_grf.mot")
+
+        if stream_grf:
+            # Long recordings are processed in chunks to bound memory use.
+            logger.info(f"Processing GRF data in chunks ({trial_duration:.0f}s trial).")
+            analog_data, sample_count = stream_grf_data(c3d_file, start_frame, end_frame, events, plate_count,
+                                                        plates, rotation_matrix, filter_grf, grf_file_path,
+                                                        cancel_token=cancel_token)
+        else:
+            # Harmonise GRF data.
+            if filter_grf:
+                filter_data(analog_data, data_rate)
+            analog_data = resample_analog_data(analog_data, data_rate, frequency=1000)
+            zero_grf_data(analog_data, plate_count)
+            analog_data = calculate_force_and_couple(analog_data, plate_count)
+            transform_grf_coordinates(analog_data, plate_count, plates)
+            mean_centre = transform_cop(analog_data, plates)
+            analog_data = concatenate_grf_data(analog_data, events, mean_centre)
+            scale_grf_data(analog_data)
+
+            # Rotate GRF data for +X walking direction and +Y vertical.
+            rotate_grf_data(analog_data, rotation_matrix)
+            rotate_grf_y_vertical(analog_data)
+
+            # Write GRF data.
+            write_grf(analog_data, grf_file_path)
+            sample_count = len(analog_data)
+        record['samples'] = sample_count
+
+    cancel_token.raise_if_cancelled()
+    with timer.time('trc', file_name, frames=len(frame_data)):
+        # Rotate marker data for +X walking direction and +Y vertical.
+        rotate_trc_data(frame_data, rotation_matrix)
+        rotate_trc_y_vertical(frame_data)
+
+        # Write harmonised TRC data.
+        set_marker_data(trc_data, frame_data, rate=marker_data_rate)
+        trc_file_path = write_trc_data(trc_data, output_file_name, output_directory)
+
+        # Write gait event data.
+        write_event_data(events, output_file_name, output_directory)
 
     # Disable spatio-temporal analysis for running gait.
     s_t_data = {}
     if not running_gait:
-        s_t_data = calculate_spatiotemporal_data(frame_data, events, static_data)
+        cancel_token.raise_if_cancelled()
+        with timer.time('spatiotemporal', file_name, frames=len(frame_data)):
+            s_t_data = calculate_spatiotemporal_data(frame_data, events, static_data)
 
     return analog_data, events, s_t_data, trc_file_path, grf_file_path
 
@@ -314,34 +530,40 @@ def write_event_data(events, file_name, output_directory):
             cycle: {time: event[0] for time, event in times.items()}
             for cycle, times in cycles.items()
         }
-        for side, cycles in events.items()
+        for side, cycles in events.to_dict().items()
     }
 
     with open(event_file_path, 'w') as f:
         json.dump(simplified_events, f, indent=2)
 
 
-def run_ik(osim_model, trc_file_path, output_directory, ik_task_set):
+def run_ik(osim_model, trc_file_path, output_directory, ik_task_set, backend=None):
+    if backend is None:
+        backend = OpenSimBackend()
+
     # Perform inverse kinematics.
     file_name = os.path.splitext(os.path.basename(trc_file_path))[0]
     ik_directory = os.path.join(output_directory, 'ik')
     if not os.path.exists(ik_directory):
         os.makedirs(ik_directory)
     ik_output = os.path.join(ik_directory, f"{file_name}_IK.mot")
-    perform_ik(osim_model, trc_file_path, ik_output, ik_task_set)
+    backend.inverse_kinematics(osim_model, trc_file_path, ik_output, ik_task_set)
     ik_data = read_data(ik_output)
 
     return ik_data, ik_output
 
 
-def run_id(osim_model, ik_data, ik_output, grf_file_path, output_directory, events, subject_mass):
+def run_id(osim_model, ik_data, ik_output, grf_file_path, output_directory, events, subject_mass, backend=None):
+    if backend is None:
+        backend = OpenSimBackend()
+
     # Perform inverse dynamics.
     file_name = os.path.basename(grf_file_path).replace("_grf.mot", "")
     id_directory = os.path.join(output_directory, 'id')
     if not os.path.exists(id_directory):
         os.makedirs(id_directory)
     id_output = os.path.join(id_directory, f"{file_name}_ID.sto")
-    perform_id(osim_model, ik_output, grf_file_path, id_output)
+    backend.inverse_dynamics(osim_model, ik_output, grf_file_path, id_output)
     id_data = read_data(id_output)
     calculate_joint_powers(ik_data, id_data, events)
     mass_adjust_units(id_data, subject_mass)
@@ -547,10 +769,7 @@ def resample_data(frame_data, data_rate, frequency=100):
     if data_rate == frequency:
         return frame_data
 
-    start_time = round(Decimal(frame_data.iloc[:, 0].iat[0]), 4).quantize(Decimal('0.01'), rounding=ROUND_CEILING)
-    end_time = round(Decimal(frame_data.iloc[:, 0].iat[-1]), 4).quantize(Decimal('0.01'), rounding=ROUND_FLOOR)
-    number_of_frames = round((end_time - start_time) * frequency) + 1
-    time_array = np.linspace(float(start_time), float(end_time), number_of_frames)
+    time_array = get_resampled_times(frame_data.iloc[:, 0].iat[0], frame_data.iloc[:, 0].iat[-1], frequency)
 
     resampled_frame_data = pd.DataFrame(columns=frame_data.columns)
     resampled_frame_data.iloc[:, 0] = time_array
@@ -668,17 +887,7 @@ def extract_marker_names(filename):
 def extract_data(file_path, start_frame, end_frame):
     with open(file_path, 'rb') as handle:
         reader = c3d.Reader(handle)
-
-        if reader.analog_used == 0:
-            raise ParserError("No analog data found in dynamic trial.")
-        if 'EVENT' not in reader:
-            raise ParserError("No events found in dynamic trial.")
-
-        def get_metadata(object, key):
-            value = object.get(key)
-            if value is None:
-                raise ParserError(f"Missing required metadata: {key}. Skipping trial.")
-            return value
+        validate_dynamic_reader(reader)
 
         # Extract analog data
         time_increment = 1 / reader.analog_rate
@@ -700,79 +909,99 @@ def extract_data(file_path, start_frame, end_frame):
                 analog_data[label].extend(analog[j - 1])
         analog_data = pd.DataFrame(analog_data)
 
-        # Extract event information.
-        event_group = get_metadata(reader, 'EVENT')
-        event_count = get_metadata(event_group, 'USED').int8_value
-        contexts = get_metadata(event_group, 'CONTEXTS').string_array
-        event_labels = get_metadata(event_group, 'LABELS').string_array
-        times = get_metadata(event_group, 'TIMES').float_array
-        events = {'Left': {}, 'Right': {}}
-
-        for i in range(event_count):
-            foot = contexts[i].strip()
-            if foot:
-                label = event_labels[i].strip()
-                event_time = times[i][1]
-                event_time = round(float(event_time), 4)
-                events[foot][event_time] = label
-        if not any(events.values()):
-            raise ParserError("Event context (side) missing.")
-
-        for foot in events.keys():
-            events[foot] = dict(sorted(events[foot].items()))
-
-        # Annotate stride numbers.
-        annotated_events = {'Left': {}, 'Right': {}}
-        stride_numbers = {"Left": 0, "Right": 0}
-        for foot, event in events.items():
-            for event_time, event_type in event.items():
-                event_type = event_type.title()
-                if event_type == "Foot Strike":
-                    stride_numbers[foot] += 1
-                stride_number = stride_numbers[foot]
-
-                if stride_number not in annotated_events[foot]:
-                    annotated_events[foot][stride_number] = {}
-                annotated_events[foot][stride_number][event_time] = event_type
-
-        # Remove events outside the trimmed frame range.
-        trimmed_events = {'Left': {}, 'Right': {}}
-        for foot, events in annotated_events.items():
-            for stride_number, stride_events in events.items():
-                for event_time, event_type in stride_events.items():
-                    if start <= event_time <= stop_marker:
-                        if stride_number not in trimmed_events[foot]:
-                            trimmed_events[foot][stride_number] = {}
-                        trimmed_events[foot][stride_number][event_time] = event_type
-                    else:
-                        logger.warn(f"Event at {event_time}s is outside the trial's valid range "
-                                    f"of time stamps ({start}s - {stop_marker}s).")
-
-        # Get number of force plates.
-        plate_count = get_metadata(reader, 'FORCE_PLATFORM:USED').int8_value
-
-        # Rotate GRF data to align with global CS.
-        corners = get_metadata(reader, 'FORCE_PLATFORM:CORNERS').float_array
+        trimmed_events = extract_events(reader, start, stop_marker)
+        plate_count, plates = extract_plate_geometry(reader)
 
-        try:
-            # Convert analog units in V (to N).
-            channels = get_metadata(reader, 'FORCE_PLATFORM:CHANNEL').int16_array
-            units = get_metadata(reader, 'ANALOG:UNITS').string_array
-            if all(units[i - 1] == 'V' for i in channels.flatten()):
-                calibration_matrix = get_metadata(reader, 'FORCE_PLATFORM:CAL_MATRIX').float_array
-                apply_calibration_matrix(plate_count, calibration_matrix, channels, analog_data)
-        except ParserError as e:
-            logger.warn(e)
+        # Convert analog units in V (to N).
+        if plates.calibration_matrix is not None:
+            apply_calibration_matrix(plate_count, plates.calibration_matrix, plates.channels, analog_data)
 
-        try:
-            # Reorder analog channels according to metadata order.
-            channels = get_metadata(reader, 'FORCE_PLATFORM:CHANNEL').int16_array
-            selected_channels = [analog_labels[i - 1] for i in channels.flatten()]
+        # Reorder analog channels according to metadata order.
+        if plates.channels is not None:
+            selected_channels = [analog_labels[i - 1] for i in plates.channels.flatten()]
             analog_data = analog_data[['time'] + selected_channels]
-        except ParserError as e:
-            logger.warn(e)
 
-    return analog_data, reader.analog_rate, trimmed_events, plate_count, corners
+    return analog_data, reader.analog_rate, trimmed_events, plate_count, plates
+
+
+def extract_metadata(file_path, start_frame, end_frame):
+    """
+    Reads the events and force plate set-up of a dynamic trial without loading its analog data.
+    """
+    with open(file_path, 'rb') as handle:
+        reader = c3d.Reader(handle)
+        validate_dynamic_reader(reader)
+
+        start = (start_frame - 1) / reader.point_rate
+        stop_marker = (end_frame - 1) / reader.point_rate
+
+        trimmed_events = extract_events(reader, start, stop_marker)
+        plate_count, plates = extract_plate_geometry(reader)
+
+    return reader.analog_rate, trimmed_events, plate_count, plates
+
+
+def validate_dynamic_reader(reader):
+    if reader.analog_used == 0:
+        raise ParserError("No analog data found in dynamic trial.")
+    if 'EVENT' not in reader:
+        raise ParserError("No events found in dynamic trial.")
+
+
+def get_metadata(object, key):
+    value = object.get(key)
+    if value is None:
+        raise ParserError(f"Missing required metadata: {key}. Skipping trial.")
+    return value
+
+
+def extract_events(reader, start, stop_marker):
+    # Extract event information.
+    event_group = get_metadata(reader, 'EVENT')
+    event_count = get_metadata(event_group, 'USED').int16_value
+    contexts = get_metadata(event_group, 'CONTEXTS').string_array
+    event_labels = get_metadata(event_group, 'LABELS').string_array
+    times = get_metadata(event_group, 'TIMES').float_array
+
+    records = []
+    for i in range(event_count):
+        foot = contexts[i].strip()
+        if foot:
+            event_time = round(float(times[i][1]), 4)
+            records.append((foot, event_time, event_labels[i].strip()))
+    events = EventTable.from_records(records)
+    if not len(events):
+        raise ParserError("Event context (side) missing.")
+
+    # Remove events outside the trimmed frame range.
+    in_range = events.data['time'].between(start, stop_marker).to_numpy()
+    for event_time in events.data['time'][~in_range]:
+        logger.warn(f"Event at {event_time}s is outside the trial's valid range "
+                    f"of time stamps ({start}s - {stop_marker}s).")
+
+    return events.select(in_range)
+
+
+def extract_plate_geometry(reader):
+    # Get number of force plates.
+    plate_count = get_metadata(reader, 'FORCE_PLATFORM:USED').int8_value
+
+    # Rotate GRF data to align with global CS.
+    corners = get_metadata(reader, 'FORCE_PLATFORM:CORNERS').float_array
+
+    channels, calibration_matrix = None, None
+    try:
+        channels = get_metadata(reader, 'FORCE_PLATFORM:CHANNEL').int16_array
+        units = get_metadata(reader, 'ANALOG:UNITS').string_array
+        if all(units[i - 1] == 'V' for i in channels.flatten()):
+            calibration_matrix = get_metadata(reader, 'FORCE_PLATFORM:CAL_MATRIX').float_array
+    except ParserError as e:
+        logger.warn(e)
+
+    # Plate geometry is shared by every trial recorded with the same plate set-up.
+    plates = get_plate_geometry(corners, channels, calibration_matrix)
+
+    return plate_count, plates
 
 
 def apply_calibration_matrix(plate_count, calibration_matrix, channels, analog_data):
@@ -838,20 +1067,7 @@ def read_grf(file_path):
 
 def write_grf(analog_data, file_path):
     with open(file_path, 'w') as file:
-        row_count, column_count = analog_data.shape
-
-        # Write header.
-        file.write(f"{os.path.basename(file_path)}\n")
-        file.write("version=1\n")
-        file.write(f"nRows={row_count}\n")
-        file.write(f"nColumns={column_count}\n")
-        file.write("inDegrees=yes\n")
-        file.write("endheader\n\n")
-
-        # Write labels.
-        for label in analog_data.columns:
-            file.write(f"{label.strip()}\t")
-        file.write("\n")
+        write_grf_header(file, file_path, len(analog_data), analog_data.columns)
 
     # Write GRF data.
     with open(file_path, 'a') as file:
@@ -888,25 +1104,17 @@ def calculate_force_and_couple(analog_data, plate_count):
     return new_data
 
 
-def transform_grf_coordinates(analog_data, plate_count, corners):
+def transform_grf_coordinates(analog_data, plate_count, plates):
     # Rotate GRF data to align with global CS.
     for i in range(plate_count):
-        plate = corners[i]
-        x_vector = plate[0] - plate[1]
-        y_vector = plate[0] - plate[3]
-        x_unit_vector = x_vector / np.linalg.norm(x_vector)
-        y_unit_vector = y_vector / np.linalg.norm(y_vector)
-        force_plate_axes = [x_unit_vector, y_unit_vector]
-        global_axes = [[1, 0, 0], [0, 1, 0]]
-        rotation, _ = Rotation.align_vectors(force_plate_axes, global_axes)
-        rotation_matrix = rotation.as_matrix()
+        rotation_matrix = plates.rotation_matrices[i]
 
+        # Rotate the force, CoP and torque vectors of this plate together.
         start = 1 + (9 * i)
-        for j in [start, start + 3, start + 6]:
-            columns = list(range(j, j + 3))
-            values = analog_data.iloc[:, columns]
-            transformed_values = values.apply(lambda row: np.dot(rotation_matrix, row), axis=1)
-            analog_data.iloc[:, columns] = transformed_values.tolist()
+        columns = list(range(start, start + 9))
+        values = analog_data.iloc[:, columns].to_numpy(dtype=float).reshape(-1, 3, 3)
+        transformed_values = values @ rotation_matrix.T
+        analog_data.iloc[:, columns] = transformed_values.reshape(-1, 9)
 
 
 def zero_grf_data(analog_data, plate_count):
@@ -917,96 +1125,82 @@ def zero_grf_data(analog_data, plate_count):
         analog_data.iloc[mask, columns] = 0
 
 
-def identify_event_plates(frame_data, events, corners):
+def identify_event_plates(frame_data, events, plates):
+    event_data = events.data
+    if not len(event_data):
+        return np.zeros((0, len(plates)), dtype=bool)
 
-    def identify_plate(coordinates):
-        for plate in range(len(corners)):
-            if point_on_plate(coordinates, corners[plate]):
-                events[foot][stride_number][event_time] = [event_type, plate]
-                break
-            else:
-                events[foot][stride_number][event_time] = [event_type, None]
+    # Find the marker frame at (or immediately before) each event.
+    event_times = event_data['time'].to_numpy(dtype=float)
+    positions = np.searchsorted(frame_data['Time'].to_numpy(dtype=float), event_times, side='right') - 1
+    event_indices = frame_data.index[np.maximum(positions, 0)]
 
-    for foot, foot_events in events.items():
-        for stride_number, stride_events in foot_events.items():
-            for event_time, event_type in stride_events.items():
-                event_index = frame_data[frame_data['Time'] <= event_time].index[-1]
-                if event_type == "Foot Strike":
-                    heel_coordinates = frame_data.at[event_index, foot[0] + 'HEE']
-                    identify_plate(heel_coordinates)
-                else:
-                    toe_coordinates = frame_data.at[event_index, foot[0] + 'TOE']
-                    identify_plate(toe_coordinates)
+    # Foot strikes are located using the heel marker, all other events using the toe marker.
+    markers = event_data['side'].str[0] + np.where(event_data['type'] == "Foot Strike", 'HEE', 'TOE')
+    coordinates = np.array([frame_data.at[event_index, marker] for event_index, marker in zip(event_indices, markers)],
+                           dtype=float)
 
+    # Test every event against every plate at once.
+    membership = plates.contains(coordinates)
+    event_plates = np.where(membership.any(axis=1), membership.argmax(axis=1), -1)
+    event_data['plate'] = pd.array([None if plate < 0 else plate for plate in event_plates], dtype='Int64')
+    event_data['frame'] = pd.array(event_indices, dtype='Int64')
 
-def validate_foot_strikes(events):
-    invalid_strides = {'Left': set(), 'Right': set()}
-    time_ordered_strikes = {}
-    for foot, foot_events in events.items():
-        for stride_number, stride_events in foot_events.items():
-            for event_time, (event_type, event_plate) in stride_events.items():
-                if event_type == "Foot Strike":
-                    time_ordered_strikes[event_time] = (foot, stride_number, event_plate)
-
-            if len(stride_events) == 2:
-                strike, off = stride_events.values()
-                if strike[1] != off[1]:
-                    logger.warn(f"Stride ({foot} {stride_number}) is invalid. "
-                                f"Stride occurs over multiple force plates.")
-                    invalid_strides[foot].add(stride_number)
-
-            if len(stride_events) > 2:
-                logger.warn(f"Stride ({foot} {stride_number}) is invalid. "
-                            f"Additional events detected in stride.")
-                invalid_strides[foot].add(stride_number)
-
-    time_ordered_strikes = dict(sorted(time_ordered_strikes.items()))
-    previous_strike = (None, None, None)
-    for event_time, (foot, stride_number, event_plate) in time_ordered_strikes.items():
-        previous_foot, previous_stride, previous_plate = previous_strike
-
-        off_plate = None
-        if previous_foot is not None:
-            for event in events[previous_foot][previous_stride].values():
-                if event[0] == "Foot Off":
-                    off_plate = event[1]
-                    break
-
-        if event_plate == off_plate and off_plate is not None:
-            logger.warn(f"Strides ({previous_foot} {previous_stride}) and ({foot} {stride_number}) "
-                        f"are invalid. Consecutive strides occur on the same force plate.")
-            invalid_strides[previous_foot].add(previous_stride)
-            invalid_strides[foot].add(stride_number)
-        previous_strike = (foot, stride_number, event_plate)
-
-    for foot, strides in invalid_strides.items():
-        for stride_number in strides:
-            for event in events[foot][stride_number].values():
-                event[1] = None
-
-
-def point_on_plate(point, corners):
-    x_coordinates = [corner[0] for corner in corners]
-    y_coordinates = [corner[1] for corner in corners]
-    min_x, max_x = min(x_coordinates), max(x_coordinates)
-    min_y, max_y = min(y_coordinates), max(y_coordinates)
-
-    return min_x <= point[0] <= max_x and min_y <= point[1] <= max_y
-
-
-def transform_cop(analog_data, corners):
-    centres = np.zeros((len(corners), 3))
-    for i, plate_corners in enumerate(corners):
-        centre = np.mean(plate_corners, axis=0)
-        centres[i] = centre
+    return membership
 
+
+def validate_foot_strikes(events):
+    event_data = events.data
+    event_plates = event_data['plate'].fillna(-1).to_numpy(dtype=int)
+    stride_keys = list(zip(event_data['side'], event_data['stride']))
+    invalid_strides = set()
+
+    # Strides must have their strike and off events on the same plate, and no additional events.
+    strides = pd.DataFrame({'side': event_data['side'], 'stride': event_data['stride'], 'plate': event_plates})
+    stride_summary = strides.groupby(['side', 'stride'], sort=False)['plate'].agg(['size', 'first', 'last'])
+    multiple_plates = (stride_summary['size'] == 2) & (stride_summary['first'] != stride_summary['last'])
+    additional_events = stride_summary['size'] > 2
+    for (foot, stride_number), multiple, additional in zip(stride_summary.index, multiple_plates, additional_events):
+        if multiple:
+            logger.warn(f"Stride ({foot} {stride_number}) is invalid. "
+                        f"Stride occurs over multiple force plates.")
+            invalid_strides.add((foot, stride_number))
+        if additional:
+            logger.warn(f"Stride ({foot} {stride_number}) is invalid. "
+                        f"Additional events detected in stride.")
+            invalid_strides.add((foot, stride_number))
+
+    # Consecutive strikes (of either foot) must not land on the plate the previous foot left.
+    is_strike = (event_data['type'] == "Foot Strike").to_numpy()
+    is_off = (event_data['type'] == "Foot Off").to_numpy()
+    strikes = strides[is_strike].assign(time=event_data['time'][is_strike])
+    strikes = strikes.drop_duplicates('time', keep='last').sort_values('time', kind='stable')
+    previous_strikes = strikes.shift(1)
+    off_plates = strides[is_off].groupby(['side', 'stride'])['plate'].first()
+    previous_keys = pd.MultiIndex.from_arrays([previous_strikes['side'], previous_strikes['stride']])
+    previous_off_plates = off_plates.reindex(previous_keys).fillna(-1).to_numpy(dtype=int)
+    conflicts = (strikes['plate'].to_numpy() == previous_off_plates) & (previous_off_plates >= 0)
+    for previous, current in zip(previous_strikes[conflicts].itertuples(), strikes[conflicts].itertuples()):
+        previous_stride = int(previous.stride)
+        logger.warn(f"Strides ({previous.side} {previous_stride}) and ({current.side} {current.stride}) "
+                    f"are invalid. Consecutive strides occur on the same force plate.")
+        invalid_strides.add((previous.side, previous_stride))
+        invalid_strides.add((current.side, current.stride))
+
+    invalid = np.array([key in invalid_strides for key in stride_keys], dtype=bool)
+    event_data.loc[invalid, 'plate'] = pd.NA
+    event_data.loc[invalid, 'valid'] = False
+
+
+def transform_cop(analog_data, plates):
+    for i, centre in enumerate(plates.centres):
         CoPx = analog_data.iloc[:, i * 9 + 4]
         CoPy = analog_data.iloc[:, i * 9 + 5]
 
         analog_data.iloc[:, i * 9 + 4] = CoPx + centre[0]
         analog_data.iloc[:, i * 9 + 5] = CoPy + centre[1]
 
-    return np.mean(centres, axis=0)
+    return plates.mean_centre
 
 
 def concatenate_grf_data(analog_data, events, mean_centre):
@@ -1031,45 +1225,37 @@ def concatenate_grf_data(analog_data, events, mean_centre):
         data = analog_data.iloc[frames, source_columns].values
         concatenated_data.iloc[frames, target_columns] = data
 
-    for foot, foot_events in events.items():
+    for foot, stride_number, strike_plate, start_time, end_time in events.stance_windows().itertuples(index=False):
         i = 0 if foot == "Left" else 1
         target_columns = range(i * 9 + 1, i * 9 + 10)
+        source_columns = range(strike_plate * 9 + 1, strike_plate * 9 + 10)
 
-        for stride_number, stride_events in foot_events.items():
-            if len(stride_events) >= 2:
-                stride_items = list(stride_events.items())
-                start_time, (_, strike_plate) = stride_items[0]
-                end_time, (_, off_plate) = stride_items[1]
-                if strike_plate is None or off_plate is None or strike_plate != off_plate:
-                    continue
-                source_columns = range(strike_plate * 9 + 1, strike_plate * 9 + 10)
-
-                start = analog_data[analog_data['time'] <= start_time].index[-1]
-                while analog_data.iloc[start, source_columns[2]] > 0:
-                    start -= 1
-                    if start < analog_data.index[0]:
-                        start =+ 1
-                        break
-                end = analog_data[analog_data['time'] <= end_time].index[-1]
-                while analog_data.iloc[end, source_columns[2]] > 0:
-                    end += 1
-                    if end > analog_data.index[-1]:
-                        end -= 1
-                        break
-
-                new_start_time = analog_data.iloc[start]['time']
-                new_end_time = analog_data.iloc[end]['time']
-                if new_start_time < start_time - 0.2:
-                    logger.warn(f"Interference detected on force plate at the beginning of "
-                                f"stride ({foot} {stride_number}).")
-                    start = analog_data[analog_data['time'] <= start_time].index[-1]
-                if end_time + 0.2 < new_end_time:
-                    logger.warn(f"Interference detected on force plate at the end of stride "
-                                f"({foot} {stride_number}).")
-                    end = analog_data[analog_data['time'] <= end_time].index[-1]
-
-                copy_data()
-                start, end = None, None
+        start = analog_data[analog_data['time'] <= start_time].index[-1]
+        while analog_data.iloc[start, source_columns[2]] > 0:
+            start -= 1
+            if start < analog_data.index[0]:
+                start =+ 1
+                break
+        end = analog_data[analog_data['time'] <= end_time].index[-1]
+        while analog_data.iloc[end, source_columns[2]] > 0:
+            end += 1
+            if end > analog_data.index[-1]:
+                end -= 1
+                break
+
+        new_start_time = analog_data.iloc[start]['time']
+        new_end_time = analog_data.iloc[end]['time']
+        if new_start_time < start_time - 0.2:
+            logger.warn(f"Interference detected on force plate at the beginning of "
+                        f"stride ({foot} {stride_number}).")
+            start = analog_data[analog_data['time'] <= start_time].index[-1]
+        if end_time + 0.2 < new_end_time:
+            logger.warn(f"Interference detected on force plate at the end of stride "
+                        f"({foot} {stride_number}).")
+            end = analog_data[analog_data['time'] <= end_time].index[-1]
+
+        copy_data()
+        start, end = None, None
 
     # Change header order for OpenSim.
     concatenated_data = concatenated_data.iloc[:,
@@ -1146,144 +1332,15 @@ def calculate_angular_velocity(joint_angle, time):
 
 
 def normalise_grf_data(data, events):
-    normalised_data = {"Left": {}, "Right": {}}
-    for i in range(len(data)):
-        file_name = list(data.keys())[i]
-        grf_data = list(data.values())[i]
-        trial_events = list(events.values())[i]
-
-        for foot, foot_events in trial_events.items():
-            column = 1 if foot == "Left" else 7
-            force_data = grf_data.iloc[:, [0, *range(column, column + 3)]]
-
-            start = None
-            for stride_number, stride_events in foot_events.items():
-                (event_time, (event_type, event_plate)), *_ = stride_events.items()
-                frame = force_data[force_data['time'] <= event_time].index[-1]
-                if event_type == "Foot Strike" and start:
-                    while force_data.iloc[frame, 2] > 0:
-                        frame -= 1
-                    if file_name not in normalised_data[foot]:
-                        normalised_data[foot][file_name] = {}
-                    data_segment = force_data.iloc[start:frame, 1:]
-                    start = None if event_plate is None else frame
-
-                    # Perform side-specific transformations.
-                    if "1_ground_force_vz" in data_segment.columns:
-                        data_segment["1_ground_force_vz"] = -data_segment["1_ground_force_vz"]
-
-                    normalised_data[foot][file_name][stride_number - 1] = data_segment.values.T
-
-                elif event_type == "Foot Strike" and event_plate is not None:
-                    while force_data.iloc[frame, 2] > 0:
-                        frame -= 1
-                    start = frame
-
-    return normalised_data
+    return segment_trials(data, events, GRF_RULE)
 
 
 def normalise_kinematics(kinematic_data, events):
-    normalised_data = {"Left": {}, "Right": {}}
-    for i in range(len(kinematic_data)):
-        file_name = list(kinematic_data.keys())[i]
-        trial_data = list(kinematic_data.values())[i]
-        trial_events = list(events.values())[i]
-
-        for foot, foot_events in trial_events.items():
-            side = foot[0].lower()
-            names = [
-                f'pelvis_tilt',
-                f'pelvis_list',
-                f'pelvis_rotation',
-                f'hip_flexion_{side}',
-                f'hip_adduction_{side}',
-                f'hip_rotation_{side}',
-                f'knee_flexion_{side}',
-                f'ankle_angle_{side}',
-                f'subtalar_angle_{side}',
-                f'foot_progression_{side}'
-            ]
-            data = trial_data.loc[:, ['time'] + names]
-
-            start = None
-            for stride_number, stride_events in foot_events.items():
-                (event_time, (event_type, event_plate)), *_ = stride_events.items()
-                if event_type == "Foot Strike" and start:
-                    frame = data[data['time'] >= event_time].index[0]
-                    if file_name not in normalised_data[foot]:
-                        normalised_data[foot][file_name] = {}
-                    data_segment = data.iloc[start:frame, 1:]
-
-                    # Perform side-specific transformations.
-                    if foot == "Left":
-                        data_segment["pelvis_rotation"] = -data_segment["pelvis_rotation"]
-                    if foot == "Right":
-                        data_segment["pelvis_list"] = -data_segment["pelvis_list"]
-                    data_segment["pelvis_tilt"] = -data_segment["pelvis_tilt"]
-
-                    normalised_data[foot][file_name][stride_number - 1] = data_segment.values.T
-                    start = data[data['time'] <= event_time].index[-1]
-                elif event_type == "Foot Strike":
-                    start = data[data['time'] <= event_time].index[-1]
-
-    return normalised_data
+    return segment_trials(kinematic_data, events, KINEMATIC_RULE)
 
 
 def normalise_kinetics(kinetic_data, events):
-    normalised_data = {"Left": {}, "Right": {}}
-    for i in range(len(kinetic_data)):
-        file_name = list(kinetic_data.keys())[i]
-        trial_data = list(kinetic_data.values())[i]
-        trial_events = list(events.values())[i]
-
-        for foot, foot_events in trial_events.items():
-            side = foot[0].lower()
-            names = [
-                f'hip_flexion_{side}_moment',
-                f'hip_adduction_{side}_moment',
-                f'hip_rotation_{side}_moment',
-                f'knee_flexion_{side}_moment',
-                f'knee_adduction_{side}_moment',
-                f'knee_rotation_{side}_moment',
-                f'ankle_angle_{side}_moment',
-                f'subtalar_angle_{side}_moment',
-                f'hip_flexion_{side}_power',
-                f'knee_flexion_{side}_power',
-                f'ankle_angle_{side}_power'
-            ]
-            data = trial_data.loc[:, ['time'] + names]
-
-            start = None
-            for stride_number, stride_events in foot_events.items():
-                (event_time, (event_type, event_plate)), *_ = stride_events.items()
-
-                if event_type == "Foot Strike" and start:
-                    frame = data[data['time'] >= event_time].index[0]
-                    if file_name not in normalised_data[foot]:
-                        normalised_data[foot][file_name] = {}
-                    data_segment = data.iloc[start:frame, 1:]
-
-                    # Perform sign transformations.
-                    data_segment[f"hip_flexion_{side}_moment"] = -data_segment[f"hip_flexion_{side}_moment"]
-                    data_segment[f"hip_adduction_{side}_moment"] = -data_segment[f"hip_adduction_{side}_moment"]
-                    data_segment[f"hip_rotation_{side}_moment"] = -data_segment[f"hip_rotation_{side}_moment"]
-                    data_segment[f"knee_flexion_{side}_moment"] = -data_segment[f"knee_flexion_{side}_moment"]
-                    data_segment[f"knee_adduction_{side}_moment"] = -data_segment[f"knee_adduction_{side}_moment"]
-                    data_segment[f"knee_rotation_{side}_moment"] = -data_segment[f"knee_rotation_{side}_moment"]
-                    data_segment[f"ankle_angle_{side}_moment"] = -data_segment[f"ankle_angle_{side}_moment"]
-                    data_segment[f"subtalar_angle_{side}_moment"] = -data_segment[f"subtalar_angle_{side}_moment"]
-
-                    normalised_data[foot][file_name][stride_number - 1] = data_segment.values.T
-                    if event_plate is not None:
-                        start = data[data['time'] <= event_time].index[-1]
-                    else:
-                        start = None
-
-                elif event_type == "Foot Strike":
-                    if event_plate is not None:
-                        start = data[data['time'] <= event_time].index[-1]
-
-    return normalised_data
+    return segment_trials(kinetic_data, events, KINETIC_RULE)
 
 
 def write_normalised_grfs(grf_data, selected_trials, excluded_cycles, output_directory):
@@ -1291,8 +1348,9 @@ def write_normalised_grfs(grf_data, selected_trials, excluded_cycles, output_dir
     if not os.path.exists(normalised_directory):
         os.makedirs(normalised_directory)
     output_file = os.path.join(normalised_directory, f"combined_grf.csv")
-    columns = ['anterior_posterior', 'medial_lateral', 'vertical']
-    write_normalised_data(grf_data, columns, selected_trials, excluded_cycles, output_file)
+    write_normalised_data(grf_data, grf_columns, selected_trials, excluded_cycles, output_file)
+    output_file = os.path.join(normalised_directory, f"combined_grf_statistics.csv")
+    write_normalised_statistics(grf_data, grf_columns, selected_trials, excluded_cycles, output_file)
 
 
 def write_normalised_kinematics(kinematic_data, selected_trials, excluded_cycles, output_directory):
@@ -1300,227 +1358,29 @@ def write_normalised_kinematics(kinematic_data, selected_trials, excluded_cycles
     if not os.path.exists(normalised_directory):
         os.makedirs(normalised_directory)
     output_file = os.path.join(normalised_directory, f"combined_kinematics.csv")
-    columns = ['pelvic_tilt', 'pelvic_obliquity', 'pelvic_rotation',
-               'hip_flexion', 'hip_adduction', 'hip_rotation',
-               'knee_flexion', 'ankle_dorsiflexion', 'subtalar_inversion',
-               'foot_progression']
-    write_normalised_data(kinematic_data, columns, selected_trials, excluded_cycles, output_file)
+    write_normalised_data(kinematic_data, kinematic_columns, selected_trials, excluded_cycles, output_file)
+    output_file = os.path.join(normalised_directory, f"combined_kinematics_statistics.csv")
+    write_normalised_statistics(kinematic_data, kinematic_columns, selected_trials, excluded_cycles, output_file)
 
 
 def write_normalised_kinetics(kinetic_data, selected_trials, excluded_cycles, output_directory):
     normalised_directory = os.path.join(output_directory, 'normalised')
     output_file = os.path.join(normalised_directory, f"combined_kinetics.csv")
-    columns = ['hip_extensor_moment', 'hip_abductor_moment', 'hip_rotator_moment',
-               'knee_extensor_moment', 'knee_abductor_moment', 'knee_rotator_moment',
-               'ankle_dorsiflexor_moment', 'subtalar_inverter_moment',
-               'hip_power', 'knee_power', 'ankle_power']
-    write_normalised_data(kinetic_data, columns, selected_trials, excluded_cycles, output_file)
+    write_normalised_data(kinetic_data, kinetic_columns, selected_trials, excluded_cycles, output_file)
+    output_file = os.path.join(normalised_directory, f"combined_kinetics_statistics.csv")
+    write_normalised_statistics(kinetic_data, kinetic_columns, selected_trials, excluded_cycles, output_file)
 
 
 def write_normalised_data(data, column_names, selected_trials, excluded_cycles, output_file):
-    with open(output_file, 'w') as file:
-        file.write(f"C3D-Parser Version:, {VERSION}\n\n\n")
-        file.write(','.join(["Trial", "Side", "Cycle-Number", "Frame"] + column_names) + '\n\n')
+    if not isinstance(data, CycleStore):
+        data = CycleStore.from_cycles(data, column_names)
+    data.write_csv(output_file, column_names, VERSION, selected_trials, excluded_cycles)
 
-        for foot, files_dict in data.items():
-            for file_name, cycles in files_dict.items():
-                if file_name not in selected_trials:
-                    continue
 
-                for cycle_number, cycle_data in cycles.items():
-                    cycle = f"{foot}_{cycle_number}"
-                    cycle_identifier = (file_name, cycle)
-                    if cycle_identifier in excluded_cycles:
-                        continue
-
-                    x_original = np.linspace(0, 1, cycle_data.shape[1])
-                    x_new = np.linspace(0, 1, 101)
-                    normalised_segment = np.zeros((cycle_data.shape[0], 101))
-                    for j in range(cycle_data.shape[0]):
-                        normalised_segment[j] = np.interp(x_new, x_original, cycle_data[j])
-                    normalised_segment = normalised_segment.round(6)
-
-                    for x in range(1, 102):
-                        trial = selected_trials[file_name] if x == 1 else ""
-                        side = foot if x == 1 else ""
-                        stride = cycle_number if x == 1 else ""
-                        row_data = [trial, side, stride, x] + normalised_segment[:, x - 1].tolist()
-                        file.write(','.join(str(value) for value in row_data) + '\n')
-                    file.write('\n')
-
-
-def calculate_spatiotemporal_data(frame_data, events, static_data):
-    stride_lengths = {"Left": {}, "Right": {}}
-    step_lengths = {"Left": {}, "Right": {}}
-    step_widths = {"Left": {}, "Right": {}}
-    phases = {"Left": {}, "Right": {}}
-    gait_speeds = {"Left": {}, "Right": {}}
-    cadences = {"Left": {}, "Right": {}}
-    initial_contact_times = {"Left": {}, "Right": {}}
-    toe_off_times = {"Left": {}, "Right": {}}
-    terminal_contact_times = {"Left": {}, "Right": {}}
-    strike_count = 0
-
-    left_leg_length = static_data['Left Leg Length'] / 1000
-    right_leg_length = static_data['Right Leg Length'] / 1000
-    leg_lengths = {"Left": left_leg_length, "Right": right_leg_length}
-
-    time_ordered_events = defaultdict(dict)
-    for foot, foot_events in events.items():
-        for stride_number, stride_events in foot_events.items():
-            for event_time, (event_type, event_plate) in stride_events.items():
-                time_ordered_events[event_time][foot] = [event_type, stride_number]
-
-    # Add terminal foot-strike to events for each cycle.
-    full_cycle_events = copy.deepcopy(events)
-    for foot, foot_events in full_cycle_events.items():
-        for stride_number, stride_events in foot_events.items():
-            if len(stride_events) == 2 and (stride_number + 1) in foot_events:
-                event_list = list(stride_events.values())
-                next_event_time, next_event = next(iter(foot_events[stride_number + 1].items()))
-                if event_list[0][0] == "Foot Strike" and event_list[1][0] == "Foot Off":
-                    if next_event[0] == "Foot Strike":
-                        stride_events[next_event_time] = ["Terminal Foot Strike", next_event[1]]
-
-    # Extract event times.
-    for foot, foot_events in full_cycle_events.items():
-        for stride_number, stride_events in foot_events.items():
-            if len(stride_events) == 3:
-                (strike_time, strike), (off_time, off), (terminal_time, terminal) = stride_events.items()
-                if strike[0] == "Foot Strike" and off[0] == "Foot Off" and terminal[0] == "Terminal Foot Strike":
-                    initial_contact_times[foot][stride_number] = strike_time
-                    toe_off_times[foot][stride_number] = off_time
-                    terminal_contact_times[foot][stride_number] = terminal_time
-
-    opposite_side = {"Left": "Right", "Right": "Left"}
-    strike_position = {"Left": None, "Right": None}
-    foot_events = {"Left": None, "Right": None}
-    strike_times = {"Left": None, "Right": None}
-    stride_numbers = {"Left": 0, "Right": 0}
-    for event_time in sorted(time_ordered_events):
-        for foot, (event_type, stride_number) in time_ordered_events[event_time].items():
-            stride_numbers[foot] = stride_number
-            opposite_foot = opposite_side[foot]
-            if event_type == "Foot Strike":
-                strike_count += 1
-                event_index = frame_data[frame_data['Time'] <= event_time].index[-1]
-                heel_coordinates = frame_data.at[event_index, foot[0] + 'HEE']
-
-                # Calculate length of stride.
-                if strike_position[foot] is not None:
-                    stride_length = heel_coordinates[0] - strike_position[foot][0]  # type: ignore
-                    stride_lengths[foot][stride_number - 1] = stride_length / 1000
-                    total_time = event_time - strike_times[foot]
-                    gait_speeds[foot][stride_number - 1] = (stride_length / total_time) / 1000
-                    cadences[foot][stride_number - 1] = (60 / total_time) * 2
-                strike_position[foot] = heel_coordinates
-                strike_times[foot] = event_time
-
-                # Calculate length and width of step.
-                if strike_position[opposite_side[foot]] is not None and strike_count > 2:
-                    previous_coordinates = strike_position[opposite_foot]
-
-                    step_length = heel_coordinates[0] - previous_coordinates[0]     # type: ignore
-                    step_lengths[foot][stride_number - 1] = step_length / 1000
-
-                    step_width = abs(heel_coordinates[2] - previous_coordinates[2])     # type: ignore
-                    step_widths[foot][stride_number - 1] = step_width / 1000
-
-            # Calculate stance and swing phases.
-            if stride_number not in phases[foot]:
-                phases[foot][stride_number] = {}
-            if foot_events[foot] is not None:
-                time_interval = event_time - foot_events[foot]
-                if event_type == "Foot Strike":
-                    phases[foot][stride_number - 1]["Swing"] = time_interval
-                elif event_type == "Foot Off":
-                    phases[foot][stride_number]["Stance"] = time_interval
-            foot_events[foot] = event_time
-
-            # Calculate single and double support phases.
-            if stride_numbers[foot] not in phases[foot]:
-                phases[foot][stride_numbers[foot]] = {}
-            if stride_numbers[opposite_foot] not in phases[opposite_foot]:
-                phases[opposite_foot][stride_numbers[opposite_foot]] = {}
-            if foot_events[opposite_foot] is not None:
-                time_interval = event_time - foot_events[opposite_foot]
-                if event_type == "Foot Off":
-                    phases[opposite_foot][stride_numbers[opposite_foot]]["Initial-DS"] = time_interval
-                    phases[foot][stride_numbers[foot]]["Terminal-DS"] = time_interval
-
-    s_t_data = {}
-
-    # Calculate normalised lengths.
-    def normalise_by_leg_lengths(data):
-        if leg_lengths["Left"] and leg_lengths["Right"]:
-            return {leg: {k: v / leg_lengths[leg] for k, v in data[leg].items()} for leg in data}
-        else:
-            return {leg: {k: np.nan for k in data[leg]} for leg in data}
-
-    normalised_stride_lengths = normalise_by_leg_lengths(stride_lengths)
-    normalised_step_lengths = normalise_by_leg_lengths(step_lengths)
-
-    def normalise_gait_speed(data):
-        if leg_lengths["Left"] and leg_lengths["Right"]:
-            return {leg: {k: v / math.sqrt(9.81 * leg_lengths[leg]) for k, v in data[leg].items()} for leg in data}
-        else:
-            return {leg: {k: np.nan for k in data[leg]} for leg in data}
-
-    normalised_gait_speeds = normalise_gait_speed(gait_speeds)
-
-    # Assign lengths and widths.
-    s_t_data["Stride Length (m)"] = stride_lengths
-    s_t_data["Normalised Stride Length"] = normalised_stride_lengths
-    s_t_data["Step Length (m)"] = step_lengths
-    s_t_data["Normalised Step Length"] = normalised_step_lengths
-    s_t_data["Step Width (m)"] = step_widths
-
-    # Determine phase times and percentages.
-    stride_durations = {"Left": {}, "Right": {}}
-    stance_durations = {"Left": {}, "Right": {}}
-    swing_durations = {"Left": {}, "Right": {}}
-    stance_phases = {"Left": {}, "Right": {}}
-    swing_phases = {"Left": {}, "Right": {}}
-    single_support_phases = {"Left": {}, "Right": {}}
-    double_support_phases = {"Left": {}, "Right": {}}
-    for side, cycles in phases.items():
-        for cycle_number, cycle in cycles.items():
-            if "Stance" in cycle and "Swing" in cycle:
-                total_time = cycle["Stance"] + cycle["Swing"]
-                stance_phases[side][cycle_number] = (cycle["Stance"] / total_time) * 100
-                swing_phases[side][cycle_number] = (cycle["Swing"] / total_time) * 100
-
-                stride_durations[side][cycle_number] = total_time
-                stance_durations[side][cycle_number] = cycle["Stance"]
-                swing_durations[side][cycle_number] = cycle["Swing"]
-
-                if "Initial-DS" in cycle and "Terminal-DS" in cycle:
-                    ds_time = cycle["Initial-DS"] + cycle["Terminal-DS"]
-                    single_support_phases[side][cycle_number] = ((cycle["Stance"] - ds_time) / total_time) * 100
-                    double_support_phases[side][cycle_number] = (ds_time / total_time) * 100
-
-    # Define time based measurements.
-    s_t_data["Stride Duration (s)"] = stride_durations
-    s_t_data["Stance Duration (s)"] = stance_durations
-    s_t_data["Swing Duration (s)"] = swing_durations
-
-    # Assign phase percentages.
-    s_t_data["Stance Phase %"] = stance_phases
-    s_t_data["Swing Phase %"] = swing_phases
-    s_t_data["Single Support Phase %"] = single_support_phases
-    s_t_data["Double Support Phase %"] = double_support_phases
-    s_t_data["Gait Speed (m/s)"] = gait_speeds
-    s_t_data["Normalised Gait Speed"] = normalised_gait_speeds
-    s_t_data["Cadence (steps/min)"] = cadences
-
-    # Assign event times.
-    s_t_data["Initial Foot Contact (t)"] = initial_contact_times
-    s_t_data["Toe Off (t)"] = toe_off_times
-    s_t_data["Terminal Foot Contact (t)"] = terminal_contact_times
-
-    data_frame = convert_to_data_frame(s_t_data)
-
-    return data_frame
+def write_normalised_statistics(data, column_names, selected_trials, excluded_cycles, output_file):
+    if not isinstance(data, CycleStore):
+        data = CycleStore.from_cycles(data, column_names)
+    data.write_statistics_csv(output_file, column_names, VERSION, selected_trials, excluded_cycles)
 
 
 def calculate_distance_covered(frame_data, start_time=None, end_time=None):
@@ -1561,46 +1421,14 @@ def write_spatiotemporal_data(data, selected_trials, output_directory):
     normalised_directory = os.path.join(output_directory, 'normalised')
     output_file = os.path.join(normalised_directory, f"spattemp.csv")
 
-    frames = []
-    for trial, df in data.items():
-        if trial in selected_trials and not df.empty:
-            new_df = df.copy()
-            idx_series = pd.Series(df.index, index=df.index)
-            cycle_id = idx_series.str.split("-", n=1, expand=True)
-            new_df.insert(0, "Trial", selected_trials[trial])
-            new_df.insert(1, "Side", cycle_id[0])
-            new_df.insert(2, "Cycle-Number", cycle_id[1].astype(int))
-
-            frames.append(new_df)
-
     # Write header.
     with open(output_file, "w") as file:
         file.write(f"C3D-Parser Version:, {VERSION}\n\n\n")
 
-    combined_data_frame = pd.concat(frames, ignore_index=True)
+    combined_data_frame = combine_spatiotemporal_data(data, selected_trials)
     combined_data_frame.round(3).to_csv(output_file, index=False, mode="a")
 
 
-def convert_to_data_frame(s_t_data):
-    row_dict = {}
-    for measurement, data_both_side in s_t_data.items():
-        for side, data_one_side in data_both_side.items():
-            for cycle_number, value in data_one_side.items():
-                row_label = f"{side}-{cycle_number}"
-                if row_label not in row_dict:
-                    row_dict[row_label] = {}
-                row_dict[row_label][measurement] = value
-    data_frame = pd.DataFrame.from_dict(row_dict, orient='index')
-
-    def sort_key(label):
-        side, cycle_number = label.split("-")
-        return side, int(cycle_number)
-
-    data_frame = data_frame.reindex(sorted(data_frame.index, key=sort_key), columns=list(s_t_data.keys()))
-
-    return data_frame
-
-
 def add_medial_knee_markers(frame_data, left_knee_width, right_knee_width, marker_diameter=14):
     """
     This function takes a pandas.DataFrame of TRC data, extracts a single frame from the data
@@ -1637,7 +1465,9 @@ def add_medial_knee_markers(frame_data, left_knee_width, right_knee_width, marke
 
 def create_osim_model(static_trc, dynamic_trc, static_marker_data, marker_diameter, static_data,
                       output_directory, left_foot_flat, right_foot_flat, toe_marker_proximal, optimise_knee_axis,
-                      progress_tracker):
+                      progress_tracker, backend=None):
+    if backend is None:
+        backend = OpenSimBackend()
 
     static_marker_data = static_marker_data.drop("Time").to_dict()
     rotation_matrix = np.array([[1, 0, 0], [0, 0, 1], [0, -1, 0]])
@@ -1645,10 +1475,9 @@ def create_osim_model(static_trc, dynamic_trc, static_marker_data, marker_diamet
     subject_info = get_subject_info(static_data)
     marker_radius = marker_diameter / 2
 
-    model_path = create_model(static_trc, dynamic_trc, output_directory, static_marker_data, subject_info,
-                              marker_radius, left_foot_flat, right_foot_flat,
-                              toe_marker_proximal=toe_marker_proximal, optimise_knee_axis=optimise_knee_axis,
-                              progress_tracker=progress_tracker)
+    model_path = backend.create_model(static_trc, dynamic_trc, output_directory, static_marker_data, subject_info,
+                                      marker_radius, left_foot_flat, right_foot_flat, toe_marker_proximal,
+                                      optimise_knee_axis, progress_tracker)
 
     return model_path
 
@@ -13,17 +13,17 @@ check_metadata_base = c3d.Reader._check_metadata
 def add_frames(self, frames, index=None):
     """
     This method patches a bug present in v0.5.2 which is causing the `from_reader` method to fail.
+
+    The frames aren't converted to a single array to check their shape, as that fails when the
+    point and analog arrays of a frame have the same number of rows.
     """
-    sh = np.array(frames, dtype=object).shape
     # Single frame
-    if len(sh) != 2:
-        frames = np.array([frames], dtype=object)
-        sh = np.shape(frames)
+    if len(frames) == 2 and isinstance(frames[0], np.ndarray) and frames[0].dtype != object:
+        frames = [frames]
     # Sequence of invalid shape
-    if sh[1] != 2:
+    if any(len(frame) != 2 for frame in frames):
         raise ValueError(
-            'Expected frame input to be sequence of point and analog pairs on form (-1, 2). ' +
-            'Input was of shape {}.'.format(str(sh)))
+            'Expected frame input to be sequence of point and analog pairs on form (-1, 2).')
 
     if index is not None:
         self._frames[index:index] = frames
@@ -0,0 +1,295 @@
+
+import os
+import re
+import json
+import numpy as np
+import pandas as pd
+
+from c3d_parser.core.cycles import CycleStore
+
+
+# Normalised data types and the combined CSV written for each.
+COHORT_KINDS = {
+    'grf': "combined_grf.csv",
+    'kinematics': "combined_kinematics.csv",
+    'kinetics': "combined_kinetics.csv",
+}
+SPATIOTEMPORAL_FILE = "spattemp.csv"
+
+_index_columns = ['session', 'subject', 'session_date', 'kind', 'trial', 'side', 'cycle', 'row']
+
+
+class CohortStore:
+    """
+    An appendable store of the normalised outputs of many sessions.
+
+    Each session is written once to its own directory, holding one (cycles x variables x frames)
+    array per data type and its spatio-temporal table. Sessions are recorded in 'sessions.jsonl'
+    (with the subject information and the variables of each data type) and every cycle in
+    'cycles.csv', so adding a session only appends to these index files. Cycle arrays are
+    memory-mapped when queried, so only the selected cycles are read.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._sessions_file = os.path.join(directory, 'sessions.jsonl')
+        self._cycles_file = os.path.join(directory, 'cycles.csv')
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+        self._sessions = None
+        self._variables = None
+        self._cycles = None
+
+    def add_session(self, subject, session_date, cycle_data, spatiotemporal_data=None, subject_info=None,
+                    session_id=None):
+        """
+        Appends one session. `cycle_data` is a dictionary of CycleStores by data type ('grf',
+        'kinematics', 'kinetics'); excluded cycles are not stored. `spatiotemporal_data` is the
+        combined spatio-temporal table of the session. Returns the session identifier.
+        """
+        session_date = str(pd.Timestamp(session_date).date())
+        if session_id is None:
+            session_id = re.sub(r'[^\w\-]', '_', f"{subject}_{session_date}")
+        if session_id in self.sessions()['session'].values:
+            raise ValueError(f"Session {session_id} already exists in the cohort store.")
+
+        session_directory = os.path.join(self.directory, 'sessions', session_id)
+        if not os.path.exists(session_directory):
+            os.makedirs(session_directory)
+
+        variables = {}
+        index = []
+        for kind, data in cycle_data.items():
+            mask = data.mask()
+            np.save(os.path.join(session_directory, f"{kind}.npy"), data.data[mask])
+            variables[kind] = data.variables
+
+            cycles = data.index[mask]
+            index.append(pd.DataFrame({
+                'session': session_id,
+                'subject': subject,
+                'session_date': session_date,
+                'kind': kind,
+                'trial': cycles['trial'].to_numpy(),
+                'side': cycles['side'].to_numpy(),
+                'cycle': cycles['cycle'].to_numpy(),
+                'row': np.arange(len(cycles)),
+            }))
+
+        if spatiotemporal_data is not None:
+            spatiotemporal_data.to_csv(os.path.join(session_directory, SPATIOTEMPORAL_FILE), index=False)
+
+        # The index files are only appended to once the session data is written.
+        index = pd.concat(index, ignore_index=True) if index else pd.DataFrame(columns=_index_columns)
+        index.to_csv(self._cycles_file, mode='a', index=False, header=not os.path.exists(self._cycles_file))
+        record = {
+            'session': session_id,
+            'subject': subject,
+            'session_date': session_date,
+            'variables': variables,
+            'subject_info': subject_info or {},
+        }
+        with open(self._sessions_file, 'a', encoding='utf-8') as file:
+            file.write(json.dumps(record) + '\n')
+
+        self._sessions = None
+        self._cycles = None
+
+        return session_id
+
+    def ingest_session(self, output_directory, subject, session_date=None, history_file=None, session_id=None):
+        """
+        Appends a finalised session from its output directory, reading the combined normalised
+        CSVs and the spatio-temporal CSV. Subject information (and the session date, if not given)
+        is read from the session's c3d_parser_history.log when `history_file` is given.
+        """
+        history = read_history(history_file) if history_file else {}
+        if session_date is None:
+            session_date = history.get('last_run')
+        if session_date is None:
+            raise ValueError("A session date is required if no history file is given.")
+
+        normalised_directory = os.path.join(output_directory, 'normalised')
+        cycle_data = {}
+        for kind, file_name in COHORT_KINDS.items():
+            file_path = os.path.join(normalised_directory, file_name)
+            if os.path.exists(file_path):
+                cycle_data[kind] = read_normalised_csv(file_path)
+
+        spatiotemporal_data = None
+        spatiotemporal_file = os.path.join(normalised_directory, SPATIOTEMPORAL_FILE)
+        if os.path.exists(spatiotemporal_file):
+            spatiotemporal_data = pd.read_csv(spatiotemporal_file, skiprows=3)
+
+        return self.add_session(subject, session_date, cycle_data, spatiotemporal_data,
+                                history.get('subject_info'), session_id)
+
+    def sessions(self, subjects=None, start_date=None, end_date=None):
+        """
+        Returns the sessions (optionally of `subjects`, between the inclusive dates) as a data
+        frame with one row per session and one column per subject information field.
+        """
+        if self._sessions is None:
+            records = []
+            if os.path.exists(self._sessions_file):
+                with open(self._sessions_file, encoding='utf-8') as file:
+                    records = [json.loads(line) for line in file if line.strip()]
+            self._sessions = pd.DataFrame(
+                [{'session': record['session'], 'subject': record['subject'],
+                  'session_date': record['session_date'], **record['subject_info']} for record in records],
+                columns=None if records else ['session', 'subject', 'session_date'])
+            self._variables = {record['session']: record['variables'] for record in records}
+
+        return self._sessions[self._session_mask(self._sessions, subjects, start_date, end_date)]
+
+    def variables(self, kind):
+        """
+        Returns the variables of `kind` stored for any session, in order of first appearance.
+        """
+        variables = []
+        for session_variables in self._session_variables().values():
+            variables.extend(v for v in session_variables.get(kind, []) if v not in variables)
+
+        return variables
+
+    def index(self, kind=None, subjects=None, start_date=None, end_date=None, side=None):
+        """
+        Returns the index rows of the stored cycles that match the given filters.
+        """
+        if self._cycles is None:
+            if os.path.exists(self._cycles_file):
+                self._cycles = pd.read_csv(self._cycles_file, dtype={'session': str, 'subject': str, 'trial': str})
+            else:
+                self._cycles = pd.DataFrame(columns=_index_columns)
+
+        mask = self._session_mask(self._cycles, subjects, start_date, end_date)
+        if kind is not None:
+            mask &= (self._cycles['kind'] == kind).to_numpy()
+        if side is not None:
+            mask &= (self._cycles['side'] == side).to_numpy()
+
+        return self._cycles[mask]
+
+    def cycles(self, kind, variables=None, subjects=None, start_date=None, end_date=None, side=None):
+        """
+        Returns the index of the matching cycles of `kind` and their (cycles x variables x frames)
+        array. Variables missing from a session are NaN.
+        """
+        index = self.index(kind, subjects, start_date, end_date, side)
+        variables = self.variables(kind) if variables is None else list(variables)
+
+        indices = []
+        arrays = []
+        for session_id, rows in index.groupby('session', sort=False):
+            data = np.load(os.path.join(self.directory, 'sessions', session_id, f"{kind}.npy"), mmap_mode='r')
+            session_variables = self._session_variables()[session_id][kind]
+            values = np.full((len(rows), len(variables), data.shape[2]), np.nan)
+            selected = data[rows['row'].to_numpy()]
+            for i, variable in enumerate(variables):
+                if variable in session_variables:
+                    values[:, i] = selected[:, session_variables.index(variable)]
+            indices.append(rows)
+            arrays.append(values)
+
+        index = pd.concat(indices) if indices else index
+        data = np.concatenate(arrays) if arrays else np.zeros((0, len(variables), 0))
+
+        return index.reset_index(drop=True), data
+
+    def group_means(self, kind, by=('side',), variables=None, subjects=None, start_date=None, end_date=None,
+                    side=None):
+        """
+        Returns {group: (variables x frames) mean} over the matching cycles, grouped by the index
+        columns in `by` (e.g. 'side', 'subject', 'session'). Group keys are tuples of the values.
+        """
+        index, data = self.cycles(kind, variables, subjects, start_date, end_date, side)
+        means = {}
+        for group, rows in index.groupby(list(by), sort=True):
+            means[group] = np.nanmean(data[rows.index.to_numpy()], axis=0)
+
+        return means
+
+    def spatiotemporal(self, subjects=None, start_date=None, end_date=None):
+        """
+        Returns the spatio-temporal tables of the matching sessions, with their session, subject
+        and session date.
+        """
+        tables = []
+        for session in self.sessions(subjects, start_date, end_date).itertuples(index=False):
+            file_path = os.path.join(self.directory, 'sessions', session.session, SPATIOTEMPORAL_FILE)
+            if os.path.exists(file_path):
+                table = pd.read_csv(file_path)
+                table.insert(0, 'session_date', session.session_date)
+                table.insert(0, 'subject', session.subject)
+                table.insert(0, 'session', session.session)
+                tables.append(table)
+
+        return pd.concat(tables, ignore_index=True) if tables else pd.DataFrame()
+
+    def _session_variables(self):
+        self.sessions()
+        return self._variables
+
+    @staticmethod
+    def _session_mask(data, subjects, start_date, end_date):
+        mask = np.ones(len(data), dtype=bool)
+        if subjects is not None:
+            subjects = [subjects] if isinstance(subjects, str) else list(subjects)
+            mask &= data['subject'].astype(str).isin(subjects).to_numpy()
+        if start_date is not None:
+            mask &= (data['session_date'] >= str(pd.Timestamp(start_date).date())).to_numpy()
+        if end_date is not None:
+            mask &= (data['session_date'] <= str(pd.Timestamp(end_date).date())).to_numpy()
+
+        return mask
+
+
+def read_normalised_csv(file_path):
+    """
+    Reads a combined normalised CSV (as written by CycleStore.write_csv) back into a CycleStore.
+    """
+    data = pd.read_csv(file_path, skiprows=3)
+    identifiers = data[["Trial", "Side", "Cycle-Number"]].ffill()
+    variables = list(data.columns[4:])
+    frames = int(data["Frame"].max()) if len(data) else 0
+
+    starts = data["Frame"].to_numpy() == 1
+    index = pd.DataFrame({
+        'trial': identifiers["Trial"][starts].astype(str).to_numpy(),
+        'side': identifiers["Side"][starts].to_numpy(),
+        'cycle': identifiers["Cycle-Number"][starts].astype(int).to_numpy(),
+        'excluded': False,
+    })
+    values = data[variables].to_numpy(dtype=float).reshape(len(index), frames, len(variables)).transpose(0, 2, 1)
+
+    return CycleStore(variables, values, index, frames)
+
+
+def read_history(file_path):
+    """
+    Reads the run date, static trial and subject information from a c3d_parser_history.log.
+    """
+    history = {'subject_info': {}}
+    section = None
+    with open(file_path, encoding='utf-8') as file:
+        for line in file:
+            line = line.strip()
+            if not line:
+                section = None
+            elif line.startswith("Last Run:"):
+                history['last_run'] = line.split(":", 1)[1].strip()
+            elif line.startswith("Static trial:"):
+                history['static_trial'] = line.split(":", 1)[1].strip()
+            elif line.endswith(":"):
+                section = line[:-1]
+            elif section == "Subject Information":
+                key, value = line.split(":", 1)
+                value = value.strip().split(" ")[0]
+                try:
+                    value = float(value)
+                except ValueError:
+                    pass
+                history['subject_info'][key] = value
+
+    return history
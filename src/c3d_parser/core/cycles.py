@@ -0,0 +1,268 @@
+
+import numpy as np
+import pandas as pd
+
+
+NORMALISED_FRAMES = 101
+PERCENTILES = (5, 25, 75, 95)
+
+# Quantiles of each frame, including the range and median, and the order of the exported statistics.
+_quantiles = sorted({0, 50, 100, *PERCENTILES})
+_quantile_names = [{0: 'min', 50: 'median', 100: 'max'}.get(q, f'p{q}') for q in _quantiles]
+STATISTICS = ['mean', 'std', 'cv'] + _quantile_names
+
+
+class CycleStore:
+    """
+    Time-normalised gait cycles for a fixed set of variables.
+
+    Every cycle is held in a single (cycles x variables x frames) array. `index` is a data frame
+    with one row per cycle, recording its trial, side, cycle number and whether it is excluded.
+    """
+
+    def __init__(self, variables, data=None, index=None, frames=NORMALISED_FRAMES):
+        self.variables = list(variables)
+        self.frames = frames
+        if data is None:
+            data = np.zeros((0, len(self.variables), frames))
+        self.data = np.asarray(data, dtype=float)
+        if index is None:
+            index = _empty_index()
+        self.index = index.reset_index(drop=True)
+
+        # Formatted CSV rows of each cycle, created the first time the cycle is written.
+        self._formatted_rows = {}
+
+        # Ensemble statistics by trial selection, valid for one set of excluded cycles.
+        self._statistics = {}
+        self._statistics_exclusions = frozenset()
+
+    @classmethod
+    def from_cycles(cls, cycle_data, variables, frames=NORMALISED_FRAMES):
+        """
+        Creates a store from the {side: {trial: {cycle: array}}} structure returned by the
+        normalise functions, where each array is a (variables x samples) cycle of any length.
+        """
+        records = []
+        arrays = []
+        for side, trials in cycle_data.items():
+            for trial, cycles in trials.items():
+                for cycle, values in cycles.items():
+                    records.append((trial, side, cycle, False))
+                    arrays.append(values)
+
+        index = pd.DataFrame(records, columns=['trial', 'side', 'cycle', 'excluded']) if records else None
+        data = normalise_cycles(arrays, frames) if arrays else None
+
+        return cls(variables, data, index, frames)
+
+    def __len__(self):
+        return len(self.index)
+
+    def identifiers(self):
+        """
+        Returns the (trial, "Side_N") identifier of each cycle, as used by the plot exclusions.
+        """
+        return list(zip(self.index['trial'], self.index['side'] + '_' + self.index['cycle'].astype(str)))
+
+    def set_excluded(self, excluded_cycles):
+        excluded_cycles = set(excluded_cycles)
+        self.index['excluded'] = [identifier in excluded_cycles for identifier in self.identifiers()]
+
+    def mask(self, trials=None, side=None, excluded_cycles=None):
+        """
+        Returns a boolean mask of the cycles belonging to `trials` (and `side`) that are not
+        excluded. If `excluded_cycles` is given it replaces the stored exclusion flags.
+        """
+        mask = np.ones(len(self), dtype=bool)
+        if trials is not None:
+            mask &= self.index['trial'].isin(list(trials)).to_numpy()
+        if side is not None:
+            mask &= (self.index['side'] == side).to_numpy()
+        if excluded_cycles is None:
+            mask &= ~self.index['excluded'].to_numpy(dtype=bool)
+        else:
+            excluded_cycles = set(excluded_cycles)
+            mask &= np.array([identifier not in excluded_cycles for identifier in self.identifiers()], dtype=bool)
+
+        return mask
+
+    def select(self, mask):
+        return CycleStore(self.variables, self.data[mask], self.index[mask], self.frames)
+
+    def cycles(self):
+        """
+        Iterates over the stored cycles as (trial, side, cycle, (variables x frames) array).
+        """
+        for row, values in zip(self.index.itertuples(index=False), self.data):
+            yield row.trial, row.side, row.cycle, values
+
+    def statistics(self, mask=None):
+        """
+        Returns the ensemble statistics of the selected cycles for each side, as a dictionary of
+        {side: {'count', 'mean', 'std', 'cv', 'min', 'p5', 'p25', 'median', 'p75', 'p95', 'max'}}
+        with (variables x frames) arrays. The standard deviation is the sample standard deviation
+        (NaN for a single cycle), and the coefficient of variation is a percentage of the absolute
+        mean.
+        """
+        if mask is None:
+            mask = self.mask()
+
+        statistics = {}
+        for side in ["Left", "Right"]:
+            values = self.data[mask & (self.index['side'] == side).to_numpy()]
+            if not len(values):
+                continue
+            mean = values.mean(axis=0)
+            std = values.std(axis=0, ddof=1) if len(values) > 1 else np.full_like(mean, np.nan)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                cv = std / np.abs(mean) * 100
+            statistics[side] = {'count': len(values), 'mean': mean, 'std': std, 'cv': cv}
+            statistics[side].update(zip(_quantile_names, np.percentile(values, _quantiles, axis=0)))
+
+        return statistics
+
+    def ensemble_statistics(self, trials=None, excluded_cycles=None):
+        """
+        Returns the `statistics` of the cycles of `trials` (all trials if None), leaving out
+        `excluded_cycles` (the cycles flagged as excluded if None). Results are cached until the
+        set of excluded cycles changes.
+        """
+        if excluded_cycles is None:
+            exclusions = frozenset(identifier for identifier, excluded in
+                                   zip(self.identifiers(), self.index['excluded']) if excluded)
+        else:
+            exclusions = frozenset(excluded_cycles)
+        if exclusions != self._statistics_exclusions:
+            self._statistics = {}
+            self._statistics_exclusions = exclusions
+
+        key = None if trials is None else tuple(sorted(trials))
+        if key not in self._statistics:
+            mask = self.mask(trials=trials, excluded_cycles=excluded_cycles)
+            self._statistics[key] = self.statistics(mask)
+
+        return self._statistics[key]
+
+    def to_frame(self, mask=None):
+        """
+        Returns the selected cycles as a long-format data frame with one row per frame.
+        """
+        if mask is None:
+            mask = np.ones(len(self), dtype=bool)
+        index = self.index[mask]
+        values = self.data[mask].transpose(0, 2, 1).reshape(-1, len(self.variables))
+
+        frame = pd.DataFrame(values, columns=self.variables)
+        frame.insert(0, 'frame', np.tile(np.arange(1, self.frames + 1), len(index)))
+        frame.insert(0, 'cycle', np.repeat(index['cycle'].to_numpy(), self.frames))
+        frame.insert(0, 'side', np.repeat(index['side'].to_numpy(), self.frames))
+        frame.insert(0, 'trial', np.repeat(index['trial'].to_numpy(), self.frames))
+
+        return frame
+
+    def write_csv(self, output_file, column_names, version, trial_names, excluded_cycles=None):
+        """
+        Writes the cycles of the trials in `trial_names` (a mapping of trial to output name) in the
+        combined normalised data format.
+        """
+        mask = self.mask(trials=trial_names.keys(), excluded_cycles=excluded_cycles)
+
+        lines = [f"C3D-Parser Version:, {version}\n\n\n",
+                 ','.join(["Trial", "Side", "Cycle-Number", "Frame"] + column_names) + '\n\n']
+        for position in np.flatnonzero(mask):
+            trial, side, cycle = self.index.iloc[position][['trial', 'side', 'cycle']]
+            rows = self._format_rows(position)
+            lines.append(f"{trial_names[trial]},{side},{cycle},{rows[0]}")
+            lines.extend(rows[1:])
+            lines.append('\n')
+
+        with open(output_file, 'w') as file:
+            file.write(''.join(lines))
+
+    def write_statistics_csv(self, output_file, column_names, version, trial_names, excluded_cycles=None):
+        """
+        Writes the ensemble statistics of each side, over the cycles of the trials in
+        `trial_names`, with one row per statistic and frame.
+        """
+        statistics = self.ensemble_statistics(trial_names.keys(), excluded_cycles)
+
+        lines = [f"C3D-Parser Version:, {version}\n\n\n",
+                 ','.join(["Side", "Statistic", "Cycles", "Frame"] + column_names) + '\n\n']
+        for side, side_statistics in statistics.items():
+            for name in STATISTICS:
+                values = side_statistics[name].round(6).T.tolist()
+                lines.extend(f"{side},{name},{side_statistics['count']},{x}," + ','.join(map(str, row)) + '\n'
+                             for x, row in enumerate(values, start=1))
+                lines.append('\n')
+
+        with open(output_file, 'w') as file:
+            file.write(''.join(lines))
+
+    def _format_rows(self, position):
+        # The first row is prefixed with the trial, side and cycle number when written.
+        if position not in self._formatted_rows:
+            values = self.data[position].round(6).T.tolist()
+            rows = [f"{x}," + ','.join(map(str, row)) + '\n' for x, row in enumerate(values, start=1)]
+            self._formatted_rows[position] = rows[:1] + [',,,' + row for row in rows[1:]]
+
+        return self._formatted_rows[position]
+
+
+def normalise_cycles(cycle_arrays, frames=NORMALISED_FRAMES):
+    """
+    Linearly interpolates each (variables x samples) array in `cycle_arrays` onto `frames`
+    evenly spaced points, returning a (cycles x variables x frames) array.
+
+    All cycles are interpolated in one batch. The result matches `np.interp` applied to each
+    variable of each cycle.
+    """
+    # Empty cycles can't be interpolated, they are normalised to NaN.
+    cycle_arrays = [np.asarray(values, dtype=float) for values in cycle_arrays]
+    cycle_arrays = [values if values.shape[1] else np.full((len(values), 1), np.nan) for values in cycle_arrays]
+    lengths = np.array([values.shape[1] for values in cycle_arrays])
+    values = np.concatenate(cycle_arrays, axis=1)
+    offsets = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    x_new = np.linspace(0, 1, frames)
+
+    # Interpolation intervals depend only on the cycle length.
+    lower = np.zeros((len(lengths), frames), dtype=int)
+    x_lower = np.zeros((len(lengths), frames))
+    x_upper = np.ones((len(lengths), frames))
+    for length in np.unique(lengths):
+        rows = lengths == length
+        x_original = np.linspace(0, 1, length)
+        j = np.clip(np.searchsorted(x_original, x_new, side='right') - 1, 0, max(length - 2, 0))
+        lower[rows] = j
+        x_lower[rows] = x_original[j]
+        x_upper[rows] = x_original[np.minimum(j + 1, length - 1)]
+
+    first = offsets[:, np.newaxis] + lower
+    last = offsets[:, np.newaxis] + np.minimum(lower + 1, lengths[:, np.newaxis] - 1)
+    y_lower = values[:, first].transpose(1, 0, 2)
+    y_upper = values[:, last].transpose(1, 0, 2)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = (y_upper - y_lower) / (x_upper - x_lower)[:, np.newaxis]
+        normalised = slope * (x_new - x_lower)[:, np.newaxis] + y_lower
+        retry = np.isnan(normalised)
+        normalised[retry] = (slope * (x_new - x_upper)[:, np.newaxis] + y_upper)[retry]
+        equal = np.isnan(normalised) & (y_lower == y_upper)
+        normalised[equal] = y_lower[equal]
+
+    # Samples that coincide with an original sample (including both ends) are copied.
+    exact = (x_new == x_lower)[:, np.newaxis, :]
+    normalised = np.where(exact, y_lower, normalised)
+    at_end = (x_new >= x_upper)[:, np.newaxis, :] & ((lower + 1) >= lengths[:, np.newaxis] - 1)[:, np.newaxis, :]
+    normalised = np.where(at_end, y_upper, normalised)
+
+    return normalised
+
+
+def _empty_index():
+    return pd.DataFrame({
+        'trial': pd.Series(dtype=object),
+        'side': pd.Series(dtype=object),
+        'cycle': pd.Series(dtype=int),
+        'excluded': pd.Series(dtype=bool),
+    })
@@ -0,0 +1,96 @@
+
+import os
+import re
+import io
+import pstats
+import cProfile
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+
+DIAGNOSTICS_DIRECTORY = 'diagnostics'
+
+# Number of functions and allocation sites listed in the summaries.
+SUMMARY_LENGTH = 30
+
+
+class StageProfiler:
+    """
+    Profiles each pipeline stage with cProfile, and optionally traces its memory allocations with
+    tracemalloc, writing the results to the 'diagnostics' folder of the output directory.
+
+    For each stage a '.prof' file (which can be opened with pstats or snakeviz) and a text summary
+    of the most expensive functions are written, along with the top allocation sites and peak
+    traced memory if `trace_memory` is set. A profiler that isn't enabled does nothing.
+    """
+
+    def __init__(self, output_directory, enabled=False, trace_memory=False):
+        self.directory = os.path.join(output_directory, DIAGNOSTICS_DIRECTORY)
+        self.enabled = enabled
+        self.trace_memory = trace_memory
+        self._count = 0
+
+    def profile(self, stage, trial=None):
+        if not self.enabled:
+            return nullcontext()
+
+        return self._profile(stage, trial)
+
+    @contextmanager
+    def _profile(self, stage, trial):
+        if not os.path.exists(self.directory):
+            os.makedirs(self.directory)
+        self._count += 1
+        name = f"{self._count:02d}_{stage}"
+        if trial:
+            name += "_" + re.sub(r'[^\w\-]', '_', trial)
+        base_path = os.path.join(self.directory, name)
+
+        start_tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if start_tracing:
+            tracemalloc.start()
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            start_snapshot = tracemalloc.take_snapshot()
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            # The snapshot is taken before the profile is written, so it doesn't include its allocations.
+            if self.trace_memory:
+                snapshot = tracemalloc.take_snapshot()
+                _, peak = tracemalloc.get_traced_memory()
+                if start_tracing:
+                    tracemalloc.stop()
+                with open(f"{base_path}_allocations.txt", 'w') as file:
+                    file.write(_allocation_summary(snapshot, start_snapshot, peak))
+
+            profiler.dump_stats(f"{base_path}.prof")
+            with open(f"{base_path}_profile.txt", 'w') as file:
+                file.write(_profile_summary(profiler))
+
+
+def _profile_summary(profiler):
+    stream = io.StringIO()
+    stats = pstats.Stats(profiler, stream=stream)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(SUMMARY_LENGTH)
+
+    return stream.getvalue()
+
+
+def _allocation_summary(snapshot, start_snapshot, peak):
+    # Allocations made by tracemalloc itself aren't of interest.
+    filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    snapshot = snapshot.filter_traces(filters)
+    start_snapshot = start_snapshot.filter_traces(filters)
+
+    lines = [f"Peak traced memory: {peak / 1024 ** 2:.1f} MB", "",
+             f"Top {SUMMARY_LENGTH} allocation sites by memory still allocated at the end of the stage:"]
+    lines += [str(statistic) for statistic in snapshot.statistics('lineno')[:SUMMARY_LENGTH]]
+    lines += ["", f"Top {SUMMARY_LENGTH} allocation sites by growth during the stage:"]
+    lines += [str(difference) for difference in snapshot.compare_to(start_snapshot, 'lineno')[:SUMMARY_LENGTH]]
+
+    return "\n".join(lines) + "\n"
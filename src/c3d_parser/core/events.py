@@ -0,0 +1,124 @@
+
+import numpy as np
+import pandas as pd
+
+
+SIDES = ["Left", "Right"]
+
+
+class EventTable:
+    """
+    Gait events of a trial, with one row per event.
+
+    The columns are the side, stride number (strides begin at a foot strike), time, event type,
+    force plate index, marker frame index and validity of each event. Plate and frame are <NA>
+    until assigned, and the plate of every event in a stride that fails validation is cleared.
+    Rows are ordered by side (left first), stride and time.
+    """
+
+    columns = ['side', 'stride', 'time', 'type', 'plate', 'frame', 'valid']
+
+    def __init__(self, data=None):
+        if data is None:
+            data = pd.DataFrame({
+                'side': pd.Series(dtype=object),
+                'stride': pd.Series(dtype=int),
+                'time': pd.Series(dtype=float),
+                'type': pd.Series(dtype=object),
+                'plate': pd.Series(dtype='Int64'),
+                'frame': pd.Series(dtype='Int64'),
+                'valid': pd.Series(dtype=bool),
+            })
+        self.data = data.reset_index(drop=True)
+
+    @classmethod
+    def from_records(cls, records):
+        """
+        Creates a table from (side, time, label) records. Events with a context other than left
+        or right are ignored, and a later event at the same time on the same side replaces an
+        earlier one.
+        """
+        data = pd.DataFrame(records, columns=['side', 'time', 'type'])
+        data = data[data['side'].isin(SIDES)].drop_duplicates(['side', 'time'], keep='last')
+        data['type'] = data['type'].str.title()
+        data = data.iloc[np.lexsort((data['time'].to_numpy(), data['side'].map(SIDES.index).to_numpy()))]
+
+        data['stride'] = (data['type'] == "Foot Strike").groupby(data['side']).cumsum().astype(int)
+        data['plate'] = pd.array([pd.NA] * len(data), dtype='Int64')
+        data['frame'] = pd.array([pd.NA] * len(data), dtype='Int64')
+        data['valid'] = True
+
+        return cls(data[cls.columns])
+
+    @classmethod
+    def from_dict(cls, events):
+        """
+        Creates a table from the {side: {stride: {time: [type, plate]}}} event structure.
+        """
+        records = []
+        for side, side_events in events.items():
+            for stride, stride_events in side_events.items():
+                for event_time, event in stride_events.items():
+                    event_type, plate = (event, None) if isinstance(event, str) else event
+                    records.append((side, stride, event_time, event_type, plate, None, True))
+
+        data = pd.DataFrame(records, columns=cls.columns)
+        data['plate'] = pd.array(data['plate'].tolist(), dtype='Int64')
+        data['frame'] = pd.array(data['frame'].tolist(), dtype='Int64')
+
+        return cls(data)
+
+    def to_dict(self):
+        """
+        Returns the events as {side: {stride: {time: [type, plate]}}}, with plate None where no
+        (valid) force plate is assigned.
+        """
+        events = {side: {} for side in SIDES}
+        plates = [None if plate is pd.NA else int(plate) for plate in self.data['plate']]
+        for side, stride, event_time, event_type, plate in zip(self.data['side'], self.data['stride'],
+                                                               self.data['time'], self.data['type'], plates):
+            events[side].setdefault(int(stride), {})[float(event_time)] = [event_type, plate]
+
+        return events
+
+    def __len__(self):
+        return len(self.data)
+
+    def select(self, mask):
+        return EventTable(self.data[np.asarray(mask, dtype=bool)])
+
+    def stride_events(self, position):
+        """
+        Returns the `position`th event (0 for the first) of every stride that has one.
+        """
+        return self.data.groupby(['side', 'stride'], sort=False).nth(position)
+
+    def strikes(self):
+        """
+        Returns the strides that begin with a foot strike, with the time and plate of the strike.
+        """
+        first_events = self.stride_events(0)
+        strikes = first_events[first_events['type'] == "Foot Strike"]
+
+        return strikes[['side', 'stride', 'time', 'plate']].reset_index(drop=True)
+
+    def stance_windows(self):
+        """
+        Returns the strides whose first two events lie on the same force plate, as side, stride,
+        plate, start time (first event) and end time (second event).
+        """
+        first_events = self.stride_events(0).set_index(['side', 'stride'])
+        second_events = self.stride_events(1).set_index(['side', 'stride'])
+        windows = first_events.join(second_events, how='inner', lsuffix='_start', rsuffix='_end')
+        on_plate = windows['plate_start'].notna() & windows['plate_end'].notna()
+        windows = windows[on_plate.to_numpy(dtype=bool)]
+        windows = windows[(windows['plate_start'] == windows['plate_end']).to_numpy(dtype=bool)]
+
+        windows = windows.reset_index()
+        return pd.DataFrame({
+            'side': windows['side'],
+            'stride': windows['stride'],
+            'plate': windows['plate_start'].astype(int),
+            'start_time': windows['time_start'],
+            'end_time': windows['time_end'],
+        })
@@ -0,0 +1,104 @@
+
+import os
+import json
+import importlib.util
+import numpy as np
+
+from c3d_parser.core.spatiotemporal import combine_spatiotemporal_data
+from c3d_parser.settings.general import VERSION
+from c3d_parser.settings.logging import logger
+
+
+# Version of the columnar table layout, recorded in the manifest.
+SCHEMA_VERSION = 1
+
+COLUMNAR_FORMATS = ['parquet', 'npz']
+
+
+def parquet_available():
+    return importlib.util.find_spec('pyarrow') is not None
+
+
+def cycle_table(data, selected_trials, excluded_cycles):
+    """
+    Returns the included cycles of the trials in `selected_trials` as a long-format table with
+    trial (output name), side, cycle and frame columns followed by one column per variable.
+    """
+    mask = data.mask(trials=selected_trials.keys(), excluded_cycles=excluded_cycles)
+    table = data.to_frame(mask)
+    table['trial'] = table['trial'].map(selected_trials)
+
+    return table
+
+
+def spatiotemporal_table(data, selected_trials):
+    """
+    Returns the spatio-temporal data of the trials in `selected_trials` with trial, side and
+    cycle columns followed by one column per measurement.
+    """
+    table = combine_spatiotemporal_data(data, selected_trials)
+
+    return table.rename(columns={"Trial": 'trial', "Side": 'side', "Cycle-Number": 'cycle'})
+
+
+def write_columnar_data(tables, output_directory, file_format='parquet'):
+    """
+    Writes each table in `tables` (a dictionary of data frames by name) to a typed columnar file
+    in the 'normalised/columnar' output directory, with a manifest describing the schema.
+
+    Parquet files need pyarrow. If it isn't installed the tables are written as NPZ archives,
+    with one array per column.
+    """
+    if file_format not in COLUMNAR_FORMATS:
+        raise ValueError(f"Unknown columnar format: {file_format}")
+    if file_format == 'parquet' and not parquet_available():
+        logger.warning("Parquet output requires pyarrow. Writing columnar data as NPZ instead.")
+        file_format = 'npz'
+
+    columnar_directory = os.path.join(output_directory, 'normalised', 'columnar')
+    if not os.path.exists(columnar_directory):
+        os.makedirs(columnar_directory)
+
+    manifest = {
+        'schema_version': SCHEMA_VERSION,
+        'c3d_parser_version': VERSION,
+        'format': file_format,
+        'tables': {},
+    }
+    for name, table in tables.items():
+        file_name = f"{name}.{file_format}"
+        output_file = os.path.join(columnar_directory, file_name)
+        if file_format == 'parquet':
+            table.to_parquet(output_file, index=False)
+        else:
+            # Text columns are stored as fixed-width strings so the archive loads without pickle.
+            columns = {column: table[column].to_numpy(dtype=str if table[column].dtype == object else None)
+                       for column in table.columns}
+            np.savez(output_file, **columns)
+
+        manifest['tables'][name] = {
+            'file': file_name,
+            'rows': len(table),
+            'columns': {column: str(dtype) for column, dtype in table.dtypes.items()},
+        }
+
+    with open(os.path.join(columnar_directory, 'manifest.json'), 'w') as file:
+        json.dump(manifest, file, indent=4)
+
+
+def write_columnar_outputs(grf_data, kinematic_data, kinetic_data, s_t_data, selected_trials, excluded_cycles,
+                           output_directory, file_format='parquet'):
+    """
+    Writes the normalised GRF, kinematic and kinetic cycles and the spatio-temporal data of the
+    selected trials as columnar files. `excluded_cycles` holds the excluded cycles of each data
+    type, by 'grf', 'kinematics' and 'kinetics'.
+    """
+    tables = {
+        'grf': cycle_table(grf_data, selected_trials, excluded_cycles['grf']),
+        'kinematics': cycle_table(kinematic_data, selected_trials, excluded_cycles['kinematics']),
+        'kinetics': cycle_table(kinetic_data, selected_trials, excluded_cycles['kinetics']),
+    }
+    if any(trial in selected_trials and not df.empty for trial, df in s_t_data.items()):
+        tables['spatiotemporal'] = spatiotemporal_table(s_t_data, selected_trials)
+
+    write_columnar_data(tables, output_directory, file_format)
@@ -0,0 +1,100 @@
+
+import hashlib
+import numpy as np
+
+from scipy.spatial.transform import Rotation
+
+
+_plate_geometry_cache = {}
+
+
+class PlateGeometry:
+    """
+    Force plate geometry derived from the FORCE_PLATFORM parameters of a C3D file.
+
+    Instances are shared between every trial recorded with the same plate set-up, so the
+    derived values should be treated as read-only.
+    """
+
+    def __init__(self, corners, channels=None, calibration_matrix=None):
+        self.corners = np.asarray(corners, dtype=float).reshape(-1, 4, 3)
+        self.channels = None if channels is None else np.asarray(channels, dtype=int)
+        self.calibration_matrix = None if calibration_matrix is None else np.asarray(calibration_matrix, dtype=float)
+
+        # Unused plates may have degenerate (e.g. all zero) corners, which have no orientation.
+        self.rotation_matrices = np.array([calculate_plate_rotation(plate) if _has_orientation(plate) else np.eye(3)
+                                           for plate in self.corners]).reshape(-1, 3, 3)
+        self.centres = self.corners.mean(axis=1)
+        self.mean_centre = self.centres.mean(axis=0) if len(self) else np.zeros(3)
+
+        # Plate outlines in the global XY plane, as edge start points and edge vectors.
+        self.edge_origins = self.corners[:, :, :2]
+        self.edge_vectors = np.roll(self.edge_origins, -1, axis=1) - self.edge_origins
+        self.areas = np.abs((self.edge_origins[..., 0] * self.edge_vectors[..., 1]
+                             - self.edge_origins[..., 1] * self.edge_vectors[..., 0]).sum(axis=1)) / 2
+
+    def __len__(self):
+        return len(self.corners)
+
+    def contains(self, points):
+        """
+        Returns a boolean (points x plates) matrix identifying the plates each point lies on.
+
+        Each plate is treated as a convex polygon in the global XY plane, so rotated plates are
+        handled correctly. Points on a plate edge are considered to be on the plate, and no point is
+        on a plate with zero area.
+        """
+        points = np.atleast_2d(np.asarray(points, dtype=float))[:, np.newaxis, np.newaxis, :2]
+        offsets = points - self.edge_origins
+        cross = self.edge_vectors[..., 0] * offsets[..., 1] - self.edge_vectors[..., 1] * offsets[..., 0]
+
+        # A point is inside a convex polygon if it is on the same side of every edge.
+        inside = np.all(cross >= 0, axis=2) | np.all(cross <= 0, axis=2)
+        return inside & (self.areas > 0)
+
+
+def calculate_plate_rotation(corners):
+    x_vector = corners[0] - corners[1]
+    y_vector = corners[0] - corners[3]
+    x_unit_vector = x_vector / np.linalg.norm(x_vector)
+    y_unit_vector = y_vector / np.linalg.norm(y_vector)
+    force_plate_axes = [x_unit_vector, y_unit_vector]
+    global_axes = [[1, 0, 0], [0, 1, 0]]
+    rotation, _ = Rotation.align_vectors(force_plate_axes, global_axes)
+
+    return rotation.as_matrix()
+
+
+def get_plate_geometry(corners, channels=None, calibration_matrix=None):
+    """
+    Returns the `PlateGeometry` for the given plate parameters, reusing a previously computed
+    instance if the same set of corners, channels and calibration matrices has been seen before.
+    """
+    key = _hash_arrays(corners, channels, calibration_matrix)
+    if key not in _plate_geometry_cache:
+        _plate_geometry_cache[key] = PlateGeometry(corners, channels, calibration_matrix)
+
+    return _plate_geometry_cache[key]
+
+
+def clear_plate_geometry_cache():
+    _plate_geometry_cache.clear()
+
+
+def _hash_arrays(*arrays):
+    digest = hashlib.sha1()
+    for array in arrays:
+        if array is None:
+            digest.update(b'none')
+            continue
+        array = np.ascontiguousarray(array)
+        digest.update(str((array.dtype.str, array.shape)).encode())
+        digest.update(array.tobytes())
+
+    return digest.hexdigest()
+
+
+def _has_orientation(corners):
+    x_vector = corners[0] - corners[1]
+    y_vector = corners[0] - corners[3]
+    return np.linalg.norm(np.cross(x_vector, y_vector)) > 0
@@ -0,0 +1,388 @@
+
+import os
+import math
+import numpy as np
+import pandas as pd
+
+from scipy import signal
+
+from c3d_parser.core.c3d_patch import c3d
+from c3d_parser.core.resampling import get_resampled_times, get_rate_ratio, resample_signals
+from c3d_parser.core.segmentation import GRF_RULE
+from c3d_parser.settings.logging import logger
+
+
+# Trials longer than this (in seconds) have their GRF data processed in chunks.
+GRF_STREAMING_DURATION = 60.0
+
+# Number of output (1000 Hz) samples processed per chunk.
+DEFAULT_CHUNK_SIZE = 5000
+
+# Seconds of raw data either side of a chunk used as context when filtering and resampling.
+CHUNK_MARGIN = 1.0
+
+# Contact windows can extend at most this many seconds beyond their strike and off events.
+INTERFERENCE_LIMIT = 0.2
+
+GRF_COLUMNS = ["ground_force_vx", "ground_force_vy", "ground_force_vz",
+               "ground_force_px", "ground_force_py", "ground_force_pz",
+               "1_ground_force_vx", "1_ground_force_vy", "1_ground_force_vz",
+               "1_ground_force_px", "1_ground_force_py", "1_ground_force_pz",
+               "ground_torque_x", "ground_torque_y", "ground_torque_z",
+               "1_ground_torque_x", "1_ground_torque_y", "1_ground_torque_z"]
+
+# Order of the concatenated (left, right) plate columns in the OpenSim output.
+OPENSIM_ORDER = [0, 1, 2, 3, 4, 5, 9, 10, 11, 12, 13, 14, 6, 7, 8, 15, 16, 17]
+SCALED_COLUMNS = [3, 4, 5, 9, 10, 11, 12, 13, 14, 15, 16, 17]
+
+
+class _ContactWindow:
+    def __init__(self, foot, stride_number, plate, strike_time, off_time, strike_index, off_index):
+        self.foot = foot
+        self.side = 0 if foot == "Left" else 1
+        self.stride_number = stride_number
+        self.plate = plate
+        self.strike_time = strike_time
+        self.off_time = off_time
+        self.strike_index = strike_index
+        self.off_index = off_index
+        self.start = None
+        self.end = None
+
+
+def stream_grf_data(file_path, start_frame, end_frame, events, plate_count, plates, rotation_matrix, filter_grf,
+                    output_file, chunk_size=DEFAULT_CHUNK_SIZE, frequency=1000, cancel_token=None):
+    """
+    Processes the GRF data of a dynamic trial in fixed-size chunks and writes the result to
+    `output_file`.
+
+    This is equivalent to the in-memory GRF chain in `parse_dynamic_trial` (calibration,
+    filtering, resampling, zeroing, force and couple, plate transforms, concatenation, scaling
+    and rotation) but only holds a bounded amount of raw analog data at any time. Contact
+    windows are tracked across chunk boundaries.
+
+    Returns the processed GRF data as a `pandas.DataFrame`, and the number of samples written.
+    Only the rows needed to segment the force plate cycles with `GRF_RULE` are returned, so
+    memory use grows with the number of those cycles rather than with the trial length.
+
+    `cancel_token` is an optional `CancellationToken`, checked before each chunk.
+    """
+    with open(file_path, 'rb') as handle:
+        reader = c3d.Reader(handle)
+        data_rate = reader.analog_rate
+        time_increment = 1 / data_rate
+        start = (start_frame - 1) / reader.point_rate
+        raw_count = (end_frame - start_frame + 1) * reader.analog_per_frame
+
+        def raw_times(first, last):
+            return start + np.arange(first, last) * time_increment
+
+        resample = data_rate != frequency
+        if resample:
+            output_times = get_resampled_times(start, float(raw_times(raw_count - 1, raw_count)[0]), frequency)
+            ratio = get_rate_ratio(data_rate, frequency)
+            step = ratio[0] if ratio else 1
+            chunk_size = int(math.ceil(chunk_size / step) * step)
+        else:
+            output_times = raw_times(0, raw_count)
+        output_count = len(output_times)
+
+        source = _RawAnalogSource(reader, start_frame, end_frame, plate_count, plates)
+        if filter_grf:
+            # Match the coefficients used by `filter_data`.
+            b, a = signal.butter(2, 8 / (data_rate / 2))
+        margin = int(math.ceil(CHUNK_MARGIN * data_rate))
+
+        windows = _define_contact_windows(events, output_times)
+        lookahead = int(math.ceil(INTERFERENCE_LIMIT * frequency)) + 5
+        projection = np.array([[1, 0, 0], [0, 0, 1], [0, -1, 0]]) @ rotation_matrix
+
+        cycle_rows = _CycleRows(events, output_times)
+        pending = np.zeros((0, 9 * plate_count))
+        pending_offset = 0
+        processed = 0
+        emitted = 0
+
+        with open(output_file, 'w') as file:
+            write_grf_header(file, output_file, output_count, ['time'] + GRF_COLUMNS)
+
+            for chunk_start in range(0, output_count, chunk_size):
+                if cancel_token is not None:
+                    cancel_token.raise_if_cancelled()
+                chunk_end = min(chunk_start + chunk_size, output_count)
+
+                # Gather the raw samples for this chunk, with context either side.
+                if resample:
+                    first = int(math.floor((output_times[chunk_start] - start) * data_rate)) - margin
+                    last = int(math.ceil((output_times[chunk_end - 1] - start) * data_rate)) + 1 + margin
+                else:
+                    first, last = chunk_start - margin, chunk_end + margin
+                first, last = max(first, 0), min(last, raw_count)
+                values = source.read(first, last)
+
+                if filter_grf:
+                    values = signal.filtfilt(b, a, values, axis=0)
+                if resample:
+                    values = resample_signals(raw_times(first, last), values, data_rate, frequency,
+                                              output_times[chunk_start:chunk_end])
+                else:
+                    values = values[chunk_start - first:chunk_end - first]
+
+                plate_data = _calculate_plate_data(values, plate_count, plates)
+                pending = np.concatenate([pending, plate_data])
+                processed = chunk_end
+                finished = processed == output_count
+
+                _resolve_contact_windows(windows, pending, pending_offset, processed, output_times, finished)
+
+                # Only emit samples whose contact windows can no longer change.
+                emit_end = processed if finished else max(processed - lookahead, emitted)
+                if emit_end > emitted:
+                    rows = _concatenate_plate_data(pending, pending_offset, emitted, emit_end, windows, plates)
+                    rows[:, SCALED_COLUMNS] /= 1000
+                    rows = (rows.reshape(-1, 6, 3) @ projection.T).reshape(-1, 18)
+                    rows = np.column_stack([output_times[emitted:emit_end], rows])
+
+                    np.savetxt(file, rows, fmt='%0.6f', delimiter='\t')
+                    cycle_rows.add(rows, emitted)
+                    emitted = emit_end
+
+                    pending = pending[emitted - pending_offset:]
+                    pending_offset = emitted
+                source.discard(first)
+
+    return cycle_rows.data(), output_count
+
+
+def write_grf_header(file, file_path, row_count, columns):
+    file.write(f"{os.path.basename(file_path)}\n")
+    file.write("version=1\n")
+    file.write(f"nRows={row_count}\n")
+    file.write(f"nColumns={len(columns)}\n")
+    file.write("inDegrees=yes\n")
+    file.write("endheader\n\n")
+
+    # Write labels.
+    for label in columns:
+        file.write(f"{label.strip()}\t")
+    file.write("\n")
+
+
+class _RawAnalogSource:
+    """
+    Reads the force plate channels of a C3D file sequentially, holding only the samples that
+    have not yet been discarded.
+    """
+
+    def __init__(self, reader, start_frame, end_frame, plate_count, plates):
+        self._frames = reader.read_frames()
+        self._start_frame = start_frame
+        self._end_frame = end_frame
+        self._plate_count = plate_count
+        self._plates = plates
+        self._blocks = []
+        self._offset = 0
+        self._available = 0
+
+    def read(self, first, last):
+        while self._offset + self._available < last:
+            block = self._next_block()
+            if block is None:
+                break
+            self._blocks.append(block)
+            self._available += len(block)
+
+        values = np.concatenate(self._blocks) if len(self._blocks) > 1 else self._blocks[0]
+        self._blocks = [values]
+
+        return values[first - self._offset:last - self._offset]
+
+    def discard(self, first):
+        if first > self._offset and self._blocks:
+            values = self._blocks[0][first - self._offset:]
+            self._blocks = [values]
+            self._available = len(values)
+            self._offset = first
+
+    def _next_block(self):
+        for i, points, analog in self._frames:
+            if i < self._start_frame:
+                continue
+            if self._end_frame < i:
+                return None
+            return self._select_plate_channels(np.asarray(analog, dtype=float).T)
+        return None
+
+    def _select_plate_channels(self, analog):
+        channels = self._plates.channels
+        if channels is None:
+            return analog[:, :6 * self._plate_count]
+
+        # Convert analog units in V (to N), then order channels according to metadata order.
+        selected = analog[:, channels.flatten() - 1]
+        if self._plates.calibration_matrix is not None:
+            for i in range(self._plate_count):
+                selected[:, 6 * i:6 * i + 6] = analog[:, channels[i] - 1] @ self._plates.calibration_matrix[i]
+        return selected
+
+
+class _CycleRows:
+    """
+    Holds the emitted GRF rows that `segment_trial` reads with `GRF_RULE`: the first row, and
+    each force plate cycle from the sample before its start to the next strike of the same side.
+    Segmenting these rows gives the same cycles as segmenting the whole trial. Other rows are
+    dropped once no later cycle can start before them.
+    """
+
+    def __init__(self, events, output_times):
+        strikes = events.strikes()
+        self._contact_columns = []
+        self._strikes = []
+        for side in ["Left", "Right"]:
+            self._contact_columns.append(GRF_COLUMNS.index(GRF_RULE.columns[side][GRF_RULE.contact_column]) + 1)
+
+            # The sample at (or before) each strike, for strikes on a force plate that are
+            # followed by another strike of the same side.
+            side_strikes = strikes[strikes['side'] == side]
+            last_before = np.searchsorted(output_times, side_strikes['time'].to_numpy(dtype=float), side='right') - 1
+            last_before = np.maximum(last_before, 0)
+            on_plate = side_strikes['plate'].notna().to_numpy()
+            self._strikes.append([(int(last_before[i]), int(last_before[i + 1]))
+                                  for i in range(len(side_strikes) - 1) if on_plate[i]])
+
+        self._last_unloaded = [-1, -1]
+        self._ranges = []
+        self._rows = np.zeros((0, len(GRF_COLUMNS) + 1))
+        self._offset = 0
+        self._kept = []
+
+    def add(self, rows, first):
+        last = first + len(rows)
+        indices = np.arange(first, last)
+        for side, column in enumerate(self._contact_columns):
+            # The last unloaded sample at (or before) each row, as in `cycle_boundaries`.
+            unloaded = np.maximum.accumulate(np.where(rows[:, column] > 0, -1, indices))
+            unloaded = np.maximum(unloaded, self._last_unloaded[side])
+            strikes = self._strikes[side]
+            while strikes and strikes[0][0] < last:
+                last_before, end = strikes.pop(0)
+                start = max(int(unloaded[last_before - first]), 0)
+                # Cycles starting on the first sample are discarded by `cycle_boundaries`.
+                if start != 0:
+                    self._ranges.append((start - 1, end))
+            self._last_unloaded[side] = int(unloaded[-1])
+
+        self._rows = np.concatenate([self._rows, rows])
+        # Later cycles start at or after the last unloaded sample of their side.
+        self._release(min(self._last_unloaded) - 1)
+
+    def data(self):
+        self._release(self._offset + len(self._rows))
+        values = np.concatenate(self._kept) if self._kept else self._rows
+        return pd.DataFrame(values, columns=['time'] + GRF_COLUMNS)
+
+    def _release(self, end):
+        count = end - self._offset
+        if count <= 0:
+            return
+
+        indices = np.arange(self._offset, end)
+        keep = indices == 0
+        for first, last in self._ranges:
+            keep |= (first <= indices) & (indices <= last)
+        self._kept.append(self._rows[:count][keep])
+
+        self._rows = self._rows[count:]
+        self._offset = end
+        self._ranges = [(first, last) for first, last in self._ranges if last >= end]
+
+
+def _calculate_plate_data(values, plate_count, plates):
+    plate_data = np.zeros((len(values), 9 * plate_count))
+    for i in range(plate_count):
+        forces = values[:, 6 * i:6 * i + 6].copy()
+        forces[forces[:, 2] > 0] = 0
+        Fx, Fy, Fz, Mx, My, Mz = forces.T
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            CoPx = np.zeros_like(Fz)
+            CoPy = np.zeros_like(Fz)
+            nonzero = Fz != 0
+            CoPx[nonzero] = -(My[nonzero] + Fx[nonzero]) / Fz[nonzero]
+            CoPy[nonzero] = (Mx[nonzero] - Fy[nonzero]) / Fz[nonzero]
+        Tz = Mz - CoPx * Fy + CoPy * Fx
+
+        block = plate_data[:, 9 * i:9 * i + 9]
+        block[:, [0, 1, 2, 3, 4, 8]] = np.column_stack([Fx, Fy, Fz, CoPx, CoPy, Tz])
+        block[:] = (block.reshape(-1, 3, 3) @ plates.rotation_matrices[i].T).reshape(-1, 9)
+        block[:, 3] += plates.centres[i][0]
+        block[:, 4] += plates.centres[i][1]
+
+    return plate_data
+
+
+def _define_contact_windows(events, output_times):
+    windows = []
+    stance_windows = events.stance_windows()
+    strike_indices = np.searchsorted(output_times, stance_windows['start_time'].to_numpy(), side='right') - 1
+    off_indices = np.searchsorted(output_times, stance_windows['end_time'].to_numpy(), side='right') - 1
+    for window, strike_index, off_index in zip(stance_windows.itertuples(index=False), strike_indices, off_indices):
+        windows.append(_ContactWindow(window.side, window.stride, window.plate, window.start_time, window.end_time,
+                                      max(int(strike_index), 0), max(int(off_index), 0)))
+    return windows
+
+
+def _resolve_contact_windows(windows, pending, pending_offset, processed, output_times, finished):
+    def loaded(plate, index):
+        return pending[index - pending_offset, 9 * plate + 2] > 0
+
+    for window in windows:
+        plate = window.plate
+
+        # Extend the window back to the start of the contact.
+        if window.start is None and window.strike_index < processed:
+            start = window.strike_index
+            while loaded(plate, start):
+                start -= 1
+                if start < pending_offset or output_times[start] < window.strike_time - INTERFERENCE_LIMIT:
+                    start = max(start, pending_offset)
+                    break
+            if output_times[start] < window.strike_time - INTERFERENCE_LIMIT:
+                logger.warn(f"Interference detected on force plate at the beginning of "
+                            f"stride ({window.foot} {window.stride_number}).")
+                start = window.strike_index
+            window.start = start
+
+        # Extend the window forward to the end of the contact.
+        limit_reached = output_times[processed - 1] > window.off_time + INTERFERENCE_LIMIT
+        if window.end is None and (finished or limit_reached) and window.off_index < processed:
+            end = window.off_index
+            while loaded(plate, end):
+                end += 1
+                if end >= processed:
+                    end = processed - 1
+                    break
+                if output_times[end] > window.off_time + INTERFERENCE_LIMIT:
+                    break
+            if window.off_time + INTERFERENCE_LIMIT < output_times[end]:
+                logger.warn(f"Interference detected on force plate at the end of stride "
+                            f"({window.foot} {window.stride_number}).")
+                end = window.off_index
+            window.end = end
+
+
+def _concatenate_plate_data(pending, pending_offset, first, last, windows, plates):
+    rows = np.zeros((last - first, 18))
+    rows[:, [3, 12]] = plates.mean_centre[0]
+    rows[:, [4, 13]] = plates.mean_centre[1]
+
+    for window in windows:
+        if window.start is None:
+            continue
+        end = window.off_index if window.end is None else window.end
+        lower, upper = max(window.start, first), min(end + 1, last)
+        if lower < upper:
+            source = pending[lower - pending_offset:upper - pending_offset, 9 * window.plate:9 * window.plate + 9]
+            rows[lower - first:upper - first, 9 * window.side:9 * window.side + 9] = source
+
+    return rows[:, OPENSIM_ORDER]
@@ -0,0 +1,98 @@
+
+import os
+import json
+import time
+import pickle
+
+from c3d_parser.core.stage_cache import file_digest
+from c3d_parser.settings.logging import logger
+
+
+JOURNAL_DIRECTORY = '.journal'
+JOURNAL_FILE = 'journal.jsonl'
+
+
+class SessionJournal:
+    """
+    Stage-completion journal of a session, kept in its output directory.
+
+    Every completed stage appends a record with its key, the checksums of the files it wrote and
+    its pickled result. When a session is resumed, stages recorded with the same key whose files
+    are unchanged are skipped, so processing continues from the first incomplete stage.
+    """
+
+    def __init__(self, output_directory, resume=False):
+        self.output_directory = output_directory
+        self.directory = os.path.join(output_directory, JOURNAL_DIRECTORY)
+        self._journal_file = os.path.join(self.directory, JOURNAL_FILE)
+
+        self._entries = {}
+        if resume and os.path.exists(self._journal_file):
+            with open(self._journal_file, 'r') as file:
+                for line in file:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # A record cut short by an interruption.
+                        continue
+                    self._entries[entry['key']] = entry
+        if not os.path.exists(self.directory):
+            os.makedirs(self.directory)
+
+    def run(self, stage, key, compute, name=None):
+        """
+        Returns the result of `stage` and the paths of the files it wrote, skipping `compute()` if
+        the stage completed with the same key in the run being resumed.
+        """
+        completed = self._completed(key)
+        if completed is not None:
+            logger.info(f"Skipping completed {stage} stage" + (f" for {name}." if name else "."))
+            return completed
+
+        result, files = compute()
+        self._record(stage, key, name, result, files)
+
+        return result, files
+
+    def _completed(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        files = []
+        for relative_path, checksum in entry['files'].items():
+            file_path = os.path.join(self.output_directory, relative_path)
+            if not os.path.isfile(file_path) or file_digest(file_path) != checksum:
+                logger.info(f"Output file {relative_path} changed since the {entry['stage']} stage completed.")
+                return None
+            files.append(file_path)
+
+        try:
+            with open(os.path.join(self.directory, entry['result']), 'rb') as file:
+                result = pickle.load(file)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+        return result, files
+
+    def _record(self, stage, key, name, result, files):
+        result_file = f"{key}.pkl"
+        temporary_file = os.path.join(self.directory, f"{result_file}.tmp")
+        with open(temporary_file, 'wb') as file:
+            pickle.dump(result, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary_file, os.path.join(self.directory, result_file))
+
+        entry = {
+            'stage': stage,
+            'name': name,
+            'key': key,
+            'files': {os.path.relpath(file_path, self.output_directory): file_digest(file_path)
+                      for file_path in files},
+            'result': result_file,
+            'completed': time.strftime('%Y-%m-%d %H:%M:%S'),
+        }
+        with open(self._journal_file, 'a') as file:
+            file.write(json.dumps(entry) + '\n')
+            file.flush()
+            os.fsync(file.fileno())
+        self._entries[key] = entry
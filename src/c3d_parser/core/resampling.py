@@ -0,0 +1,214 @@
+
+import time
+import numpy as np
+import pandas as pd
+
+from fractions import Fraction
+from functools import lru_cache
+from scipy import signal, interpolate
+from decimal import Decimal, ROUND_CEILING, ROUND_FLOOR
+
+
+# Largest up/down factor for which the polyphase path is used.
+MAX_POLYPHASE_FACTOR = 50
+
+# Anti-aliasing filter used by the polyphase path. The default `resample_poly` filter has
+# around 0.1% passband ripple, this longer filter keeps the relative error in the GRF band
+# around 1e-6 (away from the ends of the trial).
+POLYPHASE_HALF_LENGTH = 32
+POLYPHASE_KAISER_BETA = 12.0
+
+
+def get_resampled_times(start_time, end_time, frequency):
+    """
+    Returns the output time stamps used when resampling data recorded between `start_time` and
+    `end_time`. The output starts and ends on whole hundredths of a second.
+    """
+    start_time = round(Decimal(start_time), 4).quantize(Decimal('0.01'), rounding=ROUND_CEILING)
+    end_time = round(Decimal(end_time), 4).quantize(Decimal('0.01'), rounding=ROUND_FLOOR)
+    number_of_frames = round((end_time - start_time) * frequency) + 1
+
+    return np.linspace(float(start_time), float(end_time), number_of_frames)
+
+
+def get_rate_ratio(data_rate, frequency, max_factor=MAX_POLYPHASE_FACTOR):
+    """
+    Returns the (up, down) factors converting `data_rate` to `frequency`, or None if the ratio
+    can't be expressed with factors of at most `max_factor`.
+    """
+    ratio = Fraction(frequency / data_rate).limit_denominator(max_factor)
+    up, down = ratio.numerator, ratio.denominator
+    if up > max_factor or not np.isclose(up * data_rate, down * frequency, rtol=1e-9, atol=0):
+        return None
+
+    return up, down
+
+
+def resample_analog_data(analog_data, data_rate, frequency=1000, method='auto'):
+    """
+    Resamples the analog channels of `analog_data` to `frequency`.
+
+    Integer rate reductions whose sample grids align (for example 2000 Hz or 3000 Hz to 1000 Hz)
+    keep every n-th sample, as the spline interpolation used previously did. Other rational rate
+    conversions (for example 1200 Hz to 1000 Hz) use polyphase filtering, and irregular ratios
+    fall back to cubic spline interpolation. The `method` argument can be used to force a path
+    ('decimate', 'polyphase' or 'spline').
+    """
+    if data_rate == frequency:
+        return analog_data
+
+    time_values = analog_data.iloc[:, 0].to_numpy(dtype=float)
+    time_array = get_resampled_times(time_values[0], time_values[-1], frequency)
+    values = analog_data.iloc[:, 1:].to_numpy(dtype=float)
+    resampled_values = resample_signals(time_values, values, data_rate, frequency, time_array, method)
+
+    resampled_data = pd.DataFrame(resampled_values, columns=analog_data.columns[1:])
+    resampled_data.insert(0, analog_data.columns[0], time_array)
+
+    return resampled_data
+
+
+def resample_signals(time_values, values, data_rate, frequency, time_array, method='auto'):
+    """
+    Resamples the (samples x channels) array `values` onto `time_array`, which should be sampled
+    at `frequency`.
+    """
+    if method not in ('auto', 'decimate', 'polyphase', 'spline'):
+        raise ValueError(f"Unknown resampling method: {method}.")
+
+    if method in ('auto', 'decimate'):
+        resampled_values = _resample_decimate(time_values, values, data_rate, frequency, time_array)
+        if resampled_values is not None:
+            return resampled_values
+        if method == 'decimate':
+            raise ValueError(f"Cannot use decimation to convert {data_rate} Hz to {frequency} Hz.")
+
+    if method != 'spline':
+        resampled_values = _resample_polyphase(time_values, values, data_rate, frequency, time_array)
+        if resampled_values is not None:
+            return resampled_values
+        if method == 'polyphase':
+            raise ValueError(f"Cannot use polyphase resampling to convert {data_rate} Hz to {frequency} Hz.")
+
+    return _resample_spline(time_values, values, time_array)
+
+
+def select_resampling_method(time_values, data_rate, frequency, time_array):
+    ratio = get_rate_ratio(data_rate, frequency)
+    if ratio is None:
+        return 'spline'
+    if _polyphase_offset(time_values, data_rate, time_array) is None:
+        return 'spline'
+    if ratio[0] == 1:
+        return 'decimate'
+    return 'polyphase'
+
+
+def _polyphase_offset(time_values, data_rate, time_array):
+    # The first output sample must coincide with an input sample for the sample grids to align.
+    offset = int(round((time_array[0] - time_values[0]) * data_rate))
+    if offset < 0 or offset >= len(time_values):
+        return None
+    if abs(time_values[offset] - time_array[0]) > 1e-3 / data_rate:
+        return None
+
+    return offset
+
+
+def _resample_decimate(time_values, values, data_rate, frequency, time_array):
+    # Integer rate reductions on aligned grids keep the input samples at the output times, as
+    # an interpolating spline would, without the ringing of an anti-aliasing filter.
+    ratio = get_rate_ratio(data_rate, frequency)
+    offset = _polyphase_offset(time_values, data_rate, time_array)
+    if ratio is None or ratio[0] != 1 or offset is None:
+        return None
+
+    resampled_values = values[offset::ratio[1]]
+    if len(resampled_values) < len(time_array):
+        return None
+
+    return resampled_values[:len(time_array)]
+
+
+def _resample_polyphase(time_values, values, data_rate, frequency, time_array):
+    ratio = get_rate_ratio(data_rate, frequency)
+    offset = _polyphase_offset(time_values, data_rate, time_array)
+    if ratio is None or offset is None:
+        return None
+    up, down = ratio
+
+    # Start from an earlier input sample on the same phase, so that samples preceding the first
+    # output time are used as filter context rather than padding.
+    periods = offset // down
+    begin = offset - periods * down
+    resampled_values = signal.resample_poly(values[begin:], up, down, axis=0, window=_polyphase_filter(up, down),
+                                            padtype='line')
+
+    first = periods * up
+    if len(resampled_values) < first + len(time_array):
+        return None
+
+    return resampled_values[first:first + len(time_array)]
+
+
+@lru_cache(maxsize=None)
+def _polyphase_filter(up, down):
+    max_rate = max(up, down)
+    taps = 2 * POLYPHASE_HALF_LENGTH * max_rate + 1
+    return signal.firwin(taps, 1 / max_rate, window=('kaiser', POLYPHASE_KAISER_BETA))
+
+
+def _resample_spline(time_values, values, time_array):
+    spline = interpolate.make_interp_spline(time_values, values, k=3, axis=0)
+    return spline(time_array)
+
+
+def resampling_report(analog_data, data_rate, frequency=1000, reference=None, edge_samples=100):
+    """
+    Compares the polyphase and spline resampling paths for `analog_data`.
+
+    Returns a dictionary with the selected method, the execution time of each path and the
+    per-channel differences between them. If `reference` is given (a callable returning the
+    true channel values at the requested times) the error of each path is reported as well.
+    Interior statistics exclude `edge_samples` output samples at either end of the data.
+    """
+    time_values = analog_data.iloc[:, 0].to_numpy(dtype=float)
+    time_array = get_resampled_times(time_values[0], time_values[-1], frequency)
+    values = analog_data.iloc[:, 1:].to_numpy(dtype=float)
+    labels = [str(label) for label in analog_data.columns[1:]]
+
+    report = {
+        'data_rate': float(data_rate),
+        'frequency': float(frequency),
+        'ratio': get_rate_ratio(data_rate, frequency),
+        'selected_method': select_resampling_method(time_values, data_rate, frequency, time_array),
+        'samples_in': int(len(time_values)),
+        'samples_out': int(len(time_array)),
+        'channels': labels,
+    }
+
+    results = {}
+    for method in ['polyphase', 'spline']:
+        try:
+            start = time.perf_counter()
+            results[method] = resample_signals(time_values, values, data_rate, frequency, time_array, method)
+            report[f'{method}_seconds'] = time.perf_counter() - start
+        except ValueError:
+            report[f'{method}_seconds'] = None
+
+    def summarise(difference):
+        interior = difference[edge_samples:-edge_samples] if len(difference) > 2 * edge_samples else difference
+        return {
+            'max_abs': np.abs(difference).max(axis=0).tolist(),
+            'rms': np.sqrt(np.mean(difference ** 2, axis=0)).tolist(),
+            'interior_max_abs': np.abs(interior).max(axis=0).tolist(),
+        }
+
+    if len(results) == 2:
+        report['difference'] = summarise(results['polyphase'] - results['spline'])
+    if reference is not None:
+        expected = reference(time_array)
+        for method, resampled_values in results.items():
+            report[f'{method}_error'] = summarise(resampled_values - expected)
+
+    return report
@@ -0,0 +1,155 @@
+
+import os
+import time
+from contextlib import contextmanager, nullcontext
+
+
+# Pipeline stages of a session, in the order they run.
+STAGES = ['parse', 'model_fit', 'ik', 'id', 'normalise', 'write']
+
+# Default resources held by each stage while it runs: CPU cores and peak memory (MB).
+DEFAULT_STAGE_PROFILES = {
+    'parse': {'cpu': 1, 'memory': 500},
+    'model_fit': {'cpu': 1, 'memory': 3000},
+    'ik': {'cpu': 1, 'memory': 1500},
+    'id': {'cpu': 1, 'memory': 1000},
+    'normalise': {'cpu': 1, 'memory': 500},
+    'write': {'cpu': 1, 'memory': 200},
+}
+
+
+def null_stage(name):
+    """
+    Stage context used when no scheduler is given: the stage runs immediately.
+    """
+    return nullcontext()
+
+
+class ResourceBudget:
+    """
+    CPU and memory budget shared by the worker processes of a batch run.
+
+    Before a stage runs it waits until its resource profile fits in what is left of the budget.
+    A stage that needs more than the whole budget runs once nothing else is running. Create the
+    budget with the multiprocessing context of the pool and pass it to the workers when they
+    start (for example through the pool initializer).
+    """
+
+    def __init__(self, context, cpu_budget=None, memory_budget=None, profiles=None):
+        self.cpu_budget = cpu_budget or os.cpu_count() or 1
+        self.memory_budget = memory_budget
+        self.profiles = {stage: dict(profile) for stage, profile in DEFAULT_STAGE_PROFILES.items()}
+        for stage, profile in (profiles or {}).items():
+            self.profiles.setdefault(stage, {'cpu': 0, 'memory': 0}).update(profile)
+
+        self._condition = context.Condition()
+        self._cpu = context.RawValue('d', 0.0)
+        self._memory = context.RawValue('d', 0.0)
+        self._running = context.RawValue('i', 0)
+
+    def acquire(self, stage):
+        """
+        Waits until `stage` fits in the budget and reserves its resources. Returns the time spent
+        waiting, in seconds.
+        """
+        profile = self.profiles.get(stage, {'cpu': 0, 'memory': 0})
+        start_time = time.perf_counter()
+        with self._condition:
+            self._condition.wait_for(lambda: self._fits(profile))
+            self._cpu.value += profile['cpu']
+            self._memory.value += profile['memory']
+            self._running.value += 1
+
+        return time.perf_counter() - start_time
+
+    def release(self, stage):
+        profile = self.profiles.get(stage, {'cpu': 0, 'memory': 0})
+        with self._condition:
+            self._cpu.value -= profile['cpu']
+            self._memory.value -= profile['memory']
+            self._running.value -= 1
+            self._condition.notify_all()
+
+    @contextmanager
+    def stage(self, name, records):
+        """
+        Runs the body as stage `name` within the budget, appending the stage name, queue wait and
+        duration (seconds) to `records`.
+        """
+        wait = self.acquire(name)
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(name)
+            records.append({'stage': name, 'wait': wait, 'duration': time.perf_counter() - start_time})
+
+    def _fits(self, profile):
+        if not self._running.value:
+            return True
+        if self._cpu.value + profile['cpu'] > self.cpu_budget:
+            return False
+        if self.memory_budget is not None and self._memory.value + profile['memory'] > self.memory_budget:
+            return False
+        return True
+
+
+def estimate_session_size(session):
+    """
+    Estimates the relative cost of a session from the size of its C3D files, so the largest
+    sessions can be started first.
+    """
+    input_directory = session['input_directory']
+    trials = session.get('dynamic_trials')
+    if trials is None:
+        trials = [file for file in os.listdir(input_directory) if file.lower().endswith('.c3d')] \
+            if os.path.isdir(input_directory) else []
+    trials = set(trials) | {session['static_trial']}
+
+    size = 0
+    for trial in trials:
+        file_path = os.path.join(input_directory, trial)
+        if os.path.isfile(file_path):
+            size += os.path.getsize(file_path)
+    return size
+
+
+def build_run_report(summaries, start_time, end_time, budget):
+    """
+    Summarises a batch run: throughput, the budget used, and for each stage the number of runs,
+    run time and the time spent queueing for resources.
+    """
+    duration = end_time - start_time
+    succeeded = [summary for summary in summaries if summary['status'] == "success"]
+    trial_count = sum(summary.get('trials', 0) for summary in succeeded)
+
+    stages = {}
+    for summary in summaries:
+        for record in summary.get('stages', []):
+            stage = stages.setdefault(record['stage'], {'count': 0, 'run_time': 0.0, 'max_run_time': 0.0,
+                                                        'queue_wait': 0.0, 'max_queue_wait': 0.0})
+            stage['count'] += 1
+            stage['run_time'] += record['duration']
+            stage['max_run_time'] = max(stage['max_run_time'], record['duration'])
+            stage['queue_wait'] += record['wait']
+            stage['max_queue_wait'] = max(stage['max_queue_wait'], record['wait'])
+    for stage in stages.values():
+        stage['mean_run_time'] = stage['run_time'] / stage['count']
+        stage['mean_queue_wait'] = stage['queue_wait'] / stage['count']
+
+    ordered_stages = {name: stages[name] for name in STAGES if name in stages}
+    ordered_stages.update({name: stage for name, stage in stages.items() if name not in ordered_stages})
+
+    return {
+        'start_time': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(start_time)),
+        'duration': duration,
+        'sessions': len(summaries),
+        'succeeded': len(succeeded),
+        'failed': len(summaries) - len(succeeded),
+        'trials': trial_count,
+        'sessions_per_hour': len(succeeded) / duration * 3600 if duration else 0.0,
+        'trials_per_hour': trial_count / duration * 3600 if duration else 0.0,
+        'budget': {'cpu': budget.cpu_budget, 'memory': budget.memory_budget, 'profiles': budget.profiles},
+        'stages': ordered_stages,
+        'session_summaries': summaries,
+    }
@@ -0,0 +1,161 @@
+
+import numpy as np
+import pandas as pd
+
+
+class SegmentationRule:
+    """
+    Describes how gait cycles are cut from one data stream.
+
+    `columns` maps each side to the data columns that are segmented, and `signs` holds the
+    matching per-column sign multipliers. A cycle starts at a foot strike (on a force plate, if
+    `require_plate` is set) and ends at the next foot strike of the same side. If
+    `contact_column` is given, both boundaries are moved back to the last sample before the
+    loading of that column (the start of the force plate contact).
+    """
+
+    def __init__(self, columns, signs=None, require_plate=False, contact_column=None):
+        self.columns = columns
+        self.signs = {side: np.ones(len(names)) for side, names in columns.items()}
+        if signs is not None:
+            self.signs.update({side: np.asarray(values, dtype=float) for side, values in signs.items()})
+        self.require_plate = require_plate
+        self.contact_column = contact_column
+
+
+def _side_names(names, side):
+    return [name.format(side=side[0].lower()) for name in names]
+
+
+_kinematic_names = ['pelvis_tilt', 'pelvis_list', 'pelvis_rotation', 'hip_flexion_{side}', 'hip_adduction_{side}',
+                    'hip_rotation_{side}', 'knee_flexion_{side}', 'ankle_angle_{side}', 'subtalar_angle_{side}',
+                    'foot_progression_{side}']
+_kinetic_names = ['hip_flexion_{side}_moment', 'hip_adduction_{side}_moment', 'hip_rotation_{side}_moment',
+                  'knee_flexion_{side}_moment', 'knee_adduction_{side}_moment', 'knee_rotation_{side}_moment',
+                  'ankle_angle_{side}_moment', 'subtalar_angle_{side}_moment', 'hip_flexion_{side}_power',
+                  'knee_flexion_{side}_power', 'ankle_angle_{side}_power']
+
+GRF_RULE = SegmentationRule(
+    columns={"Left": ["ground_force_vx", "ground_force_vy", "ground_force_vz"],
+             "Right": ["1_ground_force_vx", "1_ground_force_vy", "1_ground_force_vz"]},
+    signs={"Right": [1, 1, -1]},
+    require_plate=True,
+    contact_column=1,
+)
+
+# Pelvic tilt is negated for both sides, pelvic rotation for the left and pelvic obliquity for the right.
+KINEMATIC_RULE = SegmentationRule(
+    columns={side: _side_names(_kinematic_names, side) for side in ["Left", "Right"]},
+    signs={"Left": [-1, 1, -1, 1, 1, 1, 1, 1, 1, 1],
+           "Right": [-1, -1, 1, 1, 1, 1, 1, 1, 1, 1]},
+)
+
+# Joint moments are negated, joint powers are not.
+KINETIC_RULE = SegmentationRule(
+    columns={side: _side_names(_kinetic_names, side) for side in ["Left", "Right"]},
+    signs={side: [-1] * 8 + [1] * 3 for side in ["Left", "Right"]},
+    require_plate=True,
+)
+
+
+def strike_table(events):
+    """
+    Returns a data frame with the side, stride number, time and force plate of every stride that
+    begins with a foot strike, in stride order.
+    """
+    return events.strikes()
+
+
+def cycle_boundaries(time, strikes, rule, contact=None):
+    """
+    Returns the cycles of a trial as a data frame of side, cycle number and the [start, end)
+    sample range of each cycle, for data sampled at `time`.
+
+    `contact` is the (samples x sides) loading signal used by rules with a contact column.
+    """
+    time = np.asarray(time, dtype=float)
+    boundaries = []
+    for side_index, side in enumerate(["Left", "Right"]):
+        side_strikes = strikes[strikes['side'] == side]
+        if len(side_strikes) < 2:
+            continue
+        strike_times = side_strikes['time'].to_numpy(dtype=float)
+        last_before = np.searchsorted(time, strike_times, side='right') - 1
+
+        if rule.contact_column is None:
+            starts = last_before
+            ends = np.searchsorted(time, strike_times, side='left')
+        else:
+            # Walk back to the last unloaded sample at (or before) each strike.
+            samples = np.arange(len(time))
+            unloaded = np.maximum.accumulate(np.where(contact[:, side_index] > 0, -1, samples))
+            starts = np.maximum(unloaded[np.maximum(last_before, 0)], 0)
+            ends = starts
+
+        qualifies = np.ones(len(side_strikes), dtype=bool)
+        if rule.require_plate:
+            qualifies = side_strikes['plate'].notna().to_numpy()
+
+        # A cycle runs from a qualifying strike to the next strike of the same side.
+        valid = qualifies[:-1] & (starts[:-1] != 0)
+        strides = side_strikes['stride'].to_numpy()
+        boundaries.append(pd.DataFrame({
+            'side': side,
+            'cycle': strides[1:][valid] - 1,
+            'start': starts[:-1][valid],
+            'end': ends[1:][valid],
+        }))
+
+    if not boundaries:
+        return pd.DataFrame({'side': pd.Series(dtype=object), 'cycle': pd.Series(dtype=int),
+                             'start': pd.Series(dtype=int), 'end': pd.Series(dtype=int)})
+    return pd.concat(boundaries, ignore_index=True)
+
+
+def segment_trial(data, strikes, rule):
+    """
+    Cuts the cycles of one trial from `data`, returning {side: {cycle: (variables x samples)}}
+    with the sign conventions of `rule` applied.
+    """
+    time = data['time'].to_numpy(dtype=float)
+    contact = None
+    if rule.contact_column is not None:
+        contact = np.column_stack([data[rule.columns[side][rule.contact_column]].to_numpy(dtype=float)
+                                   for side in ["Left", "Right"]])
+
+    segments = {"Left": {}, "Right": {}}
+    boundaries = cycle_boundaries(time, strikes, rule, contact)
+    for side, side_boundaries in boundaries.groupby('side', sort=False):
+        values = data[rule.columns[side]].to_numpy(dtype=float) * rule.signs[side]
+        for cycle, start, end in side_boundaries[['cycle', 'start', 'end']].itertuples(index=False):
+            segments[side][cycle] = values[start:end].T
+
+    return segments
+
+
+def segment_trials(data, events, rule, strikes=None):
+    """
+    Segments every trial in `data` (a dictionary of trial data frames), returning the
+    {side: {trial: {cycle: array}}} structure used by the normalised outputs. `strikes` can
+    hold precomputed strike tables by trial.
+    """
+    segmented_data = {"Left": {}, "Right": {}}
+    for file_name, trial_data in data.items():
+        trial_strikes = strike_table(events[file_name]) if strikes is None else strikes[file_name]
+        for side, cycles in segment_trial(trial_data, trial_strikes, rule).items():
+            if cycles:
+                segmented_data[side][file_name] = cycles
+
+    return segmented_data
+
+
+def segment_session(grf_data, kinematic_data, kinetic_data, events):
+    """
+    Segments the GRF, kinematic and kinetic data of a session, computing the strike table of
+    each trial once and sharing it between the three data streams.
+    """
+    strikes = {file_name: strike_table(trial_events) for file_name, trial_events in events.items()}
+
+    return (segment_trials(grf_data, events, GRF_RULE, strikes),
+            segment_trials(kinematic_data, events, KINEMATIC_RULE, strikes),
+            segment_trials(kinetic_data, events, KINETIC_RULE, strikes))
@@ -0,0 +1,215 @@
+
+import numpy as np
+import pandas as pd
+
+from c3d_parser.core.events import SIDES
+
+
+MEASUREMENTS = [
+    "Stride Length (m)", "Normalised Stride Length", "Step Length (m)", "Normalised Step Length", "Step Width (m)",
+    "Stride Duration (s)", "Stance Duration (s)", "Swing Duration (s)", "Stance Phase %", "Swing Phase %",
+    "Single Support Phase %", "Double Support Phase %", "Gait Speed (m/s)", "Normalised Gait Speed",
+    "Cadence (steps/min)", "Initial Foot Contact (t)", "Toe Off (t)", "Terminal Foot Contact (t)",
+]
+
+
+def calculate_spatiotemporal_data(frame_data, events, static_data):
+    """
+    Calculates the spatio-temporal parameters of every gait cycle in a trial.
+
+    Returns a data frame with one row per cycle (labelled "Side-N") and one column per
+    measurement. All cycles are calculated together from the time-ordered events.
+    """
+    leg_lengths = {"Left": static_data['Left Leg Length'] / 1000, "Right": static_data['Right Leg Length'] / 1000}
+
+    # Events in the order they occurred, left before right for simultaneous events.
+    event_data = events.data
+    order = np.lexsort((event_data['side'].map(SIDES.index).to_numpy(), event_data['time'].to_numpy()))
+    sequence = event_data.iloc[order].reset_index(drop=True)
+    sides = sequence['side'].to_numpy()
+    strides = sequence['stride'].to_numpy(dtype=int)
+    times = sequence['time'].to_numpy(dtype=float)
+    is_strike = (sequence['type'] == "Foot Strike").to_numpy()
+    is_off = (sequence['type'] == "Foot Off").to_numpy()
+
+    measurements = {measurement: [] for measurement in MEASUREMENTS}
+    _calculate_lengths(frame_data, sides, strides, times, is_strike, measurements)
+    _calculate_phases(sides, strides, times, is_strike, is_off, measurements)
+    _calculate_event_times(events, measurements)
+
+    data = {measurement: _combine(parts) for measurement, parts in measurements.items()}
+
+    # Lengths and speeds normalised by leg length.
+    both_legs = bool(leg_lengths["Left"] and leg_lengths["Right"])
+    leg_length = data["Stride Length (m)"].index.get_level_values(0).map(leg_lengths).to_numpy(dtype=float)
+    data["Normalised Stride Length"] = data["Stride Length (m)"] / leg_length if both_legs else \
+        data["Stride Length (m)"] * np.nan
+    leg_length = data["Step Length (m)"].index.get_level_values(0).map(leg_lengths).to_numpy(dtype=float)
+    data["Normalised Step Length"] = data["Step Length (m)"] / leg_length if both_legs else \
+        data["Step Length (m)"] * np.nan
+    leg_length = data["Gait Speed (m/s)"].index.get_level_values(0).map(leg_lengths).to_numpy(dtype=float)
+    data["Normalised Gait Speed"] = data["Gait Speed (m/s)"] / np.sqrt(9.81 * leg_length) if both_legs else \
+        data["Gait Speed (m/s)"] * np.nan
+
+    return _to_data_frame(data)
+
+
+def combine_spatiotemporal_data(data, selected_trials):
+    """
+    Combines the spatio-temporal data of the trials in `selected_trials` (a mapping of trial to
+    output name) into one data frame, with the trial, side and cycle number of each row.
+    """
+    frames = []
+    for trial, df in data.items():
+        if trial in selected_trials and not df.empty:
+            new_df = df.copy()
+            idx_series = pd.Series(df.index, index=df.index)
+            cycle_id = idx_series.str.split("-", n=1, expand=True)
+            new_df.insert(0, "Trial", selected_trials[trial])
+            new_df.insert(1, "Side", cycle_id[0])
+            new_df.insert(2, "Cycle-Number", cycle_id[1].astype(int))
+
+            frames.append(new_df)
+
+    return pd.concat(frames, ignore_index=True)
+
+
+def _calculate_lengths(frame_data, sides, strides, times, is_strike, measurements):
+    strike_sides = sides[is_strike]
+    strike_strides = strides[is_strike]
+    strike_times = times[is_strike]
+    if not len(strike_times):
+        return
+
+    # Heel position at the marker frame at (or immediately before) each strike. Strikes before
+    # the first frame use the first frame.
+    positions = np.searchsorted(frame_data['Time'].to_numpy(dtype=float), strike_times, side='right') - 1
+    positions = np.maximum(positions, 0)
+    heels = np.empty((len(strike_times), 3))
+    for side in SIDES:
+        mask = strike_sides == side
+        if mask.any():
+            heels[mask] = np.stack(frame_data[side[0] + 'HEE'].to_numpy()[positions[mask]])
+
+    strike_numbers = np.arange(len(strike_times))
+    for side in SIDES:
+        side_strikes = strike_numbers[strike_sides == side]
+
+        # Stride lengths, speeds and cadences between consecutive strikes of the same foot.
+        current, previous = side_strikes[1:], side_strikes[:-1]
+        stride_length = heels[current, 0] - heels[previous, 0]
+        total_time = strike_times[current] - strike_times[previous]
+        cycles = strike_strides[current] - 1
+        measurements["Stride Length (m)"].append(_series(side, cycles, stride_length / 1000))
+        measurements["Gait Speed (m/s)"].append(_series(side, cycles, (stride_length / total_time) / 1000))
+        measurements["Cadence (steps/min)"].append(_series(side, cycles, (60 / total_time) * 2))
+
+        # Step lengths and widths relative to the latest strike of the opposite foot, from the third strike.
+        opposite = np.where(strike_sides != side, strike_numbers, -1)
+        latest_opposite = np.maximum.accumulate(opposite)
+        current = side_strikes[(side_strikes >= 2) & (latest_opposite[side_strikes] >= 0)]
+        previous = latest_opposite[current]
+        step_length = heels[current, 0] - heels[previous, 0]
+        step_width = np.abs(heels[current, 2] - heels[previous, 2])
+        cycles = strike_strides[current] - 1
+        measurements["Step Length (m)"].append(_series(side, cycles, step_length / 1000))
+        measurements["Step Width (m)"].append(_series(side, cycles, step_width / 1000))
+
+
+def _calculate_phases(sides, strides, times, is_strike, is_off, measurements):
+    event_numbers = np.arange(len(times))
+    phases = []
+    for side in SIDES:
+        same = sides == side
+        previous_same = _latest_before(np.where(same, event_numbers, -1))
+        previous_opposite = _latest_before(np.where(~same, event_numbers, -1))
+
+        # Swing ends at a foot strike, stance ends at a foot off.
+        swing = same & is_strike & (previous_same >= 0)
+        stance = same & is_off & (previous_same >= 0)
+        phases.append(_phase(side, strides[swing] - 1, times[swing] - times[previous_same[swing]], "Swing",
+                             event_numbers[swing]))
+        phases.append(_phase(side, strides[stance], times[stance] - times[previous_same[stance]], "Stance",
+                             event_numbers[stance]))
+
+        # Double support runs from the latest event of the opposite foot to a foot off.
+        support = same & is_off & (previous_opposite >= 0)
+        interval = times[support] - times[previous_opposite[support]]
+        opposite_side = SIDES[1 - SIDES.index(side)]
+        phases.append(_phase(opposite_side, strides[previous_opposite[support]], interval, "Initial-DS",
+                             event_numbers[support]))
+        phases.append(_phase(side, strides[support], interval, "Terminal-DS", event_numbers[support]))
+
+    # Later events overwrite the phases of earlier ones.
+    phases = pd.concat(phases, ignore_index=True).sort_values('event', kind='stable')
+    phases = phases.drop_duplicates(['side', 'cycle', 'phase'], keep='last')
+    phases = phases.pivot(index=['side', 'cycle'], columns='phase', values='value')
+    phases = phases.reindex(columns=["Stance", "Swing", "Initial-DS", "Terminal-DS"])
+
+    complete = phases[phases["Stance"].notna() & phases["Swing"].notna()]
+    total_time = complete["Stance"] + complete["Swing"]
+    measurements["Stance Phase %"].append((complete["Stance"] / total_time) * 100)
+    measurements["Swing Phase %"].append((complete["Swing"] / total_time) * 100)
+    measurements["Stride Duration (s)"].append(total_time)
+    measurements["Stance Duration (s)"].append(complete["Stance"])
+    measurements["Swing Duration (s)"].append(complete["Swing"])
+
+    supported = complete[complete["Initial-DS"].notna() & complete["Terminal-DS"].notna()]
+    total_time = supported["Stance"] + supported["Swing"]
+    ds_time = supported["Initial-DS"] + supported["Terminal-DS"]
+    measurements["Single Support Phase %"].append(((supported["Stance"] - ds_time) / total_time) * 100)
+    measurements["Double Support Phase %"].append((ds_time / total_time) * 100)
+
+
+def _calculate_event_times(events, measurements):
+    # Cycles made of a strike and an off, followed by the strike of the next stride.
+    event_data = events.data
+    stride_sizes = event_data.groupby(['side', 'stride'], sort=False).size()
+    first_events = events.stride_events(0).set_index(['side', 'stride'])
+    second_events = events.stride_events(1).set_index(['side', 'stride'])
+    cycles = first_events.join(second_events, how='inner', lsuffix='_strike', rsuffix='_off')
+    cycles = cycles[(stride_sizes.reindex(cycles.index) == 2).to_numpy()]
+    cycles = cycles[((cycles['type_strike'] == "Foot Strike") & (cycles['type_off'] == "Foot Off")).to_numpy()]
+
+    next_strides = pd.MultiIndex.from_arrays([cycles.index.get_level_values(0), cycles.index.get_level_values(1) + 1])
+    next_events = first_events.reindex(next_strides)
+    terminal = (next_events['type'] == "Foot Strike").to_numpy()
+    cycles = cycles[terminal]
+
+    measurements["Initial Foot Contact (t)"].append(cycles['time_strike'])
+    measurements["Toe Off (t)"].append(cycles['time_off'])
+    measurements["Terminal Foot Contact (t)"].append(pd.Series(next_events['time'].to_numpy()[terminal],
+                                                               index=cycles.index))
+
+
+def _latest_before(numbers):
+    # Index of the latest marked event strictly before each event (-1 if none).
+    latest = np.maximum.accumulate(numbers)
+    return np.concatenate([[-1], latest[:-1]])
+
+
+def _series(side, cycles, values):
+    index = pd.MultiIndex.from_arrays([np.full(len(cycles), side, dtype=object), cycles], names=['side', 'stride'])
+    return pd.Series(values, index=index, dtype=float)
+
+
+def _phase(side, cycles, values, phase, event_numbers):
+    return pd.DataFrame({'side': side, 'cycle': cycles, 'phase': phase, 'value': values, 'event': event_numbers})
+
+
+def _combine(parts):
+    series = [part for part in parts if len(part)]
+    if not series:
+        return pd.Series(dtype=float, index=pd.MultiIndex.from_arrays([[], []], names=['side', 'stride']))
+    series = [part.rename_axis(['side', 'stride']) for part in series]
+
+    return pd.concat(series)
+
+
+def _to_data_frame(data):
+    data_frame = pd.concat(data, axis=1)
+    data_frame = data_frame.reindex(columns=MEASUREMENTS)
+    data_frame = data_frame.sort_index()
+    data_frame.index = [f"{side}-{cycle}" for side, cycle in data_frame.index]
+
+    return data_frame
@@ -0,0 +1,151 @@
+
+import os
+import json
+import pickle
+import shutil
+import hashlib
+import tempfile
+
+from c3d_parser.settings.general import VERSION
+from c3d_parser.settings.logging import logger
+
+
+# Digests of the files hashed so far, by path, size and modification time.
+_file_digests = {}
+
+
+def file_digest(file_path):
+    """
+    Returns the SHA-256 digest of the contents of a file. Digests are remembered until the file
+    changes, so repeated keys don't re-read large C3D files.
+    """
+    file_path = os.path.abspath(file_path)
+    status = os.stat(file_path)
+    signature = (file_path, status.st_size, status.st_mtime_ns)
+    if signature not in _file_digests:
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as file:
+            for block in iter(lambda: file.read(1 << 20), b''):
+                digest.update(block)
+        _file_digests[signature] = digest.hexdigest()
+
+    return _file_digests[signature]
+
+
+class StageCache:
+    """
+    Content-addressed cache of the outputs of the pipeline stages.
+
+    Each stage result is stored under a key derived from the contents of its input files, its
+    options and the parser version, together with the files the stage wrote to the output
+    directory. When a session is re-run, stages whose key is cached restore their files and
+    result instead of running, so only the stages whose inputs changed are recomputed.
+
+    A cache without a directory is disabled and always runs the stages. With `force` set stages
+    always run and replace their cached outputs.
+    """
+
+    def __init__(self, directory, force=False):
+        self.directory = directory
+        self.force = force
+
+    @property
+    def enabled(self):
+        return self.directory is not None
+
+    def key(self, stage, files=(), **options):
+        """
+        Returns the key of `stage` from the contents of `files` and the JSON-serialisable
+        `options`.
+        """
+        inputs = {
+            'stage': stage,
+            'version': VERSION,
+            'files': [file_digest(file_path) if file_path else None for file_path in files],
+            'options': options,
+        }
+        encoded = json.dumps(inputs, sort_keys=True, default=str).encode('utf-8')
+
+        return hashlib.sha256(encoded).hexdigest()
+
+    def run(self, stage, key, output_directory, compute, name=None):
+        """
+        Returns the result of `stage` and the paths of the files it wrote. `compute()` runs the
+        stage, returning its result and the paths of the files it wrote in `output_directory`.
+
+        If the stage is cached its files are copied back into `output_directory` and its cached
+        result is returned instead.
+        """
+        if not self.enabled:
+            return compute()
+
+        entry_directory = os.path.join(self.directory, stage, key[:2], key)
+        if not self.force:
+            cached = self._restore(entry_directory, output_directory)
+            if cached is not None:
+                logger.info(f"Reusing cached {stage} outputs" + (f" for {name}." if name else "."))
+                return cached
+
+        result, files = compute()
+        try:
+            self._store(entry_directory, output_directory, result, files)
+        except (OSError, pickle.PicklingError) as e:
+            logger.warning(f"Could not cache {stage} outputs: {e}")
+
+        return result, files
+
+    def _restore(self, entry_directory, output_directory):
+        entry_file = os.path.join(entry_directory, 'entry.json')
+        if not os.path.exists(entry_file):
+            return None
+
+        try:
+            with open(entry_file, 'r') as file:
+                entry = json.load(file)
+            with open(os.path.join(entry_directory, 'result.pkl'), 'rb') as file:
+                result = pickle.load(file)
+
+            files = []
+            for relative_path in entry['files']:
+                output_file = os.path.join(output_directory, relative_path)
+                directory = os.path.dirname(output_file)
+                if not os.path.exists(directory):
+                    os.makedirs(directory)
+                shutil.copyfile(os.path.join(entry_directory, 'files', relative_path), output_file)
+                files.append(output_file)
+        except (OSError, ValueError, KeyError, pickle.UnpicklingError, EOFError) as e:
+            logger.warning(f"Ignoring unreadable cache entry {entry_directory}: {e}")
+            return None
+
+        return result, files
+
+    @staticmethod
+    def _store(entry_directory, output_directory, result, files):
+        parent_directory = os.path.dirname(entry_directory)
+        if not os.path.exists(parent_directory):
+            os.makedirs(parent_directory)
+
+        # Entries are written to a temporary directory and moved into place, so concurrent
+        # sessions never see a partial entry.
+        temporary_directory = tempfile.mkdtemp(dir=parent_directory)
+        try:
+            relative_paths = []
+            for file_path in files:
+                relative_path = os.path.relpath(file_path, output_directory)
+                cached_file = os.path.join(temporary_directory, 'files', relative_path)
+                if not os.path.exists(os.path.dirname(cached_file)):
+                    os.makedirs(os.path.dirname(cached_file))
+                shutil.copyfile(file_path, cached_file)
+                relative_paths.append(relative_path)
+
+            with open(os.path.join(temporary_directory, 'result.pkl'), 'wb') as file:
+                pickle.dump(result, file, protocol=pickle.HIGHEST_PROTOCOL)
+            with open(os.path.join(temporary_directory, 'entry.json'), 'w') as file:
+                json.dump({'version': VERSION, 'files': relative_paths}, file, indent=4)
+
+            if os.path.exists(entry_directory):
+                shutil.rmtree(entry_directory, ignore_errors=True)
+            os.replace(temporary_directory, entry_directory)
+        finally:
+            if os.path.exists(temporary_directory):
+                shutil.rmtree(temporary_directory, ignore_errors=True)
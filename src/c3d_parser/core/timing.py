@@ -0,0 +1,128 @@
+
+import os
+import sys
+import json
+import time
+from contextlib import contextmanager
+
+from c3d_parser.settings.general import VERSION
+from c3d_parser.settings.logging import logger
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+TIMINGS_FILE = 'stage_timings.json'
+
+_count_keys = ['frames', 'samples', 'cycles']
+
+
+def peak_rss():
+    """
+    Returns the peak resident set size of the process so far in MB, or None if it isn't
+    available on this platform.
+    """
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Reported in bytes on macOS and in kilobytes elsewhere.
+        return peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024
+
+    if sys.platform == 'win32':
+        import ctypes
+        from ctypes import wintypes
+
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD),
+                        ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),
+                        ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                        ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t),
+                        ('QuotaNonPagedPoolUsage', ctypes.c_size_t), ('PagefileUsage', ctypes.c_size_t),
+                        ('PeakPagefileUsage', ctypes.c_size_t)]
+
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            return counters.PeakWorkingSetSize / 1024 ** 2
+
+    return None
+
+
+class StageTimer:
+    """
+    Records the wall time, CPU time and peak RSS of each pipeline stage and step, with the
+    trial it processed and the number of frames and samples processed, if given.
+
+    Steps timed inside another stage record it as their parent. Peak RSS is the peak of the
+    whole process when the stage ended, so it only grows from one record to the next.
+    """
+
+    def __init__(self):
+        self.records = []
+        self._stack = []
+
+    @contextmanager
+    def time(self, stage, trial=None, **counts):
+        """
+        Times the body as `stage` of `trial`. Yields the record, so that counts that are only
+        known once the stage has run (e.g. `frames` and `samples`) can be added to it.
+        """
+        record = {'stage': stage, 'trial': trial}
+        if self._stack:
+            record['parent'] = self._stack[-1]['stage']
+        record.update(counts)
+
+        self.records.append(record)
+        self._stack.append(record)
+        start_wall = time.perf_counter()
+        start_cpu = time.process_time()
+        try:
+            yield record
+        finally:
+            record['wall_time'] = time.perf_counter() - start_wall
+            record['cpu_time'] = time.process_time() - start_cpu
+            record['peak_rss'] = peak_rss()
+            self._stack.pop()
+
+    def totals(self):
+        """
+        Returns the total wall time, CPU time, frames, samples and cycles of each stage, and the
+        number of times it ran.
+        """
+        return stage_totals(self.records)
+
+    def write(self, output_directory, append=False):
+        """
+        Writes the records to 'stage_timings.json' in `output_directory` and logs the totals of
+        each stage. With `append` set the records are added to those already in the file.
+        """
+        timings_file = os.path.join(output_directory, TIMINGS_FILE)
+        records = self.records
+        if append and os.path.exists(timings_file):
+            with open(timings_file, 'r') as file:
+                records = json.load(file)['records'] + records
+
+        with open(timings_file, 'w') as file:
+            json.dump({'c3d_parser_version': VERSION, 'totals': stage_totals(records), 'records': records}, file,
+                      indent=4)
+
+        for stage, total in self.totals().items():
+            counts = "".join(f", {total[key]} {key}" for key in _count_keys if key in total)
+            logger.info(f"Stage {stage}: {total['count']} run(s), {total['wall_time']:.2f} s wall time, "
+                        f"{total['cpu_time']:.2f} s CPU time{counts}.")
+
+
+def stage_totals(records):
+    totals = {}
+    for record in records:
+        total = totals.setdefault(record['stage'], {'count': 0, 'wall_time': 0.0, 'cpu_time': 0.0})
+        total['count'] += 1
+        total['wall_time'] += record['wall_time']
+        total['cpu_time'] += record['cpu_time']
+        for key in _count_keys:
+            if key in record:
+                total[key] = total.get(key, 0) + record[key]
+
+    return totals
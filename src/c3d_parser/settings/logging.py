@@ -75,6 +75,21 @@ def initialise_logger():
     logger.set_emitter(signal_handler.emitter)
 
 
+def add_log_file(log_file):
+    """
+    Writes log messages to `log_file` as well as any existing handlers. Returns the handler, so the
+    caller can remove it again.
+    """
+    file_handler = logging.FileHandler(log_file, mode='w', encoding='utf-8')
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s', datefmt='%d/%m/%Y - %H:%M:%S')
+    file_handler.setFormatter(formatter)
+    file_handler.setLevel(logging.INFO)
+    logger.base_logger.setLevel(logging.INFO)
+    logger.base_logger.addHandler(file_handler)
+
+    return file_handler
+
+
 def filter_c3d_warnings():
     warnings.filterwarnings("ignore", message="No analog data found in file.")
 
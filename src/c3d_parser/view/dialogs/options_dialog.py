@@ -24,6 +24,7 @@ class OptionsDialog(QDialog):
 
         self._setup_colour_settings()
         self._setup_ik_settings()
+        self._setup_diagnostics_settings()
         self._disable_default_button_selection()
 
         self._make_connections()
@@ -36,6 +37,7 @@ class OptionsDialog(QDialog):
         self._ui.checkBoxCustomTaskSet.toggled.connect(self._toggle_ik_task_set)
         self._ui.lineEditIKTaskSet.textChanged.connect(self._validate_ik_task_set_path)
         self._ui.pushButtonIKTaskSetChooser.clicked.connect(self._open_ik_task_set_chooser)
+        self._ui.checkBoxProfileStages.toggled.connect(self._ui.checkBoxTraceMemory.setEnabled)
 
     def _setup_colour_settings(self):
         self._validator = QRegularExpressionValidator(QRegularExpression("^#[0-9A-Fa-f]{6}$"))
@@ -49,6 +51,9 @@ class OptionsDialog(QDialog):
     def _setup_ik_settings(self):
         self._toggle_ik_task_set(self._ui.checkBoxCustomTaskSet.isChecked())
 
+    def _setup_diagnostics_settings(self):
+        self._ui.checkBoxTraceMemory.setEnabled(self._ui.checkBoxProfileStages.isChecked())
+
     def _colour_code_changed(self, text):
         line_edit = self.sender()
         state, _, _ = self._validator.validate(text, 0)
@@ -92,6 +97,11 @@ class OptionsDialog(QDialog):
         self._ui.checkBoxApproximateAnthropometrics.setChecked(options['approximate_anthropometrics'])
         self._ui.checkBoxRunningGait.setChecked(options['running_gait'])
         self._ui.checkBoxOutputGRFs.setChecked(options['output_grf'])
+        self._ui.checkBoxLongTrials.setChecked(options['long_trials'])
+        self._ui.checkBoxOutputColumnar.setChecked(options['output_columnar'])
+        self._ui.checkBoxStageCache.setChecked(options['stage_cache'])
+        self._ui.checkBoxProfileStages.setChecked(options['profile_stages'])
+        self._ui.checkBoxTraceMemory.setChecked(options['trace_memory'])
 
     def save(self):
         options = {
@@ -109,6 +119,11 @@ class OptionsDialog(QDialog):
             'approximate_anthropometrics': self._ui.checkBoxApproximateAnthropometrics.isChecked(),
             'running_gait': self._ui.checkBoxRunningGait.isChecked(),
             'output_grf': self._ui.checkBoxOutputGRFs.isChecked(),
+            'long_trials': self._ui.checkBoxLongTrials.isChecked(),
+            'output_columnar': self._ui.checkBoxOutputColumnar.isChecked(),
+            'stage_cache': self._ui.checkBoxStageCache.isChecked(),
+            'profile_stages': self._ui.checkBoxProfileStages.isChecked(),
+            'trace_memory': self._ui.checkBoxTraceMemory.isChecked(),
         }
 
         return options
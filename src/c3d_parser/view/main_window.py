@@ -16,10 +16,17 @@ from pyvistaqt import QtInteractor
 from ll_visualiser.visualiser import visualise_model
 
 from c3d_parser.core.c3d_parser import (parse_session, extract_static_data, extract_marker_names, is_dynamic,
-    CancelException, write_normalised_grfs, write_normalised_kinematics, write_normalised_kinetics,
-    write_spatiotemporal_data, approximate_anthropometrics)
+    CancelException, CancellationToken, write_normalised_grfs, write_normalised_kinematics,
+    write_normalised_kinetics, write_spatiotemporal_data, approximate_anthropometrics, grf_columns, kinematic_columns,
+    kinetic_columns)
+from c3d_parser.core.cycles import CycleStore
+from c3d_parser.core.export import write_columnar_outputs
+from c3d_parser.core.journal import JOURNAL_DIRECTORY, JOURNAL_FILE
+from c3d_parser.core.scheduler import null_stage
+from c3d_parser.core.stage_cache import StageCache
+from c3d_parser.core.timing import StageTimer
 from c3d_parser.settings.general import (APPLICATION_NAME, VERSION, DEFAULT_STYLE_SHEET, INVALID_STYLE_SHEET,
-                                         get_marker_maps_dir)
+                                         get_marker_maps_dir, get_app_directory)
 from c3d_parser.view.ui.ui_main_window import Ui_MainWindow
 from c3d_parser.view.dialogs.options_dialog import OptionsDialog
 from c3d_parser.view.dialogs.marker_set_dialog import MarkerSetDialog
@@ -79,6 +86,11 @@ class MainWindow(QMainWindow):
         self._approximate_anthropometrics = False
         self._running_gait = False
         self._output_grf = False
+        self._long_trials = False
+        self._output_columnar = False
+        self._stage_cache = False
+        self._profile_stages = False
+        self._trace_memory = False
 
         self._colour_left = '#A52A2A'
         self._colour_right = '#0F52BA'
@@ -87,9 +99,9 @@ class MainWindow(QMainWindow):
         self._static_trial = None
         self._analog_data = None
         self._subject_weight = None
-        self._grf_data = {}
-        self._kinematic_data = {}
-        self._kinetic_data = {}
+        self._grf_data = CycleStore(grf_columns)
+        self._kinematic_data = CycleStore(kinematic_columns)
+        self._kinetic_data = CycleStore(kinetic_columns)
         self._s_t_data = {}
         self._deidentified_file_names = {}
         self._events = {}
@@ -118,7 +130,18 @@ class MainWindow(QMainWindow):
         self._kinetic_curves.signals.cycles_excluded.connect(self._grf_curves.exclude_cycles)
         self._kinetic_curves.signals.cycles_included.connect(self._grf_curves.include_cycles)
 
+        self._grf_curves.signals.exclusions_changed.connect(
+            lambda changed: self._refresh_ensemble_bands(self._grf_data, [self._plot_x, self._plot_z, self._plot_y],
+                                                         self._grf_curves, changed))
+        self._kinematic_curves.signals.exclusions_changed.connect(
+            lambda changed: self._refresh_ensemble_bands(self._kinematic_data, self._kinematic_plots,
+                                                         self._kinematic_curves, changed))
+        self._kinetic_curves.signals.exclusions_changed.connect(
+            lambda changed: self._refresh_ensemble_bands(self._kinetic_data, self._kinetic_plots,
+                                                         self._kinetic_curves, changed))
+
     def _setup_progress_bar(self):
+        self._cancel_token = CancellationToken()
         self._progress_text = ""
         self._progress_value = 0
         self._ui.progressBar.setVisible(False)
@@ -347,6 +370,8 @@ class MainWindow(QMainWindow):
         self._ui.pushButtonInputDirectoryChooser.clicked.connect(self._open_input_directory_chooser)
         self._ui.pushButtonOutputDirectoryChooser.clicked.connect(self._open_output_directory_chooser)
         self._ui.pushButtonParseData.clicked.connect(self._parse_c3d_data)
+        self._ui.pushButtonResume.clicked.connect(lambda: self._parse_c3d_data(resume=True))
+        self._ui.pushButtonCancel.clicked.connect(self._cancel_parse)
         self._ui.pushButtonFinalise.clicked.connect(self._harmonise_data)
         self._ui.actionQuit.triggered.connect(self._quit_application)
         self._ui.actionReloadInput.triggered.connect(self._validate_input_directory)
@@ -390,6 +415,7 @@ class MainWindow(QMainWindow):
 
         self._ui.pushButtonParseData.setEnabled(input_directory_valid and output_directory_valid)
         self._ui.pushButtonFinalise.setEnabled(False)
+        self._update_resume_button()
 
         return input_directory_valid
 
@@ -512,14 +538,21 @@ class MainWindow(QMainWindow):
                 else:
                     widget.setValue(value)
 
+    def _update_resume_button(self):
+        # A run can be resumed if the output directory has the journal of an earlier run.
+        output_directory = self._ui.lineEditOutputDirectory.text()
+        journal_file = os.path.join(output_directory, output_directory_name, JOURNAL_DIRECTORY, JOURNAL_FILE)
+        self._ui.pushButtonResume.setEnabled(self._ui.pushButtonParseData.isEnabled() and os.path.exists(journal_file))
+
     @handle_runtime_error
-    def _parse_c3d_data(self):
+    def _parse_c3d_data(self, resume=False):
+        # Resuming keeps the outputs of the previous run, and skips the stages it completed.
         input_directory = self._ui.lineEditInputDirectory.text()
         output_directory = self._ui.lineEditOutputDirectory.text()
         session_name = os.path.basename(input_directory)
         self._output_directory = os.path.normpath(os.path.join(output_directory, output_directory_name))
 
-        if os.path.exists(self._output_directory):
+        if os.path.exists(self._output_directory) and not resume:
             reply = QMessageBox.warning(self, "Warning",
                                         "The selected output directory already contains results. "
                                         "Do you wish to overwrite these files?",
@@ -605,18 +638,24 @@ class MainWindow(QMainWindow):
                 return
 
         self._ui.pushButtonParseData.setEnabled(False)
+        self._ui.pushButtonResume.setEnabled(False)
 
         self._progress_tracker = ProgressTracker()
         self._progress_tracker.progress.connect(self._update_progress)
         self._clear_progress_bar()
         self._ui.progressBar.setVisible(True)
 
+        self._cancel_token = CancellationToken()
+        self._ui.pushButtonCancel.setEnabled(True)
+
         ik_task_set = self._ik_task_set_path if self._use_custom_ik_task_set else None
+        cache = StageCache(get_app_directory('stage_cache') if self._stage_cache else None)
         self._worker = _ExecThread(parse_session, static_trial, dynamic_trials, input_directory,
                                    self._output_directory, lab, marker_diameter, static_data,
                                    left_foot_flat, right_foot_flat, toe_marker_proximal, optimise_knee_axis,
                                    self._filter_trc, self._filter_grf, ik_task_set, self._running_gait,
-                                   self._progress_tracker)
+                                   self._progress_tracker, null_stage, cache, resume,
+                                   self._cancel_token, self._profile_stages, self._trace_memory)
         self._worker.finished.connect(self._parse_finished)
         self._worker.cancelled.connect(self._parse_cancelled)
         self._worker.failed.connect(self._parse_failed)
@@ -637,15 +676,29 @@ class MainWindow(QMainWindow):
         self._progress_tracker.progress.emit("Process completed successfully", "green")
 
         self._ui.pushButtonParseData.setEnabled(True)
+        self._ui.pushButtonCancel.setEnabled(False)
+        self._update_resume_button()
         self._ui.pushButtonFinalise.setEnabled(True)
         self._ui.progressBar.setVisible(False)
 
+    def _cancel_parse(self):
+        # The run stops before its next step; the current step (e.g. model fitting) finishes first.
+        self._cancel_token.cancel()
+        self._ui.pushButtonCancel.setEnabled(False)
+        self._ui.labelProgress.setText("Cancelling")
+        self._ui.labelProgress.setStyleSheet("color: black;")
+
     def _parse_cancelled(self, e):
         logger.info(e)
-        self._progress_tracker.progress.emit("Completed", "green")
+        if self._cancel_token.cancelled:
+            self._progress_tracker.progress.emit("Cancelled", "black")
+        else:
+            self._progress_tracker.progress.emit("Completed", "green")
 
         self._re_enable_list_items()
         self._ui.pushButtonParseData.setEnabled(True)
+        self._ui.pushButtonCancel.setEnabled(False)
+        self._update_resume_button()
         self._ui.progressBar.setVisible(False)
 
     @handle_runtime_error
@@ -654,6 +707,8 @@ class MainWindow(QMainWindow):
 
         self._re_enable_list_items()
         self._ui.pushButtonParseData.setEnabled(True)
+        self._ui.pushButtonCancel.setEnabled(False)
+        self._update_resume_button()
         self._ui.progressBar.setVisible(False)
 
         raise e
@@ -688,10 +743,19 @@ class MainWindow(QMainWindow):
         kinetic_exclusions = self._kinetic_curves.get_excluded_cycles()
         grf_exclusions = self._grf_curves.get_excluded_cycles()
         self._update_s_t_data_from_tables()
-        write_normalised_grfs(self._grf_data, selected_trials, grf_exclusions, self._output_directory)
-        write_normalised_kinematics(self._kinematic_data, selected_trials, kinematic_exclusions, self._output_directory)
-        write_normalised_kinetics(self._kinetic_data, selected_trials, kinetic_exclusions, self._output_directory)
-        write_spatiotemporal_data(self._s_t_data, selected_trials, self._output_directory)
+        timer = StageTimer()
+        with timer.time('write'):
+            write_normalised_grfs(self._grf_data, selected_trials, grf_exclusions, self._output_directory)
+            write_normalised_kinematics(self._kinematic_data, selected_trials, kinematic_exclusions,
+                                        self._output_directory)
+            write_normalised_kinetics(self._kinetic_data, selected_trials, kinetic_exclusions, self._output_directory)
+            write_spatiotemporal_data(self._s_t_data, selected_trials, self._output_directory)
+            if self._output_columnar:
+                excluded_cycles = {'grf': grf_exclusions, 'kinematics': kinematic_exclusions,
+                                   'kinetics': kinetic_exclusions}
+                write_columnar_outputs(self._grf_data, self._kinematic_data, self._kinetic_data, self._s_t_data,
+                                       selected_trials, excluded_cycles, self._output_directory)
+        timer.write(self._output_directory, append=True)
 
         logger.info(f"Final outputs written to {self._output_directory}.")
         self._progress_tracker.progress.emit(f"Final outputs written to {self._output_directory}", "green")
@@ -709,16 +773,7 @@ class MainWindow(QMainWindow):
         self._plot_y.clear()
         self._plot_z.clear()
 
-        for foot, files_dict in grf_data.items():
-            colour = self._colour_left if foot == "Left" else self._colour_right
-            for name, cycles in files_dict.items():
-                for cycle_number, cycle_data in cycles.items():
-                    t_segment = np.linspace(0, 100, cycle_data.shape[1])
-
-                    for j, plot in enumerate([self._plot_x, self._plot_z, self._plot_y]):
-                        line, = plot.plot(t_segment, cycle_data[j], color=colour, linewidth=self._line_width)
-                        line.set_picker(True)
-                        self._grf_curves.add_curve(name, f"{foot}_{cycle_number}", line)
+        self._plot_cycles(grf_data, [self._plot_x, self._plot_z, self._plot_y], self._grf_curves)
 
         for plot in [self._plot_x, self._plot_y, self._plot_z]:
             plot.margins(x=0)
@@ -727,47 +782,82 @@ class MainWindow(QMainWindow):
         self._grf_canvas.draw()
 
     def _reset_kinematic_plots(self):
-        self._visualise_kinematic_data({})
+        self._visualise_kinematic_data(CycleStore(kinematic_columns))
 
     def _visualise_kinematic_data(self, kinematic_data):
         for plot in self._kinematic_plots:
             plot.clear()
 
-        for foot, files_dict in kinematic_data.items():
-            colour = self._colour_left if foot == "Left" else self._colour_right
-            for name, cycles in files_dict.items():
-                for cycle_number, cycle_data in cycles.items():
-                    t_segment = np.linspace(0, 100, cycle_data.shape[1])
-
-                    for j, plot in enumerate(self._kinematic_plots):
-                        line, = plot.plot(t_segment, cycle_data[j], color=colour, linewidth=self._line_width)
-                        line.set_picker(True)
-                        self._kinematic_curves.add_curve(name, f"{foot}_{cycle_number}", line)
+        self._plot_cycles(kinematic_data, self._kinematic_plots, self._kinematic_curves)
 
         self._update_kinematic_axes()
         self._kinematic_canvas.draw()
 
     def _reset_kinetic_plots(self):
-        self._visualise_kinetic_data({})
+        self._visualise_kinetic_data(CycleStore(kinetic_columns))
 
     def _visualise_kinetic_data(self, kinetic_data):
         for plot in self._kinetic_plots:
             plot.clear()
 
-        for foot, files_dict in kinetic_data.items():
-            colour = self._colour_left if foot == "Left" else self._colour_right
-            for name, cycles in files_dict.items():
-                for cycle_number, cycle_data in cycles.items():
-                    t_segment = np.linspace(0, 100, cycle_data.shape[1])
-
-                    for j, plot in enumerate(self._kinetic_plots):
-                        line, = plot.plot(t_segment, cycle_data[j], color=colour, linewidth=self._line_width)
-                        line.set_picker(True)
-                        self._kinetic_curves.add_curve(name, f"{foot}_{cycle_number}", line)
+        self._plot_cycles(kinetic_data, self._kinetic_plots, self._kinetic_curves)
 
         self._update_kinetic_axes()
         self._kinetic_canvas.draw()
 
+    def _plot_cycles(self, cycle_data, plots, curves):
+        curves.clear_curves()
+        t_segment = np.linspace(0, 100, cycle_data.frames)
+        if self._long_trials:
+            self._plot_ensemble_bands(cycle_data, plots, curves, t_segment)
+            return
+
+        for name, foot, cycle_number, values in cycle_data.cycles():
+            colour = self._colour_left if foot == "Left" else self._colour_right
+            for j, plot in enumerate(plots):
+                line, = plot.plot(t_segment, values[j], color=colour, linewidth=self._line_width)
+                line.set_picker(True)
+                curves.add_curve(name, f"{foot}_{cycle_number}", line)
+        curves.restore_exclusions()
+
+    def _plot_ensemble_bands(self, cycle_data, plots, curves, t_segment):
+        # Long trials are summarised by the mean +/- 1 SD of the included cycles of each trial and side,
+        # rather than drawing every cycle.
+        for name, foot, cycle_number in cycle_data.index[['trial', 'side', 'cycle']].itertuples(index=False):
+            curves.add_cycle(name, f"{foot}_{cycle_number}")
+
+        excluded_cycles = curves.get_excluded_cycles()
+        for name in cycle_data.index['trial'].unique():
+            for foot, statistics in cycle_data.ensemble_statistics([name], excluded_cycles).items():
+                self._plot_ensemble_band(plots, curves, name, foot, statistics, t_segment)
+
+    def _plot_ensemble_band(self, plots, curves, name, foot, statistics, t_segment):
+        colour = self._colour_left if foot == "Left" else self._colour_right
+        artists = []
+        for j, plot in enumerate(plots):
+            mean, std = statistics['mean'][j], statistics['std'][j]
+            band = plot.fill_between(t_segment, mean - std, mean + std, color=colour, alpha=0.3, linewidth=0)
+            line, = plot.plot(t_segment, mean, color=colour, linewidth=self._line_width)
+            artists += [line, band]
+        curves.add_band(name, foot, artists)
+
+    def _refresh_ensemble_bands(self, cycle_data, plots, curves, changed):
+        # Only the bands of the trials and sides whose exclusions changed are redrawn.
+        if not self._long_trials:
+            return
+
+        t_segment = np.linspace(0, 100, cycle_data.frames)
+        excluded_cycles = curves.get_excluded_cycles()
+        selected_trials = self._get_selected_trials()
+        for name in {name for name, _ in changed}:
+            statistics = cycle_data.ensemble_statistics([name], excluded_cycles)
+            for foot in {foot for trial, foot in changed if trial == name}:
+                curves.remove_band(name, foot)
+                if foot in statistics:
+                    self._plot_ensemble_band(plots, curves, name, foot, statistics[foot], t_segment)
+                    curves.set_band_visibility(name, foot, name in selected_trials)
+        curves.draw_idle()
+
     def _update_kinematic_axes(self):
         plot_labels = {
             0: ('Pelvic Anterior (+) / Posterior (-) Tilt', 'Ant', 'Pos'),
@@ -885,10 +975,16 @@ class MainWindow(QMainWindow):
         dlg = OptionsDialog(self)
         dlg.load(self._get_options())
         if dlg.exec():
+            long_trials = self._long_trials
             self._set_options(dlg.save())
             self._update_curves()
             self._update_s_t_colours()
             self._update_legend()
+            if self._long_trials != long_trials:
+                self._visualise_grf_data(self._grf_data)
+                self._visualise_kinematic_data(self._kinematic_data)
+                self._visualise_kinetic_data(self._kinetic_data)
+                self._show_selected_trials()
 
     def _update_legend(self):
         if self._boxes:
@@ -913,6 +1009,11 @@ class MainWindow(QMainWindow):
             'approximate_anthropometrics': self._approximate_anthropometrics,
             'running_gait': self._running_gait,
             'output_grf': self._output_grf,
+            'long_trials': self._long_trials,
+            'output_columnar': self._output_columnar,
+            'stage_cache': self._stage_cache,
+            'profile_stages': self._profile_stages,
+            'trace_memory': self._trace_memory,
         }
 
         return options
@@ -932,6 +1033,11 @@ class MainWindow(QMainWindow):
         self._approximate_anthropometrics = options['approximate_anthropometrics']
         self._running_gait = options['running_gait']
         self._output_grf = options['output_grf']
+        self._long_trials = options['long_trials']
+        self._output_columnar = options['output_columnar']
+        self._stage_cache = options['stage_cache']
+        self._profile_stages = options['profile_stages']
+        self._trace_memory = options['trace_memory']
 
     def _show_custom_marker_set_dialog(self):
         static_trials = []
@@ -1004,6 +1110,11 @@ class MainWindow(QMainWindow):
         settings.setValue('approximate_anthropometrics', self._approximate_anthropometrics)
         settings.setValue('running_gait', self._running_gait)
         settings.setValue('output_grf', self._output_grf)
+        settings.setValue('long_trials', self._long_trials)
+        settings.setValue('output_columnar', self._output_columnar)
+        settings.setValue('stage_cache', self._stage_cache)
+        settings.setValue('profile_stages', self._profile_stages)
+        settings.setValue('trace_memory', self._trace_memory)
         settings.endGroup()
 
     def _load_settings(self):
@@ -1062,6 +1173,16 @@ class MainWindow(QMainWindow):
             self._running_gait = settings.value('running_gait') == 'true'
         if settings.contains('output_grf'):
             self._output_grf = settings.value('output_grf') == 'true'
+        if settings.contains('long_trials'):
+            self._long_trials = settings.value('long_trials') == 'true'
+        if settings.contains('output_columnar'):
+            self._output_columnar = settings.value('output_columnar') == 'true'
+        if settings.contains('stage_cache'):
+            self._stage_cache = settings.value('stage_cache') == 'true'
+        if settings.contains('profile_stages'):
+            self._profile_stages = settings.value('profile_stages') == 'true'
+        if settings.contains('trace_memory'):
+            self._trace_memory = settings.value('trace_memory') == 'true'
         settings.endGroup()
 
     def _quit_application(self):
@@ -1106,6 +1227,7 @@ class MainWindow(QMainWindow):
 class CurveSignals(QObject):
     cycles_included = Signal(list)
     cycles_excluded = Signal(list)
+    exclusions_changed = Signal(list)
 
 
 class GaitCurves(defaultdict):
@@ -1124,6 +1246,10 @@ class GaitCurves(defaultdict):
 
         self._cursors = {}
 
+        # Ensemble band artists (mean line and band of each plot) of each trial and side, used in
+        # long-trial mode.
+        self._bands = defaultdict(dict)
+
         self._colour_left = colours[0]
         self._colour_right = colours[1]
         self._colour_selection = colours[2]
@@ -1131,15 +1257,49 @@ class GaitCurves(defaultdict):
     def add_curve(self, file_name, cycle, curve):
         self[file_name][cycle].append(curve)
 
+    def add_cycle(self, file_name, cycle):
+        self[file_name].setdefault(cycle, [])
+
+    def add_band(self, file_name, side, artists):
+        self._bands[file_name][side] = artists
+
+    def remove_band(self, file_name, side):
+        for artist in self._bands[file_name].pop(side, []):
+            artist.remove()
+
+    def set_band_visibility(self, file_name, side, visible):
+        for artist in self._bands[file_name].get(side, []):
+            artist.set_visible(visible)
+
     def get_curves(self, file_name, cycle):
         return self[file_name][cycle]
 
+    def clear_curves(self):
+        for cycles in self.values():
+            for cycle in cycles:
+                cycles[cycle] = []
+        self._bands.clear()
+
+        for cursor in self._cursors.values():
+            cursor.remove()
+        self._cursors = {}
+        self._selected_curves = []
+
+    def restore_exclusions(self):
+        for file_name, cycle in self._excluded_cycles:
+            if file_name in self and cycle in self[file_name]:
+                colour = self._colour_left if "Left" in cycle else self._colour_right
+                self._exclude_cycle(file_name, cycle, colour)
+
     def set_file_visibility(self, file_name, visible):
         cycles = self[file_name]
         for cycle, lines in cycles.items():
             for line in lines:
                 line.set_visible(visible)
                 line.set_picker(visible)
+        for artists in self._bands[file_name].values():
+            for artist in artists:
+                artist.set_visible(visible)
 
         self._canvas.draw()
 
@@ -1217,12 +1377,15 @@ class GaitCurves(defaultdict):
         self.signals.cycles_included.emit(identifiers)
 
     def include_cycles(self, identifiers):
+        changed = set()
         for file_name, cycle in identifiers:
             if file_name not in self or cycle not in self[file_name]:
                 continue
             colour = self._colour_left if "Left" in cycle else self._colour_right
             self._include_cycle(file_name, cycle, colour)
-        self._canvas.draw()
+            changed.add((file_name, "Left" if "Left" in cycle else "Right"))
+        self._canvas.draw_idle()
+        self.signals.exclusions_changed.emit(list(changed))
 
     def include_all(self):
         for file_name, cycles in self.items():
@@ -1233,14 +1396,16 @@ class GaitCurves(defaultdict):
         for cycle in self[file_name].keys():
             colour = self._colour_left if "Left" in cycle else self._colour_right
             self._include_cycle(file_name, cycle, colour)
-        self._canvas.draw()
+        self._canvas.draw_idle()
+        self.signals.exclusions_changed.emit([(file_name, "Left"), (file_name, "Right")])
 
     def include_side(self, file_name, side):
         colour = self._colour_left if side == "Left" else self._colour_right
         for cycle in self[file_name].keys():
             if side in cycle:
                 self._include_cycle(file_name, cycle, colour)
-        self._canvas.draw()
+        self._canvas.draw_idle()
+        self.signals.exclusions_changed.emit([(file_name, side)])
 
     def _include_cycle(self, file_name, cycle, colour):
         self._excluded_cycles.difference_update([(file_name, cycle), ])
@@ -1254,6 +1419,10 @@ class GaitCurves(defaultdict):
             for lines in cycles.values():
                 for line in lines:
                     line.set_linewidth(line_width)
+        for bands in self._bands.values():
+            for artists in bands.values():
+                for line in artists[::2]:
+                    line.set_linewidth(line_width)
 
     def update_colours(self, colours):
         self._colour_left = colours[0]
@@ -1268,6 +1437,10 @@ class GaitCurves(defaultdict):
                     if identifier in self._selected_curves:
                         colour = self._colour_selection
                     line.set_color(colour)
+        for bands in self._bands.values():
+            for side, artists in bands.items():
+                for artist in artists:
+                    artist.set_color(self._colour_left if side == "Left" else self._colour_right)
 
     def draw_idle(self):
         self._canvas.draw_idle()
@@ -1280,12 +1453,15 @@ class GaitCurves(defaultdict):
         self.signals.cycles_excluded.emit(identifiers)
 
     def exclude_cycles(self, identifiers):
+        changed = set()
         for file_name, cycle in identifiers:
             if file_name not in self or cycle not in self[file_name]:
                 continue
             colour = self._colour_left if "Left" in cycle else self._colour_right
             self._exclude_cycle(file_name, cycle, colour)
-        self._canvas.draw()
+            changed.add((file_name, "Left" if "Left" in cycle else "Right"))
+        self._canvas.draw_idle()
+        self.signals.exclusions_changed.emit(list(changed))
 
     def exclude_all(self):
         for file_name, cycles in self.items():
@@ -1296,14 +1472,16 @@ class GaitCurves(defaultdict):
         for cycle in self[file_name].keys():
             colour = self._colour_left if "Left" in cycle else self._colour_right
             self._exclude_cycle(file_name, cycle, colour)
-        self._canvas.draw()
+        self._canvas.draw_idle()
+        self.signals.exclusions_changed.emit([(file_name, "Left"), (file_name, "Right")])
 
     def exclude_side(self, file_name, side):
         colour = self._colour_left if side == "Left" else self._colour_right
         for cycle in self[file_name].keys():
             if side in cycle:
                 self._exclude_cycle(file_name, cycle, colour)
-        self._canvas.draw()
+        self._canvas.draw_idle()
+        self.signals.exclusions_changed.emit([(file_name, side)])
 
     def _exclude_cycle(self, file_name, cycle, colour):
         self._excluded_cycles.update([(file_name, cycle)], )
@@ -486,6 +486,18 @@ class Ui_MainWindow(object):
 
         self.horizontalLayout_2.addWidget(self.pushButtonParseData)
 
+        self.pushButtonResume = QPushButton(self.frameTrial)
+        self.pushButtonResume.setObjectName(u"pushButtonResume")
+        self.pushButtonResume.setEnabled(False)
+
+        self.horizontalLayout_2.addWidget(self.pushButtonResume)
+
+        self.pushButtonCancel = QPushButton(self.frameTrial)
+        self.pushButtonCancel.setObjectName(u"pushButtonCancel")
+        self.pushButtonCancel.setEnabled(False)
+
+        self.horizontalLayout_2.addWidget(self.pushButtonCancel)
+
         self.pushButtonFinalise = QPushButton(self.frameTrial)
         self.pushButtonFinalise.setObjectName(u"pushButtonFinalise")
         self.pushButtonFinalise.setEnabled(False)
@@ -750,6 +762,11 @@ class Ui_MainWindow(object):
         self.checkBoxLeftFootFlat.setText(QCoreApplication.translate("MainWindow", u"Left Foot Flat", None))
         self.checkBoxRightFootFlat.setText(QCoreApplication.translate("MainWindow", u"Right Foot Flat", None))
         self.pushButtonParseData.setText(QCoreApplication.translate("MainWindow", u"Process Data", None))
+#if QT_CONFIG(tooltip)
+        self.pushButtonResume.setToolTip(QCoreApplication.translate("MainWindow", u"Continue an interrupted run from its last completed stage", None))
+#endif // QT_CONFIG(tooltip)
+        self.pushButtonResume.setText(QCoreApplication.translate("MainWindow", u"Resume", None))
+        self.pushButtonCancel.setText(QCoreApplication.translate("MainWindow", u"Cancel", None))
         self.pushButtonFinalise.setText(QCoreApplication.translate("MainWindow", u"Finalise Outputs", None))
         self.tabWidget.setTabText(self.tabWidget.indexOf(self.tabKinematic), QCoreApplication.translate("MainWindow", u"Kinematic", None))
         self.tabWidget.setTabText(self.tabWidget.indexOf(self.tabKinetic), QCoreApplication.translate("MainWindow", u"Kinetic", None))
@@ -273,6 +273,31 @@ class Ui_OptionsDialog(object):
 
         self.verticalLayout_4.addWidget(self.checkBoxOutputGRFs)
 
+        self.checkBoxLongTrials = QCheckBox(self.groupBox_7)
+        self.checkBoxLongTrials.setObjectName(u"checkBoxLongTrials")
+
+        self.verticalLayout_4.addWidget(self.checkBoxLongTrials)
+
+        self.checkBoxOutputColumnar = QCheckBox(self.groupBox_7)
+        self.checkBoxOutputColumnar.setObjectName(u"checkBoxOutputColumnar")
+
+        self.verticalLayout_4.addWidget(self.checkBoxOutputColumnar)
+
+        self.checkBoxStageCache = QCheckBox(self.groupBox_7)
+        self.checkBoxStageCache.setObjectName(u"checkBoxStageCache")
+
+        self.verticalLayout_4.addWidget(self.checkBoxStageCache)
+
+        self.checkBoxProfileStages = QCheckBox(self.groupBox_7)
+        self.checkBoxProfileStages.setObjectName(u"checkBoxProfileStages")
+
+        self.verticalLayout_4.addWidget(self.checkBoxProfileStages)
+
+        self.checkBoxTraceMemory = QCheckBox(self.groupBox_7)
+        self.checkBoxTraceMemory.setObjectName(u"checkBoxTraceMemory")
+
+        self.verticalLayout_4.addWidget(self.checkBoxTraceMemory)
+
 
         self.verticalLayout.addWidget(self.groupBox_7)
 
@@ -335,6 +360,11 @@ class Ui_OptionsDialog(object):
         self.groupBox_7.setTitle(QCoreApplication.translate("OptionsDialog", u"Experimental", None))
         self.checkBoxRunningGait.setText(QCoreApplication.translate("OptionsDialog", u"Running gait", None))
         self.checkBoxOutputGRFs.setText(QCoreApplication.translate("OptionsDialog", u"Output GRF data to CSV", None))
+        self.checkBoxLongTrials.setText(QCoreApplication.translate("OptionsDialog", u"Long-trial mode (plot ensemble bands)", None))
+        self.checkBoxOutputColumnar.setText(QCoreApplication.translate("OptionsDialog", u"Output columnar data (Parquet/NPZ)", None))
+        self.checkBoxStageCache.setText(QCoreApplication.translate("OptionsDialog", u"Reuse cached stage outputs", None))
+        self.checkBoxProfileStages.setText(QCoreApplication.translate("OptionsDialog", u"Profile processing stages (cProfile)", None))
+        self.checkBoxTraceMemory.setText(QCoreApplication.translate("OptionsDialog", u"Trace memory allocations (tracemalloc)", None))
         self.pushButtonOK.setText(QCoreApplication.translate("OptionsDialog", u"OK", None))
         self.pushButtonCancel.setText(QCoreApplication.translate("OptionsDialog", u"Cancel", None))
     # retranslateUi
@@ -0,0 +1,90 @@
+import os
+import shutil
+import collections
+
+import pytest
+
+from PySide6.QtCore import QCoreApplication, QSettings
+
+from c3d_parser.batch import ProgressTracker
+from c3d_parser.core.backends import StandInBackend
+from c3d_parser.core.c3d_parser import parse_session
+from c3d_parser.settings.general import set_applications_settings, setup_marker_maps_dir
+
+
+DATA_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+SESSION_LAB = "Sydney"
+SESSION_STATIC_TRIAL = "S4 AM Cal 01.c3d"
+SESSION_DYNAMIC_TRIALS = ["S4-AMGait04.c3d", "S4-AMGait05.c3d"]
+SESSION_STATIC_DATA = {'Height': 1500, 'Weight': 40, 'Age': 10, 'Sex': 'Male', 'ASIS Width': 220,
+                       'Left Leg Length': 800.0, 'Right Leg Length': 805.0, 'Left Knee Width': 100,
+                       'Right Knee Width': 100, 'Left Ankle Width': 60, 'Right Ankle Width': 60}
+
+
+class CountingBackend(StandInBackend):
+    """
+    Stand-in backend that counts the steps it runs.
+    """
+
+    def __init__(self, name='stand-in'):
+        super().__init__()
+        self.name = name
+        self.calls = collections.Counter()
+
+    def create_model(self, *args, **kwargs):
+        self.calls['model_fit'] += 1
+        return super().create_model(*args, **kwargs)
+
+    def inverse_kinematics(self, *args, **kwargs):
+        self.calls['ik'] += 1
+        super().inverse_kinematics(*args, **kwargs)
+
+    def inverse_dynamics(self, *args, **kwargs):
+        self.calls['id'] += 1
+        super().inverse_dynamics(*args, **kwargs)
+
+
+def write_stage_output(output_directory, calls, value=1):
+    """
+    Stage computation for the cache and journal tests: records `value` in `calls` and writes it to
+    a file in the output directory, returning the stage result and the file.
+    """
+    calls.append(value)
+    output_file = os.path.join(output_directory, 'stage', 'output.txt')
+    if not os.path.exists(os.path.dirname(output_file)):
+        os.makedirs(os.path.dirname(output_file))
+    with open(output_file, 'w') as file:
+        file.write(f"output {value}\n")
+    return {'value': value}, [output_file]
+
+
+@pytest.fixture
+def marker_maps(tmp_path):
+    """
+    Seeds the bundled marker maps into a temporary settings directory.
+    """
+    set_applications_settings(QCoreApplication)
+    QSettings.setPath(QSettings.Format.IniFormat, QSettings.Scope.UserScope, str(tmp_path / "settings"))
+
+    return setup_marker_maps_dir()
+
+
+@pytest.fixture
+def session_input(tmp_path, marker_maps):
+    """
+    Copies the static trial and two walking trials of a session into a temporary input directory.
+    """
+    input_directory = tmp_path / "input"
+    input_directory.mkdir()
+    shutil.copy(os.path.join(DATA_DIRECTORY, SESSION_LAB, "static", SESSION_STATIC_TRIAL), input_directory)
+    for trial in SESSION_DYNAMIC_TRIALS:
+        shutil.copy(os.path.join(DATA_DIRECTORY, SESSION_LAB, "dynamic", trial), input_directory)
+
+    return str(input_directory)
+
+
+def run_session(input_directory, output_directory, backend, cache=None, resume=False, filter_grf=True):
+    return parse_session(SESSION_STATIC_TRIAL, SESSION_DYNAMIC_TRIALS, input_directory, str(output_directory),
+                         SESSION_LAB, 14.0, dict(SESSION_STATIC_DATA), True, True, False, False, True, filter_grf,
+                         None, False, ProgressTracker("test"), cache=cache, resume=resume, backend=backend)
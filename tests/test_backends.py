@@ -0,0 +1,28 @@
+import pytest
+
+from c3d_parser.core.backends import KinematicsBackend, StandInBackend, get_backend
+
+
+def test_backend_must_implement_every_step():
+    with pytest.raises(TypeError):
+        KinematicsBackend()
+
+    class PartialBackend(KinematicsBackend):
+        name = 'partial'
+
+        def inverse_kinematics(self, model_file, trc_file, output_file, ik_task_set=None):
+            pass
+
+    with pytest.raises(TypeError):
+        PartialBackend()
+
+
+def test_get_backend():
+    backend = get_backend('stand-in', latency={'ik': 0.0})
+    assert isinstance(backend, StandInBackend)
+    assert isinstance(backend, KinematicsBackend)
+
+    with pytest.raises(ValueError):
+        get_backend('unknown')
+    with pytest.raises(ValueError):
+        get_backend('stand-in', latency={'unknown': 1.0})
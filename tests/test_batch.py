@@ -0,0 +1,25 @@
+import os
+import json
+
+from c3d_parser.batch import load_manifest, run_session
+
+from conftest import SESSION_LAB, SESSION_STATIC_TRIAL, SESSION_DYNAMIC_TRIALS, SESSION_STATIC_DATA
+
+
+def test_columnar_outputs(tmp_path, session_input):
+    manifest = {'output_directory': "outputs",
+                'defaults': {'lab': SESSION_LAB, 'backend': 'stand-in', 'output_columnar': True},
+                'sessions': [{'name': "session", 'input_directory': session_input,
+                              'static_trial': SESSION_STATIC_TRIAL, 'dynamic_trials': SESSION_DYNAMIC_TRIALS,
+                              'static_data': SESSION_STATIC_DATA}]}
+    manifest_file = tmp_path / "manifest.json"
+    manifest_file.write_text(json.dumps(manifest))
+
+    sessions, _ = load_manifest(str(manifest_file))
+    summary = run_session(sessions[0])
+    assert summary['status'] == "success", summary['message']
+
+    columnar_directory = os.path.join(sessions[0]['output_directory'], 'normalised', 'columnar')
+    with open(os.path.join(columnar_directory, 'manifest.json')) as file:
+        tables = json.load(file)['tables']
+    assert {'grf', 'kinematics', 'kinetics', 'spatiotemporal'} <= set(tables)
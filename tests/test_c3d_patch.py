@@ -0,0 +1,41 @@
+import io
+
+import numpy as np
+
+from c3d_parser.core.c3d_patch import c3d
+
+
+def write_c3d(frames, analog_channels, points=6, samples_per_frame=10):
+    writer = c3d.Writer(point_rate=100, analog_rate=100 * samples_per_frame, point_scale=-0.01)
+    writer.set_point_labels([f'M{i}' for i in range(points)])
+    writer.set_analog_labels([f'A{i}' for i in range(analog_channels)])
+    writer.set_analog_scales(np.ones(analog_channels))
+    writer.set_analog_offsets(np.zeros(analog_channels))
+
+    rng = np.random.default_rng(0)
+    point_data = np.zeros((frames, points, 5))
+    point_data[..., :3] = rng.uniform(-1000, 1000, (frames, points, 3))
+    analog_data = rng.uniform(-1, 1, (frames, analog_channels, samples_per_frame))
+    writer.add_frames(list(zip(point_data, analog_data)))
+
+    handle = io.BytesIO()
+    writer.write(handle)
+    handle.seek(0)
+    return handle, point_data, analog_data
+
+
+def test_add_frames_matching_point_and_analog_counts():
+    # Each frame's point and analog arrays have the same number of rows.
+    handle, point_data, analog_data = write_c3d(frames=20, analog_channels=6, points=6)
+
+    frames = list(c3d.Reader(handle).read_frames())
+    assert len(frames) == 20
+    np.testing.assert_allclose(np.array([points[:, :3] for _, points, _ in frames]), point_data[..., :3], atol=0.01)
+    np.testing.assert_allclose(np.array([analog for _, _, analog in frames]), analog_data, rtol=1e-6)
+
+
+def test_add_single_frame():
+    writer = c3d.Writer(point_rate=100, analog_rate=1000)
+    writer.add_frames((np.zeros((6, 5)), np.zeros((6, 10))))
+    writer.add_frames((np.zeros((6, 5)), np.zeros((6, 10))), index=0)
+    assert len(writer._frames) == 2
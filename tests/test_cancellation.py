@@ -0,0 +1,62 @@
+import os
+import functools
+
+import pytest
+
+from c3d_parser.core import c3d_parser
+from c3d_parser.core.c3d_parser import CancelException, CancellationToken, parse_dynamic_trial
+from c3d_parser.core.grf_stream import stream_grf_data
+
+from conftest import DATA_DIRECTORY
+
+
+STATIC_DATA = {'Left Leg Length': 800.0, 'Right Leg Length': 800.0}
+C3D_FILE = os.path.join(DATA_DIRECTORY, "Sydney", "dynamic", "S4-AMGait05.c3d")
+
+
+class CountingToken(CancellationToken):
+    """
+    Token that is cancelled by its `limit`th check.
+    """
+
+    def __init__(self, limit=None):
+        super().__init__()
+        self.limit = limit
+        self.checks = 0
+
+    def raise_if_cancelled(self):
+        self.checks += 1
+        if self.checks == self.limit:
+            self.cancel()
+        super().raise_if_cancelled()
+
+
+def parse(output_directory, cancel_token, grf_streaming_duration=60.0):
+    return parse_dynamic_trial(C3D_FILE, "Sydney", str(output_directory), 1, 100, STATIC_DATA, True, True, False,
+                               grf_streaming_duration=grf_streaming_duration, cancel_token=cancel_token)
+
+
+def test_cancelled_before_parse(marker_maps, tmp_path):
+    cancel_token = CancellationToken()
+    cancel_token.cancel()
+    with pytest.raises(CancelException):
+        parse(tmp_path, cancel_token)
+    assert not os.path.exists(tmp_path / "de_identified")
+
+
+def test_cancelled_between_chunks(marker_maps, tmp_path, monkeypatch):
+    monkeypatch.setattr(c3d_parser, 'stream_grf_data', functools.partial(stream_grf_data, chunk_size=200))
+
+    # Count the checks of a complete parse, with the GRF data streamed in chunks.
+    cancel_token = CountingToken()
+    parse(tmp_path / "complete", cancel_token, grf_streaming_duration=0.0)
+    checks = cancel_token.checks
+    assert checks > 10
+
+    # Cancelling during the GRF step stops the stream before the TRC data is written.
+    cancel_token = CountingToken(checks - 5)
+    with pytest.raises(CancelException):
+        parse(tmp_path / "cancelled", cancel_token, grf_streaming_duration=0.0)
+    assert cancel_token.checks == checks - 5
+    assert os.path.exists(tmp_path / "cancelled" / "grf" / "dynamic_1_grf.mot")
+    assert not os.path.exists(tmp_path / "cancelled" / "trc")
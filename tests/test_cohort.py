@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from c3d_parser.core.c3d_parser import grf_columns, write_normalised_grfs, write_spatiotemporal_data
+from c3d_parser.core.cohort import CohortStore, read_normalised_csv
+from c3d_parser.core.cycles import CycleStore
+
+
+TRIAL_NAMES = {'walk01.c3d': 'dynamic_1', 'walk02.c3d': 'dynamic_2'}
+
+
+def create_store(variables, seed=0):
+    rng = np.random.default_rng(seed)
+    cycle_data = {side: {trial: {cycle: rng.normal(size=(len(variables), 80 + cycle)) for cycle in [1, 2]}
+                         for trial in TRIAL_NAMES} for side in ["Left", "Right"]}
+    return CycleStore.from_cycles(cycle_data, variables)
+
+
+def write_session(output_directory):
+    store = create_store(grf_columns)
+    s_t_data = {trial: pd.DataFrame({"Stride Length (m)": [1.2, 1.3]}, index=["Left-1", "Right-1"])
+                for trial in TRIAL_NAMES}
+    write_normalised_grfs(store, TRIAL_NAMES, set(), str(output_directory))
+    write_spatiotemporal_data(s_t_data, TRIAL_NAMES, str(output_directory))
+    return store
+
+
+def test_read_normalised_csv(tmp_path):
+    store = write_session(tmp_path)
+    read_store = read_normalised_csv(str(tmp_path / "normalised" / "combined_grf.csv"))
+
+    assert read_store.variables == grf_columns
+    assert list(read_store.index['trial']) == [TRIAL_NAMES[trial] for trial in store.index['trial']]
+    assert list(read_store.index['side']) == list(store.index['side'])
+    assert list(read_store.index['cycle']) == list(store.index['cycle'])
+    np.testing.assert_allclose(read_store.data, store.data, atol=1e-6)
+
+
+def test_ingest_sessions(tmp_path):
+    store = write_session(tmp_path / "output")
+    cohort = CohortStore(str(tmp_path / "cohort"))
+    cohort.ingest_session(str(tmp_path / "output"), "P01", "2026-03-01")
+    with pytest.raises(ValueError):
+        cohort.ingest_session(str(tmp_path / "output"), "P01", "2026-03-01")
+    cohort.ingest_session(str(tmp_path / "output"), "P02", "2026-05-02")
+
+    # The index files are appended to, so a new instance reads both sessions.
+    cohort = CohortStore(str(tmp_path / "cohort"))
+    assert list(cohort.sessions()['session']) == ["P01_2026-03-01", "P02_2026-05-02"]
+    assert len(cohort.spatiotemporal()) == 2 * 2 * len(TRIAL_NAMES)
+
+    index, data = cohort.cycles('grf', subjects="P02")
+    assert len(index) == len(store)
+    np.testing.assert_allclose(data, store.data, atol=1e-6)
+
+    means = cohort.group_means('grf', by=('subject', 'side'))
+    assert set(means) == {(subject, side) for subject in ["P01", "P02"] for side in ["Left", "Right"]}
+    for side in ["Left", "Right"]:
+        expected = store.data[(store.index['side'] == side).to_numpy()].mean(axis=0)
+        np.testing.assert_allclose(means[("P01", side)], expected, atol=1e-6)
+
+
+def test_missing_variables(tmp_path):
+    cohort = CohortStore(str(tmp_path))
+    full_store = create_store(grf_columns)
+    partial_store = create_store(grf_columns[:2], seed=1)
+    cohort.add_session("P01", "2026-03-01", {'grf': full_store})
+    cohort.add_session("P02", "2026-05-02", {'grf': partial_store})
+
+    index, data = cohort.cycles('grf')
+    assert data.shape == (2 * len(full_store), len(grf_columns), full_store.frames)
+    partial = (index['subject'] == "P02").to_numpy()
+    assert np.isnan(data[partial, 2]).all()
+    np.testing.assert_allclose(data[partial, :2], partial_store.data)
+
+    # Means leave out the cycles that are missing a variable.
+    means = cohort.group_means('grf', by=('side',))
+    left = (full_store.index['side'] == "Left").to_numpy()
+    np.testing.assert_allclose(means[("Left",)][2], full_store.data[left, 2].mean(axis=0))
+    np.testing.assert_allclose(means[("Left",)][:2],
+                               np.concatenate([full_store.data[left, :2], partial_store.data[left]]).mean(axis=0))
@@ -0,0 +1,41 @@
+import numpy as np
+
+from c3d_parser.core.cycles import NORMALISED_FRAMES, CycleStore
+
+
+def create_store():
+    # Two cycles per side of one trial, with constant values 1 to 4.
+    cycle_data = {side: {'trial': {cycle: np.full((1, 50), 2 * offset + cycle) for cycle in [1, 2]}}
+                  for offset, side in enumerate(["Left", "Right"])}
+    return CycleStore.from_cycles(cycle_data, ['value'])
+
+
+def test_ensemble_statistics():
+    store = create_store()
+    statistics = store.ensemble_statistics()
+    assert statistics["Left"]['count'] == 2
+    np.testing.assert_allclose(statistics["Left"]['mean'], np.full((1, NORMALISED_FRAMES), 1.5))
+    np.testing.assert_allclose(statistics["Right"]['mean'], np.full((1, NORMALISED_FRAMES), 3.5))
+    # Sample standard deviation of 1 and 2.
+    np.testing.assert_allclose(statistics["Left"]['std'], np.full((1, NORMALISED_FRAMES), np.sqrt(0.5)))
+
+    statistics = store.ensemble_statistics(['trial'], {('trial', 'Left_1')})
+    assert statistics["Left"]['count'] == 1
+    np.testing.assert_allclose(statistics["Left"]['mean'], np.full((1, NORMALISED_FRAMES), 2.0))
+    assert np.isnan(statistics["Left"]['std']).all()
+
+
+def test_ensemble_statistics_excluded_flags():
+    store = create_store()
+    assert store.ensemble_statistics()["Left"]['count'] == 2
+
+    # Without explicit exclusions the stored flags apply, and changing them invalidates the cached statistics.
+    store.set_excluded({('trial', 'Left_2')})
+    statistics = store.ensemble_statistics()
+    assert statistics["Left"]['count'] == 1
+    np.testing.assert_allclose(statistics["Left"]['mean'], np.full((1, NORMALISED_FRAMES), 1.0))
+
+    # Explicit exclusions replace the flags.
+    assert store.ensemble_statistics(excluded_cycles=set())["Left"]['count'] == 2
+    store.set_excluded(set())
+    assert store.ensemble_statistics()["Left"]['count'] == 2
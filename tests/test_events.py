@@ -0,0 +1,41 @@
+import io
+
+import numpy as np
+
+from c3d_parser.core.c3d_parser import extract_events
+from c3d_parser.core.c3d_patch import c3d
+
+
+def write_events(events):
+    writer = c3d.Writer(point_rate=100, analog_rate=1000)
+    writer.set_point_labels(['M0'])
+    writer.set_analog_labels(['A0'])
+
+    contexts, times, labels = zip(*events)
+    group = writer.get_create('EVENT')
+    group.add('USED', 'Number of events', 2, '<H', len(events))
+    for name, strings in [('CONTEXTS', contexts), ('LABELS', labels)]:
+        length = max(len(string) for string in strings)
+        group.add_str(name, name, ''.join(string.ljust(length) for string in strings), length, len(strings))
+    times = np.array([[0.0, time] for time in times], dtype=np.float32)
+    group.add_param('TIMES', desc='TIMES', bytes_per_element=4, bytes=times.tobytes(), dimensions=[2, len(events)])
+
+    writer.add_frames([(np.zeros((1, 5)), np.zeros((1, 10)))] * 100)
+    handle = io.BytesIO()
+    writer.write(handle)
+    handle.seek(0)
+    return c3d.Reader(handle)
+
+
+def test_more_than_127_events():
+    # 50 strides per side, each with a foot strike and a foot off.
+    events = []
+    for side, offset in [('Left', 0.0), ('Right', 0.5)]:
+        for stride in range(50):
+            events += [(side, round(offset + stride, 2), 'Foot Strike'),
+                       (side, round(offset + stride + 0.6, 2), 'Foot Off')]
+
+    table = extract_events(write_events(events), 0.0, 100.0)
+    assert len(table) == 200
+    assert (table.data['type'] == "Foot Strike").sum() == 100
+    assert table.data.groupby('side')['stride'].max().tolist() == [50, 50]
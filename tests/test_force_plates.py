@@ -0,0 +1,23 @@
+import numpy as np
+
+from c3d_parser.core.force_plates import PlateGeometry
+
+
+# A 400 x 600 mm plate with its X axis along the global -X axis, and an unused plate with zero corners.
+PLATE_CORNERS = [[0.0, 600.0, 0.0], [400.0, 600.0, 0.0], [400.0, 0.0, 0.0], [0.0, 0.0, 0.0]]
+UNUSED_CORNERS = [[0.0, 0.0, 0.0]] * 4
+
+
+def test_unused_plate_geometry():
+    plates = PlateGeometry([PLATE_CORNERS, UNUSED_CORNERS])
+
+    assert len(plates) == 2
+    np.testing.assert_allclose(plates.rotation_matrices[0] @ [1, 0, 0], [-1, 0, 0], atol=1e-9)
+    np.testing.assert_allclose(plates.rotation_matrices[1], np.eye(3))
+
+
+def test_contains():
+    plates = PlateGeometry([UNUSED_CORNERS, PLATE_CORNERS])
+    membership = plates.contains([[200.0, 300.0, 0.0], [400.0, 600.0, 0.0], [0.0, 0.0, 0.0], [500.0, 300.0, 0.0]])
+
+    np.testing.assert_array_equal(membership, [[False, True], [False, True], [False, True], [False, False]])
@@ -0,0 +1,69 @@
+import os
+import json
+import functools
+
+import numpy as np
+import pytest
+
+from c3d_parser.core import c3d_parser
+from c3d_parser.core.backends import StandInBackend
+from c3d_parser.core.c3d_parser import parse_dynamic_trial
+from c3d_parser.core.grf_stream import GRF_STREAMING_DURATION
+from c3d_parser.core.segmentation import GRF_RULE, segment_trial, strike_table
+from c3d_parser.core.timing import TIMINGS_FILE
+
+from conftest import DATA_DIRECTORY, SESSION_DYNAMIC_TRIALS, run_session
+
+
+STATIC_DATA = {'Left Leg Length': 800.0, 'Right Leg Length': 800.0}
+TRIALS = [("Sydney", "S4-AMGait05.c3d"), ("RCH", "RCH.08.c3d")]
+
+
+def parse_trial(lab, file_name, output_directory, grf_streaming_duration):
+    c3d_file = os.path.join(DATA_DIRECTORY, lab, "dynamic", file_name)
+    analog_data, events, _, _, grf_file_path = parse_dynamic_trial(
+        c3d_file, lab, str(output_directory), 1, 100, STATIC_DATA, True, True, False,
+        grf_streaming_duration=grf_streaming_duration)
+    with open(grf_file_path, 'r') as file:
+        row_count = int(next(line for line in file if line.startswith("nRows=")).split("=")[1])
+
+    return analog_data, events, row_count
+
+
+@pytest.mark.parametrize("lab, file_name", TRIALS)
+def test_streamed_cycles(marker_maps, tmp_path, lab, file_name):
+    analog_data, events, row_count = parse_trial(lab, file_name, tmp_path / "memory", GRF_STREAMING_DURATION)
+    streamed_data, streamed_events, streamed_row_count = parse_trial(lab, file_name, tmp_path / "stream", 0.0)
+
+    # The whole trial is written, but only the samples of the force plate cycles are kept.
+    assert streamed_row_count == row_count == len(analog_data)
+    assert len(streamed_data) < len(analog_data)
+
+    cycles = segment_trial(analog_data, strike_table(events), GRF_RULE)
+    streamed_cycles = segment_trial(streamed_data, strike_table(streamed_events), GRF_RULE)
+    assert sum(len(side_cycles) for side_cycles in cycles.values()) > 0
+    for side in cycles:
+        assert streamed_cycles[side].keys() == cycles[side].keys()
+        for cycle, values in cycles[side].items():
+            # Boundaries can differ by a sample, as the in-memory time values accumulate rounding error.
+            count = min(values.shape[1], streamed_cycles[side][cycle].shape[1])
+            assert abs(values.shape[1] - streamed_cycles[side][cycle].shape[1]) <= 1
+            np.testing.assert_allclose(streamed_cycles[side][cycle][:, :count], values[:, :count], atol=1e-6)
+
+
+def test_streamed_sample_counts(tmp_path, session_input, monkeypatch):
+    # Every trial of the session is streamed.
+    monkeypatch.setattr(c3d_parser, 'parse_dynamic_trial',
+                        functools.partial(c3d_parser.parse_dynamic_trial, grf_streaming_duration=0.0))
+    output_directory = tmp_path / "output"
+    run_session(session_input, output_directory, StandInBackend())
+
+    with open(output_directory / TIMINGS_FILE, 'r') as file:
+        records = json.load(file)['records']
+    grf_samples = {record['trial']: record['samples'] for record in records if record['stage'] == 'grf'}
+    parse_samples = {record['trial']: record['samples'] for record in records
+                     if record['stage'] == 'parse' and 'parent' not in record}
+    assert parse_samples == {trial: grf_samples[trial] for trial in SESSION_DYNAMIC_TRIALS}
+    for trial in SESSION_DYNAMIC_TRIALS:
+        with open(output_directory / "grf" / f"dynamic_{SESSION_DYNAMIC_TRIALS.index(trial) + 1}_grf.mot") as file:
+            assert parse_samples[trial] == int(next(line for line in file if line.startswith("nRows=")).split("=")[1])
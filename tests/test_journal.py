@@ -0,0 +1,83 @@
+import os
+import json
+
+import pytest
+
+from c3d_parser.core.journal import JOURNAL_DIRECTORY, JOURNAL_FILE, SessionJournal
+
+from conftest import CountingBackend, run_session, write_stage_output
+
+
+def test_resume(tmp_path):
+    output_directory = str(tmp_path)
+    calls = []
+    SessionJournal(output_directory).run('stage', 'a' * 64, lambda: write_stage_output(output_directory, calls, 1))
+
+    # Resumed runs skip the stage, returning the recorded result.
+    journal = SessionJournal(output_directory, resume=True)
+    result, files = journal.run('stage', 'a' * 64, lambda: write_stage_output(output_directory, calls, 2))
+    assert calls == [1]
+    assert result == {'value': 1}
+    assert files == [os.path.join(output_directory, 'stage', 'output.txt')]
+
+    # Stages with a different key run, as do all stages of runs that aren't resumed.
+    journal.run('stage', 'b' * 64, lambda: write_stage_output(output_directory, calls, 3))
+    SessionJournal(output_directory).run('stage', 'a' * 64, lambda: write_stage_output(output_directory, calls, 4))
+    assert calls == [1, 3, 4]
+
+
+def test_changed_output(tmp_path):
+    output_directory = str(tmp_path)
+    calls = []
+    SessionJournal(output_directory).run('stage', 'a' * 64, lambda: write_stage_output(output_directory, calls, 1))
+
+    with open(os.path.join(output_directory, 'stage', 'output.txt'), 'a') as file:
+        file.write("edited\n")
+    result, _ = SessionJournal(output_directory, resume=True).run(
+        'stage', 'a' * 64, lambda: write_stage_output(output_directory, calls, 2))
+    assert calls == [1, 2]
+    assert result == {'value': 2}
+
+
+def test_interrupted_record(tmp_path):
+    output_directory = str(tmp_path)
+    calls = []
+    journal = SessionJournal(output_directory)
+    journal.run('stage', 'a' * 64, lambda: write_stage_output(output_directory, calls, 1))
+
+    # A record cut short by an interruption is ignored.
+    with open(os.path.join(output_directory, JOURNAL_DIRECTORY, JOURNAL_FILE), 'a') as file:
+        file.write(json.dumps({'stage': 'stage', 'key': 'b' * 64})[:20])
+
+    journal = SessionJournal(output_directory, resume=True)
+    journal.run('stage', 'a' * 64, lambda: write_stage_output(output_directory, calls, 2))
+    journal.run('stage', 'b' * 64, lambda: write_stage_output(output_directory, calls, 3))
+    assert calls == [1, 3]
+
+
+class FailingBackend(CountingBackend):
+    """
+    Counting backend whose ID fails for the second trial.
+    """
+
+    def inverse_dynamics(self, model_file, ik_file, grf_file, output_file):
+        if self.calls['id'] == 1:
+            raise RuntimeError("Interrupted.")
+        super().inverse_dynamics(model_file, ik_file, grf_file, output_file)
+
+
+def test_resume_session(tmp_path, session_input):
+    output_directory = tmp_path / "output"
+    with pytest.raises(RuntimeError):
+        run_session(session_input, output_directory, FailingBackend())
+
+    # The resumed session continues from the ID of the second trial.
+    backend = CountingBackend()
+    run_session(session_input, output_directory, backend, resume=True)
+    assert backend.calls == {'id': 1}
+    assert len(os.listdir(output_directory / "id")) == 2
+
+    # Without `resume` the output directory is cleared and every stage runs.
+    backend = CountingBackend()
+    run_session(session_input, output_directory, backend)
+    assert backend.calls == {'model_fit': 1, 'ik': 2, 'id': 2}
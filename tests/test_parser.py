@@ -1,19 +1,23 @@
 
 import os
 
-from c3d_parser.core.c3d_parser import parse_c3d
+from c3d_parser.core.c3d_parser import parse_dynamic_trial
 
 
 if __name__ == "__main__":
     data_directory = os.path.abspath("data")
     output_directory = os.path.abspath("output")
 
-    for subdir, dirs, files in os.walk(data_directory):
+    # Leg lengths are only needed for the normalised spatio-temporal parameters.
+    static_data = {'Left Leg Length': 0, 'Right Leg Length': 0}
 
-        # Temporarily skip "general" directory.
-        if subdir == os.path.join(data_directory, "general"):
+    for lab in sorted(os.listdir(data_directory)):
+        dynamic_directory = os.path.join(data_directory, lab, "dynamic")
+        if not os.path.isdir(dynamic_directory):
             continue
 
-        for file in files:
-            c3d_path = os.path.abspath(os.path.join(subdir, file))
-            parse_c3d(c3d_path, output_directory)
+        for trial_index, file in enumerate(sorted(os.listdir(dynamic_directory)), start=1):
+            c3d_path = os.path.join(dynamic_directory, file)
+            trial_output_directory = os.path.join(output_directory, lab)
+            parse_dynamic_trial(c3d_path, lab, trial_output_directory, trial_index, 100, static_data,
+                                True, True, False)
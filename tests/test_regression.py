@@ -0,0 +1,77 @@
+import io
+import os
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from c3d_parser.core.c3d_parser import parse_dynamic_trial, grf_columns, kinematic_columns, kinetic_columns
+from c3d_parser.core.cycles import CycleStore
+from c3d_parser.core.segmentation import segment_session
+
+from conftest import DATA_DIRECTORY
+
+
+# Events, spatio-temporal parameters and cycles of the test trials, produced by the parser before the
+# event table, segmentation engine and cycle store were introduced. GRF cycles hold all 101 frames,
+# kinematic and kinetic cycles every tenth frame.
+with open(os.path.join(DATA_DIRECTORY, "expected_results.json"), 'r') as expected_file:
+    EXPECTED_RESULTS = json.load(expected_file)
+
+STATIC_DATA = {'Left Leg Length': 800.0, 'Right Leg Length': 805.0}
+
+
+# Columns of the synthetic kinematic and kinetic data, each with a different frequency.
+KINEMATIC_NAMES = ['pelvis_tilt', 'pelvis_list', 'pelvis_rotation'] + [
+    f'{name}_{side}' for side in 'lr' for name in ['hip_flexion', 'hip_adduction', 'hip_rotation', 'knee_flexion',
+                                                   'ankle_angle', 'subtalar_angle', 'foot_progression']]
+KINETIC_NAMES = [f'{name}_{side}_moment' for side in 'lr' for name in [
+    'hip_flexion', 'hip_adduction', 'hip_rotation', 'knee_flexion', 'knee_adduction', 'knee_rotation', 'ankle_angle',
+    'subtalar_angle']] + [f'{name}_{side}_power' for side in 'lr' for name in ['hip_flexion', 'knee_flexion',
+                                                                               'ankle_angle']]
+
+
+def synthetic_data(names, function):
+    time = np.arange(1500) / 100
+    data = pd.DataFrame({'time': time})
+    for i, name in enumerate(names):
+        data[name] = function(time * (i + 1) / 4)
+    return data
+
+
+def assert_cycles(store, expected_cycles, trial, frames):
+    for side, cycles in expected_cycles.items():
+        mask = store.mask(trials=[trial], side=side)
+        assert sorted(store.index['cycle'][mask].tolist()) == sorted(int(cycle) for cycle in cycles)
+        for cycle, expected in cycles.items():
+            position = np.flatnonzero(mask & (store.index['cycle'] == int(cycle)).to_numpy())[0]
+            np.testing.assert_allclose(store.data[position][:, frames], expected['values'], rtol=1e-6, atol=1e-8)
+
+
+@pytest.mark.parametrize("trial", sorted(EXPECTED_RESULTS))
+def test_trial(marker_maps, tmp_path, trial):
+    expected = EXPECTED_RESULTS[trial]
+    lab, file_name = trial.split('/')
+    analog_data, events, s_t_data, _, _ = parse_dynamic_trial(os.path.join(DATA_DIRECTORY, lab, "dynamic", file_name),
+                                                              lab, str(tmp_path), 1, 100, STATIC_DATA, True, True,
+                                                              False)
+
+    records = [[side, stride, event_time, event_type, plate]
+               for side, strides in events.to_dict().items() for stride, stride_events in strides.items()
+               for event_time, (event_type, plate) in stride_events.items()]
+    assert records == expected['events']
+
+    expected_s_t = pd.read_json(io.StringIO(json.dumps(expected['spatiotemporal'])), orient='split')
+    pd.testing.assert_frame_equal(s_t_data, expected_s_t, check_dtype=False, rtol=1e-8)
+
+    grf_cycles, kinematic_cycles, kinetic_cycles = segment_session(
+        {file_name: analog_data}, {file_name: synthetic_data(KINEMATIC_NAMES, lambda x: 10 * np.sin(x))},
+        {file_name: synthetic_data(KINETIC_NAMES, np.cos)}, {file_name: events})
+    for cycles, columns, name, frames in [(grf_cycles, grf_columns, 'grf', slice(None)),
+                                          (kinematic_cycles, kinematic_columns, 'kinematics', slice(None, None, 10)),
+                                          (kinetic_cycles, kinetic_columns, 'kinetics', slice(None, None, 10))]:
+        for side, trials in cycles.items():
+            samples = {str(cycle): values.shape[1] for cycle, values in trials.get(file_name, {}).items()}
+            assert samples == {cycle: values['samples'] for cycle, values in expected[name][side].items()}
+        assert_cycles(CycleStore.from_cycles(cycles, columns), expected[name], file_name, frames)
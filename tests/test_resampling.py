@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+
+from c3d_parser.core.resampling import get_resampled_times, resample_analog_data, select_resampling_method
+
+
+def analog_signal(data_rate, duration=3.0, start_time=0.0):
+    time = start_time + np.arange(int(duration * data_rate)) / data_rate
+    values = np.column_stack([300 * np.sin(2 * np.pi * 2 * time), 50 * np.cos(2 * np.pi * 7 * time)])
+    data = pd.DataFrame(values, columns=['Fx1', 'Fy1'])
+    data.insert(0, 'time', time)
+    return data
+
+
+def test_integer_ratio_keeps_input_samples():
+    for data_rate in [2000, 3000]:
+        analog_data = analog_signal(data_rate, start_time=0.004)
+        time = analog_data['time'].to_numpy()
+        output_times = get_resampled_times(time[0], time[-1], 1000)
+        assert select_resampling_method(time, data_rate, 1000, output_times) == 'decimate'
+
+        resampled = resample_analog_data(analog_data, data_rate, 1000)
+        positions = np.round((resampled['time'].to_numpy() - time[0]) * data_rate).astype(int)
+        np.testing.assert_array_equal(resampled[['Fx1', 'Fy1']].to_numpy(),
+                                      analog_data[['Fx1', 'Fy1']].to_numpy()[positions])
+
+
+def test_integer_ratio_matches_spline():
+    analog_data = analog_signal(2000)
+    decimated = resample_analog_data(analog_data, 2000, 1000)
+    spline = resample_analog_data(analog_data, 2000, 1000, method='spline')
+    np.testing.assert_allclose(decimated.to_numpy(), spline.to_numpy(), atol=1e-9)
+
+
+def test_rational_ratio_uses_polyphase():
+    analog_data = analog_signal(1200)
+    time = analog_data['time'].to_numpy()
+    output_times = get_resampled_times(time[0], time[-1], 1000)
+    assert select_resampling_method(time, 1200, 1000, output_times) == 'polyphase'
+
+    resampled = resample_analog_data(analog_data, 1200, 1000)
+    expected = 300 * np.sin(2 * np.pi * 2 * resampled['time'].to_numpy())
+    interior = slice(100, -100)
+    np.testing.assert_allclose(resampled['Fx1'].to_numpy()[interior], expected[interior], atol=1e-2)
+
+
+def test_irregular_ratio_uses_spline():
+    analog_data = analog_signal(1111)
+    time = analog_data['time'].to_numpy()
+    output_times = get_resampled_times(time[0], time[-1], 1000)
+    assert select_resampling_method(time, 1111, 1000, output_times) == 'spline'
@@ -0,0 +1,79 @@
+import time
+import multiprocessing
+
+import pytest
+
+from c3d_parser.core.scheduler import ResourceBudget, build_run_report
+
+
+STAGE_DURATION = 0.5
+
+
+def run_stage(budget, stage, results):
+    records = []
+    with budget.stage(stage, records):
+        start_time = time.time()
+        time.sleep(STAGE_DURATION)
+        end_time = time.time()
+    results.put((start_time, end_time, records[0]))
+
+
+def test_stages_share_budget():
+    context = multiprocessing.get_context('spawn')
+    budget = ResourceBudget(context, cpu_budget=1)
+    results = context.Queue()
+    processes = [context.Process(target=run_stage, args=(budget, 'model_fit', results)) for _ in range(2)]
+    for process in processes:
+        process.start()
+    (first_start, first_end, first_record), (second_start, second_end, second_record) = \
+        sorted(results.get(timeout=60) for _ in processes)
+    for process in processes:
+        process.join()
+
+    # The stages don't overlap, and the second one's queue wait is recorded.
+    assert second_start >= first_end
+    assert first_record['stage'] == second_record['stage'] == 'model_fit'
+    assert second_record['wait'] >= STAGE_DURATION / 2
+    assert min(first_record['wait'], second_record['wait']) < STAGE_DURATION / 2
+
+
+def test_over_budget_stage_runs_alone():
+    budget = ResourceBudget(multiprocessing.get_context('spawn'), cpu_budget=2, memory_budget=1000,
+                            profiles={'model_fit': {'cpu': 4, 'memory': 3000}})
+    model_fit = budget.profiles['model_fit']
+    assert budget._fits(model_fit)
+
+    budget.acquire('parse')
+    assert not budget._fits(model_fit)
+    assert budget._fits({'cpu': 1, 'memory': 500})
+    assert not budget._fits({'cpu': 1, 'memory': 600})
+    budget.release('parse')
+
+    records = []
+    with budget.stage('model_fit', records):
+        # Nothing else runs alongside the over-budget stage.
+        assert not budget._fits({'cpu': 1, 'memory': 0})
+    assert records[0]['stage'] == 'model_fit'
+
+
+def test_run_report():
+    budget = ResourceBudget(multiprocessing.get_context('spawn'), cpu_budget=2)
+    summaries = [
+        {'session': "a", 'status': "success", 'trials': 2,
+         'stages': [{'stage': 'model_fit', 'wait': 1.0, 'duration': 3.0},
+                    {'stage': 'parse', 'wait': 0.0, 'duration': 1.0}]},
+        {'session': "b", 'status': "failed", 'trials': 0,
+         'stages': [{'stage': 'parse', 'wait': 2.0, 'duration': 2.0}]},
+    ]
+    report = build_run_report(summaries, 0.0, 7200.0, budget)
+
+    assert (report['succeeded'], report['failed'], report['trials']) == (1, 1, 2)
+    assert report['sessions_per_hour'] == pytest.approx(0.5)
+    assert report['trials_per_hour'] == pytest.approx(1.0)
+    assert list(report['stages']) == ['parse', 'model_fit']
+    parse = report['stages']['parse']
+    assert parse['count'] == 2
+    assert parse['run_time'] == pytest.approx(3.0)
+    assert parse['max_run_time'] == pytest.approx(2.0)
+    assert parse['queue_wait'] == pytest.approx(2.0)
+    assert parse['mean_queue_wait'] == pytest.approx(1.0)
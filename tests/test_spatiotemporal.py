@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+from c3d_parser.core.events import EventTable
+from c3d_parser.core.spatiotemporal import calculate_spatiotemporal_data
+
+
+SPEED = 1200.0
+STRIDE_DURATION = 1.1
+STATIC_DATA = {'Left Leg Length': 800.0, 'Right Leg Length': 800.0}
+
+
+def walking_frames(start_time, frames, rate=100):
+    time = start_time + np.arange(frames) / rate
+    data = {'Time': time}
+    for side, offset in [('L', 80.0), ('R', -80.0)]:
+        data[f'{side}HEE'] = [np.array([SPEED * t, 0.0, offset]) for t in time]
+    return pd.DataFrame(data)
+
+
+def walking_events(first_strike, strides):
+    records = []
+    for side, delay in [('Left', 0.0), ('Right', STRIDE_DURATION / 2)]:
+        for stride in range(strides):
+            strike = first_strike + delay + stride * STRIDE_DURATION
+            records += [(side, strike, "Foot Strike"), (side, strike + 0.6 * STRIDE_DURATION, "Foot Off")]
+    return EventTable.from_records(records)
+
+
+def test_stride_lengths():
+    data = calculate_spatiotemporal_data(walking_frames(0.0, 500), walking_events(0.1, 4), STATIC_DATA)
+
+    np.testing.assert_allclose(data["Stride Length (m)"].dropna(), SPEED * STRIDE_DURATION / 1000, atol=1e-9)
+    np.testing.assert_allclose(data["Gait Speed (m/s)"].dropna(), SPEED / 1000, atol=1e-9)
+    np.testing.assert_allclose(data["Step Width (m)"].dropna(), 0.16, atol=1e-9)
+
+
+def test_strike_before_first_frame():
+    # The first strike (5/120 s) precedes the first resampled frame, so the first frame is used.
+    frame_data = walking_frames(0.05, 500)
+    data = calculate_spatiotemporal_data(frame_data, walking_events(5 / 120, 4), STATIC_DATA)
+
+    stride_lengths = data["Stride Length (m)"].dropna()
+    assert (stride_lengths > 1.0).all()
+    assert (data["Gait Speed (m/s)"].dropna() > 0).all()
+    first_heel = frame_data['LHEE'].iloc[0][0]
+    second_heel = frame_data['LHEE'][frame_data['Time'] <= 5 / 120 + STRIDE_DURATION + 1e-9].iloc[-1][0]
+    assert np.isclose(stride_lengths["Left-1"], (second_heel - first_heel) / 1000)
+
+
+def test_strikes_on_one_side():
+    events = walking_events(0.1, 4)
+    events = events.select((events.data['side'] == "Left").to_numpy())
+    data = calculate_spatiotemporal_data(walking_frames(0.0, 500), events, STATIC_DATA)
+
+    stride_lengths = data["Stride Length (m)"].dropna()
+    assert len(stride_lengths) == 3
+    assert all(label.startswith("Left") for label in stride_lengths.index)
+    np.testing.assert_allclose(stride_lengths, SPEED * STRIDE_DURATION / 1000, atol=1e-9)
@@ -0,0 +1,158 @@
+import os
+import json
+
+import numpy as np
+
+from c3d_parser.core import c3d_parser
+from c3d_parser.core.stage_cache import StageCache
+
+from conftest import SESSION_LAB, CountingBackend, run_session, write_stage_output
+
+
+def test_key(tmp_path):
+    cache = StageCache(str(tmp_path / "cache"))
+    input_file = tmp_path / "input.c3d"
+    input_file.write_bytes(b"first")
+
+    key = cache.key('parse', [str(input_file)], filter_grf=True)
+    assert cache.key('parse', [str(input_file)], filter_grf=True) == key
+    assert cache.key('parse', [str(input_file)], filter_grf=False) != key
+    assert cache.key('ik', [str(input_file)], filter_grf=True) != key
+
+    input_file.write_bytes(b"second")
+    os.utime(input_file, ns=(0, 0))
+    assert cache.key('parse', [str(input_file)], filter_grf=True) != key
+
+
+def test_restore(tmp_path):
+    cache = StageCache(str(tmp_path / "cache"))
+    calls = []
+    first_directory, second_directory = str(tmp_path / "first"), str(tmp_path / "second")
+
+    result, files = cache.run('stage', 'a' * 64, first_directory, lambda: write_stage_output(first_directory, calls))
+    assert result == {'value': 1}
+
+    # The cached result is returned and its files are copied into the new output directory.
+    result, files = cache.run('stage', 'a' * 64, second_directory, lambda: write_stage_output(second_directory, calls))
+    assert calls == [1]
+    assert result == {'value': 1}
+    assert files == [os.path.join(second_directory, 'stage', 'output.txt')]
+    with open(files[0], 'r') as file:
+        assert file.read() == "output 1\n"
+
+
+def test_force(tmp_path):
+    output_directory = str(tmp_path / "output")
+    calls = []
+    StageCache(str(tmp_path / "cache")).run('stage', 'a' * 64, output_directory,
+                                            lambda: write_stage_output(output_directory, calls, 1))
+
+    forced = StageCache(str(tmp_path / "cache"), force=True)
+    result, _ = forced.run('stage', 'a' * 64, output_directory, lambda: write_stage_output(output_directory, calls, 2))
+    assert calls == [1, 2]
+    assert result == {'value': 2}
+
+    # The forced run replaces the cached outputs.
+    result, _ = StageCache(str(tmp_path / "cache")).run('stage', 'a' * 64, output_directory,
+                                                        lambda: write_stage_output(output_directory, calls, 3))
+    assert calls == [1, 2]
+    assert result == {'value': 2}
+
+
+def test_corrupted_entry(tmp_path):
+    cache = StageCache(str(tmp_path / "cache"))
+    output_directory = str(tmp_path / "output")
+    calls = []
+    cache.run('stage', 'a' * 64, output_directory, lambda: write_stage_output(output_directory, calls, 1))
+
+    entry_directory = os.path.join(str(tmp_path / "cache"), 'stage', 'aa', 'a' * 64)
+    with open(os.path.join(entry_directory, 'result.pkl'), 'wb') as file:
+        file.write(b"truncated")
+
+    # The unreadable entry is recomputed and replaced.
+    result, _ = cache.run('stage', 'a' * 64, output_directory, lambda: write_stage_output(output_directory, calls, 2))
+    assert calls == [1, 2]
+    assert result == {'value': 2}
+    result, _ = cache.run('stage', 'a' * 64, output_directory, lambda: write_stage_output(output_directory, calls, 3))
+    assert calls == [1, 2]
+
+
+def test_disabled(tmp_path):
+    cache = StageCache(None)
+    output_directory = str(tmp_path / "output")
+    calls = []
+    for value in [1, 2]:
+        cache.run('stage', 'a' * 64, output_directory, lambda: write_stage_output(output_directory, calls, value))
+    assert calls == [1, 2]
+    assert not os.path.exists(tmp_path / "cache")
+
+
+def count_parses(monkeypatch):
+    calls = []
+    parse_dynamic_trial = c3d_parser.parse_dynamic_trial
+
+    def counting_parse(*args, **kwargs):
+        calls.append(args[0])
+        return parse_dynamic_trial(*args, **kwargs)
+
+    monkeypatch.setattr(c3d_parser, 'parse_dynamic_trial', counting_parse)
+    return calls
+
+
+def assert_same_results(results, expected_results):
+    for stores, expected_stores in zip(results[:3], expected_results[:3]):
+        np.testing.assert_array_equal(stores.data, expected_stores.data)
+        assert stores.index.equals(expected_stores.index)
+    assert results[3].keys() == expected_results[3].keys()
+    assert results[4] == expected_results[4]
+
+
+def test_session(tmp_path, session_input, marker_maps, monkeypatch):
+    cache = StageCache(str(tmp_path / "cache"))
+    parses = count_parses(monkeypatch)
+
+    backend = CountingBackend()
+    results = run_session(session_input, tmp_path / "first", backend, cache)
+    assert len(parses) == 2
+    assert backend.calls == {'model_fit': 1, 'ik': 2, 'id': 2}
+
+    # Every stage is restored from the cache, including the files it wrote.
+    parses.clear()
+    backend = CountingBackend()
+    cached_results = run_session(session_input, tmp_path / "second", backend, cache)
+    assert not parses
+    assert not backend.calls
+    assert_same_results(cached_results, results)
+    for directory in ['grf', 'ik', 'id', 'events']:
+        assert sorted(os.listdir(tmp_path / "second" / directory)) == sorted(os.listdir(tmp_path / "first" / directory))
+
+    # Changing an option reruns the stages it affects.
+    backend = CountingBackend()
+    run_session(session_input, tmp_path / "filter", backend, cache, filter_grf=False)
+    assert len(parses) == 2
+    assert backend.calls == {'id': 2}
+
+    # A different backend reruns model fitting, IK and ID, but not the parse.
+    parses.clear()
+    backend = CountingBackend('other')
+    run_session(session_input, tmp_path / "backend", backend, cache)
+    assert not parses
+    assert backend.calls == {'model_fit': 1, 'ik': 2, 'id': 2}
+
+    # So does a change to the marker map.
+    map_file = os.path.join(marker_maps, f"{SESSION_LAB}.json")
+    with open(map_file, 'r') as file:
+        marker_map = json.load(file)
+    marker_map['UNUSED'] = None
+    with open(map_file, 'w') as file:
+        json.dump(marker_map, file)
+    backend = CountingBackend()
+    run_session(session_input, tmp_path / "marker_map", backend, cache)
+    assert len(parses) == 2
+
+    # Forced runs recompute every stage.
+    parses.clear()
+    backend = CountingBackend()
+    run_session(session_input, tmp_path / "force", backend, StageCache(str(tmp_path / "cache"), force=True))
+    assert len(parses) == 2
+    assert backend.calls == {'model_fit': 1, 'ik': 2, 'id': 2}